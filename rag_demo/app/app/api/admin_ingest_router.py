@@ -7,6 +7,7 @@ from fastapi import APIRouter, BackgroundTasks, HTTPException, Header
 from pydantic import BaseModel, Field
 import datetime
 from ..services.ingest_v2_service import ingest_v2_jsonl
+from ..infra.vector import file_index_status, refresh_file_index
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
@@ -87,4 +88,19 @@ def _run(job_id: str, req: IngestReq):
             "error": f"{type(e).__name__}: {e}",
             "traceback": traceback.format_exc(),
             "finished_at": datetime.utcnow().isoformat()
-        })
\ No newline at end of file
+        })
+
+# ---------- 파일 백엔드(faiss/npmmap) 저장본 ----------
+@router.get("/vector-index")
+def vector_index_status(x_admin_token: str | None = Header(default=None)):
+    _auth(x_admin_token)
+    return file_index_status()
+
+@router.post("/vector-index/rebuild")
+async def vector_index_rebuild(force: bool = True, x_admin_token: str | None = Header(default=None)):
+    """컬렉션에서 재빌드 + 재로드(적재 중이면 409). force=False면 행 수가 어긋날 때만."""
+    _auth(x_admin_token)
+    if _lock.locked():
+        raise HTTPException(409, "ingest already running")
+    async with _lock:
+        return await asyncio.to_thread(refresh_file_index, force=force)
@@ -7,7 +7,7 @@ import os
 
 from ..services.retrieval_service import retrieve as svc_retrieve
 from ..services.eval_service import evaluate_hit as svc_evaluate_hit
-from ..services.rag_service import RagService
+from ..services.rag_service import get_rag_service, adaptive_stats, stage_cost_stats
 from ..infra.llm.provider import get_chat
 from ..configure import config
 
@@ -72,7 +72,7 @@ async def ping_llm():
     return {"ok": True, "provider": provider, "model": used_model, "answer": out}
 
 # ---------- RAG 즉석 호출 ----------
-_rag = RagService()  # ✅ 인자 없이
+_rag = get_rag_service()  # ✅ 라우터 간 공유 인스턴스
 
 class RagAskIn(BaseModel):
     q: str
@@ -108,3 +108,30 @@ def debug_peek(id: str):
     c = get_collection()
     g = c.get(ids=[id], include=["documents","metadatas"])
     return {"ids": g.get("ids"), "documents": g.get("documents"), "metadatas": g.get("metadatas")}
+
+@router.get("/stats")
+def debug_stats():
+    from ..domain.embeddings import query_cache_stats, query_batcher_stats
+    from ..infra.inference_pool import pool_stats
+    from ..infra.vector.doc_index import doc_index_stats
+    from ..infra.vector.bm25_index import bm25_stats
+    from ..infra.vector.alias_index import alias_index_stats
+    from ..infra.vector.summary_index import summary_index_stats
+    from ..services.answer_cache import get_answer_cache
+    from ..services.retrieval_cache import get_retrieval_cache
+    from ..services.rerank_cache import get_rerank_cache
+    from ..infra.vector.chroma_store import collection_generation
+    from ..infra.vector import vector_stats
+    return {"vector_store": vector_stats(),"query_embed_cache": query_cache_stats(), "query_embed_batcher": query_batcher_stats(),
+            "inference_pool": pool_stats(),
+            "doc_index": doc_index_stats(), "bm25_index": bm25_stats(), "alias_index": alias_index_stats(),
+            "summary_index": summary_index_stats(), "adaptive_retrieval": adaptive_stats(),
+            "stage_costs": stage_cost_stats(),
+            "answer_cache": get_answer_cache().stats(),
+            "retrieval_cache": get_retrieval_cache().stats(), "rerank_cache": get_rerank_cache().stats(),
+            "generation": collection_generation()}
+
+@router.get("/models")
+def debug_models():
+    from ..infra.model_registry import model_stats, batcher_stats
+    return {**model_stats(), "rerank_batchers": batcher_stats()}
@@ -0,0 +1,13 @@
+# app/app/api/metrics_router.py
+from __future__ import annotations
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..metrics.prom import CONTENT_TYPE, render
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus 스크레이프용(단계 지연 히스토그램 + 카운터 + 게이지)."""
+    return PlainTextResponse(render(), media_type=CONTENT_TYPE)
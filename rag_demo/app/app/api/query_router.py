@@ -1,11 +1,11 @@
 # app/app/api/query_router.py
 from fastapi import APIRouter, Query
 from ..domain.models.query_model import QueryRequest, QueryResponse, RAGQueryResponse
-from ..services.rag_service import RagService
+from ..services.rag_service import get_rag_service
 
 router = APIRouter(prefix="/rag", tags=["rag"])
 
-_rag = RagService()
+_rag = get_rag_service()
 
 def _where_from(section: str | None):
     return {"section": section} if section else None
@@ -1,14 +1,21 @@
 # app/app/api/rag_router.py
 from __future__ import annotations
-from typing import Optional
-from fastapi import APIRouter, Body, Depends, HTTPException, Query
-from app.app.services.rag_service import RagService
+from typing import Optional, AsyncIterator
+import json
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.app.services.rag_service import RagService, get_rag_service
+from app.app.infra.inference_pool import InferenceQueueFull
 from app.app.domain.models.query_model import QueryRequest, RAGQueryResponse  # ← 네 모델 사용
 
 router = APIRouter(prefix="/rag", tags=["rag"])
-_rag = RagService()
+_rag = get_rag_service()
 def get_rag() -> RagService: return _rag
 
+def _deadline(param: Optional[float], header: Optional[float]) -> Optional[float]:
+    """쿼리 파라미터 deadline_ms 우선, 없으면 X-Deadline-Ms 헤더(둘 다 없으면 서비스 기본값)."""
+    return param if param is not None else header
+
 @router.post("/ask", response_model=RAGQueryResponse)
 async def rag_ask(
     req: QueryRequest = Body(...),
@@ -19,6 +26,8 @@ async def rag_ask(
     max_tokens: int = Query(512, ge=1, le=4096),
     temperature: float = Query(0.2, ge=0.0, le=2.0),
     preview_chars: int = Query(600, ge=0, le=8000),
+    deadline_ms: Optional[float] = Query(None, gt=0, le=120000),
+    x_deadline_ms: Optional[float] = Header(default=None, alias="X-Deadline-Ms", gt=0, le=120000),
     rag: RagService = Depends(get_rag),
 ):
     try:
@@ -28,10 +37,54 @@ async def rag_ask(
             k=k, candidate_k=candidate_k, use_mmr=use_mmr, lam=lam,
             where=None,  # 필요 시 쿼리파라미터로 추가
             max_tokens=max_tokens, temperature=temperature, preview_chars=preview_chars,
+            deadline_ms=_deadline(deadline_ms, x_deadline_ms),
         )
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"RAG inference failed: {e}")
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/ask/stream")
+async def rag_ask_stream(
+    req: QueryRequest = Body(...),
+    k: int = Query(6, ge=1, le=50),
+    candidate_k: Optional[int] = Query(None, ge=1, le=200),
+    use_mmr: bool = Query(True),
+    lam: float = Query(0.5, ge=0.0, le=1.0),
+    max_tokens: int = Query(512, ge=1, le=4096),
+    temperature: float = Query(0.2, ge=0.0, le=2.0),
+    deadline_ms: Optional[float] = Query(None, gt=0, le=120000),
+    x_deadline_ms: Optional[float] = Header(default=None, alias="X-Deadline-Ms", gt=0, le=120000),
+    rag: RagService = Depends(get_rag),
+):
+    """SSE: sources(검색 결과/지표) → token(델타)* → done(최종 지표). 실패는 error → done(빈 지표)."""
+    async def _events() -> AsyncIterator[str]:
+        done = False
+        try:
+            async for event, data in rag.ask_stream(
+                q=req.question,
+                k=k, candidate_k=candidate_k, use_mmr=use_mmr, lam=lam,
+                where=None,
+                max_tokens=max_tokens, temperature=temperature,
+                deadline_ms=_deadline(deadline_ms, x_deadline_ms),
+            ):
+                done = done or event == "done"
+                yield _sse(event, data)
+        except Exception as e:
+            # 헤더가 이미 나갔으므로 상태코드 대신 이벤트로 알림 → done을 기다리는 클라이언트가 끝나도록 done도 보냄
+            yield _sse("error", {"message": f"RAG inference failed: {e}"})
+            if not done:
+                yield _sse("done", {"metrics": {}})
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/healthz")
 async def rag_health():
     return {"ok": True}
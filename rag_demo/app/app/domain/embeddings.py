@@ -1,9 +1,20 @@
 # app/domain/embeddings.py
 from __future__ import annotations
-from typing import List, Optional, Literal, Callable, Any, Dict
-import os
+from typing import List, Optional, Literal, Callable, Any, Dict, Tuple
+import os, threading, time, unicodedata
 import numpy as np
 
+try:
+    from ..utils.ttl_cache import TTLCache
+    from ..utils.microbatch import MicroBatcher
+    from ..infra.model_registry import get_registry
+    from ..metrics.prom import observe_stage
+except Exception:
+    from utils.ttl_cache import TTLCache  # type: ignore
+    from utils.microbatch import MicroBatcher  # type: ignore
+    from infra.model_registry import get_registry  # type: ignore
+    from metrics.prom import observe_stage  # type: ignore
+
 # ──────────────────────────────────────────────────────────────────────────────
 # 설정 로딩 (config 모듈 우선, 없으면 환경변수)
 # ──────────────────────────────────────────────────────────────────────────────
@@ -26,14 +37,22 @@ def _get(name: str, default: Any) -> Any:
         "EMBED_TRUST_REMOTE_CODE": "RAG_EMBED_TRUST_REMOTE_CODE",
         "OPENAI_API_KEY": "OPENAI_API_KEY",
         "OPENAI_EMBED_MODEL": "OPENAI_EMBED_MODEL",
+        "QCACHE_SIZE": "RAG_QCACHE_SIZE",
+        "QCACHE_TTL": "RAG_QCACHE_TTL",
+        "QBATCH": "RAG_QEMBED_MICROBATCH",
+        "QBATCH_MAX": "RAG_QEMBED_MB_MAX_BATCH",
+        "QBATCH_WAIT_MS": "RAG_QEMBED_MB_WAIT_MS",
     }.get(name)
     if env_name:
         v = os.getenv(env_name)
         if v is not None:
-            if name in {"EMBED_DIM", "EMBED_BATCH"}:
+            if name in {"EMBED_DIM", "EMBED_BATCH", "QCACHE_SIZE", "QBATCH_MAX"}:
                 try: return int(v)
                 except Exception: return default
-            if name in {"EMBED_USE_PREFIX", "EMBED_TRUST_REMOTE_CODE"}:
+            if name in {"QCACHE_TTL", "QBATCH_WAIT_MS"}:
+                try: return float(v)
+                except Exception: return default
+            if name in {"EMBED_USE_PREFIX", "EMBED_TRUST_REMOTE_CODE", "QBATCH"}:
                 return str(v).lower() in {"1","true","yes","y"}
             return v
     return default
@@ -54,12 +73,25 @@ OPENAI_EMBED_MODEL: str = _get("OPENAI_EMBED_MODEL", "text-embedding-3-small")
 PASSAGE_PREFIX = "passage: "
 QUERY_PREFIX   = "query: "
 
+# 쿼리 임베딩 캐시 (0이면 비활성 / TTL 초)
+QCACHE_SIZE: int = int(_get("QCACHE_SIZE", 2048))
+QCACHE_TTL: float = float(_get("QCACHE_TTL", 600.0))
+
+# 쿼리 임베딩 마이크로배칭 (동시 요청의 캐시 미스를 모아 _encode 1회)
+QBATCH: bool = bool(_get("QBATCH", True))
+QBATCH_MAX: int = int(_get("QBATCH_MAX", 32))
+QBATCH_WAIT_MS: float = float(_get("QBATCH_WAIT_MS", 2.0))
+
 # ──────────────────────────────────────────────────────────────────────────────
 # 내부 상태
 # ──────────────────────────────────────────────────────────────────────────────
 _MODEL: Any = None
 _BACKEND: str = EMBED_BACKEND
 _DIM: int = EMBED_DIM  # 0이면 로드 후 결정
+# key = (backend, model, prefix flag, NFKC 정규화 텍스트) → 읽기전용 (d,) 벡터
+_QCACHE = TTLCache(maxsize=QCACHE_SIZE, ttl=QCACHE_TTL, name="query_embed")
+_QBATCHER: Optional[MicroBatcher] = None  # 첫 사용 시 생성(워커 스레드 1개)
+_QBATCHER_LOCK = threading.Lock()
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 유틸
@@ -190,7 +222,12 @@ def _ensure_loaded() -> None:
         return
     if _BACKEND not in _LOADER_MAP:
         raise RuntimeError(f"Unknown EMBED_BACKEND: {_BACKEND}")
-    _MODEL = _LOADER_MAP[_BACKEND]()  # sets _DIM
+    # 프로세스 전역 레지스트리 경유(로드 시간/메모리 기록). 로더가 _DIM도 설정
+    _MODEL = get_registry().get(_embedder_key(), _LOADER_MAP[_BACKEND], kind="embedder",
+                                name=EMBED_MODEL, device=_decide_device())
+
+def _embedder_key() -> str:
+    return f"embedder:{_BACKEND}:{EMBED_MODEL}"
 
 def embedding_dim() -> int:
     _ensure_loaded()
@@ -200,27 +237,84 @@ def _encode(texts: List[str]) -> np.ndarray:
     _ensure_loaded()
     if not texts:
         return _empty_matrix(_DIM)
-    return _ENCODER_MAP[_BACKEND](texts)
+    t0 = time.perf_counter()
+    embs = _ENCODER_MAP[_BACKEND](texts)
+    observe_stage("embed", (time.perf_counter() - t0) * 1000.0)
+    return embs
 
 def embed_passages(texts: List[str], *, as_list: bool = False) -> np.ndarray | List[List[float]]:
     xs = [f"{PASSAGE_PREFIX}{t}" for t in texts] if EMBED_USE_PREFIX else texts
     embs = _encode(xs)
     return embs.tolist() if as_list else embs
 
+def _qkey(text: str) -> Tuple[str, str, bool, str]:
+    return (_BACKEND, EMBED_MODEL, EMBED_USE_PREFIX, unicodedata.normalize("NFKC", text or "").strip())
+
 def embed_queries(texts: List[str], *, as_list: bool = False) -> np.ndarray | List[List[float]]:
-    xs = [f"{QUERY_PREFIX}{t}" for t in texts] if EMBED_USE_PREFIX else texts
-    embs = _encode(xs)
+    """
+    쿼리 임베딩. 동일 쿼리는 LRU+TTL 캐시에서 재사용하고, 미스만 한 번에 배치 인코딩.
+    """
+    if not texts:
+        embs = _encode([])
+        return embs.tolist() if as_list else embs
+
+    keys = [_qkey(t) for t in texts]
+    rows: List[Optional[np.ndarray]] = [_QCACHE.get(k) for k in keys]
+
+    # 미스만 모아서(배치 내 중복 제거) 인코딩
+    todo: Dict[Tuple[str, str, bool, str], List[int]] = {}
+    for i, (k, v) in enumerate(zip(keys, rows)):
+        if v is None:
+            todo.setdefault(k, []).append(i)
+    if todo:
+        norm_texts = [k[3] for k in todo]
+        xs = [f"{QUERY_PREFIX}{t}" for t in norm_texts] if EMBED_USE_PREFIX else norm_texts
+        fresh = _query_batcher().submit(xs) if QBATCH else _encode(xs)
+        for (k, idxs), v in zip(todo.items(), fresh):
+            v = np.array(v, dtype="float32")
+            v.setflags(write=False)  # 캐시 공유 벡터 보호
+            _QCACHE.put(k, v)
+            for i in idxs:
+                rows[i] = v
+
+    embs = np.vstack(rows).astype("float32", copy=False)
     return embs.tolist() if as_list else embs
 
+def _encode_rows(xs: List[str]) -> List[np.ndarray]:
+    return list(_encode(xs))
+
+def _query_batcher() -> MicroBatcher:
+    global _QBATCHER
+    if _QBATCHER is None:
+        with _QBATCHER_LOCK:
+            if _QBATCHER is None:
+                _QBATCHER = MicroBatcher(_encode_rows, max_batch=QBATCH_MAX, max_wait_ms=QBATCH_WAIT_MS,
+                                         name="query-embed-batch")
+    return _QBATCHER
+
+def query_cache_stats() -> Dict[str, Any]:
+    return _QCACHE.stats()
+
+def query_batcher_stats() -> Dict[str, Any]:
+    """배치 크기/대기 시간 히스토그램(마이크로배칭 비활성 또는 미사용이면 enabled만)."""
+    if _QBATCHER is None:
+        return {"enabled": QBATCH}
+    return {"enabled": QBATCH, **_QBATCHER.stats()}
+
+def clear_query_cache() -> None:
+    _QCACHE.clear()
+
 def switch_backend(backend: str, model: Optional[str] = None, dim: Optional[int] = None) -> None:
     """
     런타임 백엔드 전환(테스트/재인덱싱용).
     """
     global _BACKEND, EMBED_MODEL, _MODEL, _DIM
+    get_registry().evict(_embedder_key())
     _BACKEND = backend.lower()
     if model: EMBED_MODEL = model
     if dim is not None: _DIM = int(dim)
     _MODEL = None  # reload next call
+    _QCACHE.clear()  # 다른 모델 벡터가 섞이지 않도록
 
 # Chroma 쪽에서 .embed(list[str]) 콜 하도록 어댑터 제공
 class EmbedAdapter:
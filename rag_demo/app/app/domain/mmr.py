@@ -0,0 +1,65 @@
+# app/domain/mmr.py
+from __future__ import annotations
+from typing import List, Optional
+import numpy as np
+
+def normalize_rows(x: np.ndarray, *, dtype=np.float32) -> np.ndarray:
+    """행 단위 L2 정규화(0벡터는 그대로 0)."""
+    x = np.asarray(x, dtype=dtype)
+    if x.ndim == 1:
+        return x / (np.linalg.norm(x) + 1e-8)
+    return x / (np.linalg.norm(x, axis=1, keepdims=True) + 1e-8)
+
+def mmr_select(
+    cand: np.ndarray,
+    k: int,
+    lam: float = 0.5,
+    *,
+    query: Optional[np.ndarray] = None,
+    relevance: Optional[np.ndarray] = None,
+    normalized: bool = False,
+    dtype=np.float32,
+) -> List[int]:
+    """
+    증분 MMR. 선택 인덱스(선택 순서) 반환.
+    - cand: (n, d) 후보 벡터. normalized=False면 여기서 한 번 정규화(내적 = 코사인)
+    - relevance: (n,) 관련도. 없으면 cand @ query
+    - 후보별 "선택 집합과의 최대 유사도"를 유지하고, 매 선택마다 mat-vec 1회(cand @ picked)로 갱신
+      → O(n·d·k), 버퍼 재사용(반복 중 (n,) 이상 할당 없음)
+    - dtype=np.float16으로 넘기면 저장/연산을 반정밀도로(메모리 절반, 정밀도는 순위 판단엔 충분)
+    """
+    n = int(cand.shape[0]) if cand is not None else 0
+    k = min(int(k), n)
+    if k <= 0:
+        return []
+    C = np.asarray(cand, dtype=dtype) if normalized else normalize_rows(cand, dtype=dtype)
+    if relevance is None:
+        if query is None:
+            raise ValueError("mmr_select: query or relevance required")
+        q = np.asarray(query, dtype=dtype).reshape(-1)
+        if not normalized:
+            q = normalize_rows(q, dtype=dtype)
+        rel = (C @ q).astype(np.float32)
+    else:
+        rel = np.asarray(relevance, dtype=np.float32).reshape(-1)
+
+    lam = float(lam)
+    lam_rel = lam * rel                                   # 고정 항
+    max_sim = np.full(n, -np.inf, dtype=np.float32)       # 선택 집합과의 최대 유사도
+    score = np.empty(n, dtype=np.float32)
+    sims = np.empty(n, dtype=np.float32)
+    taken = np.zeros(n, dtype=bool)
+
+    i = int(np.argmax(rel))                               # 첫 선택은 관련도 최대
+    picked = [i]
+    taken[i] = True
+    while len(picked) < k:
+        sims[:] = C @ C[i]                                # 마지막 선택과의 유사도만 새로 계산
+        np.maximum(max_sim, sims, out=max_sim)
+        np.multiply(max_sim, -(1.0 - lam), out=score)
+        score += lam_rel
+        score[taken] = -np.inf
+        i = int(np.argmax(score))
+        picked.append(i)
+        taken[i] = True
+    return picked
@@ -0,0 +1,113 @@
+# app/app/infra/inference_pool.py
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import asyncio, functools, os, threading, time
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+class InferenceQueueFull(RuntimeError):
+    """대기열 상한(RAG_INFER_MAX_QUEUE) 초과."""
+
+class InferencePool:
+    """
+    CPU 바운드 단계(임베딩/HNSW/MMR/리랭크/퍼지부스트) 전용 스레드 풀.
+    - 이벤트 루프는 await만 하고, 실제 연산은 워커 스레드에서 수행
+    - pending(대기) / running(실행중) / 누적 대기시간 지표 제공
+    - max_queue > 0이면 대기열이 차면 즉시 InferenceQueueFull
+    """
+    def __init__(self, workers: int, *, max_queue: int = 0, name: str = "rag-infer"):
+        self.workers = max(1, int(workers))
+        self.max_queue = max(0, int(max_queue))
+        self.name = name
+        self._ex = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_pending_seen = 0
+        self._wait_ms_sum = 0.0
+        self._wait_ms_max = 0.0
+
+    def _wrap(self, fn: Callable[..., Any], t_submit: float) -> Callable[[], Any]:
+        def _job():
+            wait_ms = (time.perf_counter() - t_submit) * 1000.0
+            with self._lock:
+                self.pending -= 1
+                self.running += 1
+                self._wait_ms_sum += wait_ms
+                if wait_ms > self._wait_ms_max:
+                    self._wait_ms_max = wait_ms
+            try:
+                return fn()
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+        return _job
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            if self.max_queue and self.pending >= self.max_queue:
+                self.rejected += 1
+                raise InferenceQueueFull(f"inference queue full ({self.pending}/{self.max_queue})")
+            self.pending += 1
+            self.submitted += 1
+            if self.pending > self.max_pending_seen:
+                self.max_pending_seen = self.pending
+        job = self._wrap(functools.partial(fn, *args, **kwargs), time.perf_counter())
+        fut = self._ex.submit(job)
+        try:
+            return await asyncio.wrap_future(fut)
+        except asyncio.CancelledError:
+            # 시작 전에 취소된 작업은 _job이 돌지 않으므로 대기 카운터를 직접 정리
+            if fut.cancelled():
+                with self._lock:
+                    self.pending -= 1
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self.completed + self.running
+            return {
+                "name": self.name,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "pending": self.pending,
+                "running": self.running,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "max_pending_seen": self.max_pending_seen,
+                "wait_ms_avg": round(self._wait_ms_sum / started, 2) if started else 0.0,
+                "wait_ms_max": round(self._wait_ms_max, 2),
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._ex.shutdown(wait=wait)
+
+# ───────────── singleton ─────────────
+_pool: Optional[InferencePool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> InferencePool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = _env_int("RAG_INFER_WORKERS", min(4, os.cpu_count() or 1))
+                _pool = InferencePool(workers, max_queue=_env_int("RAG_INFER_MAX_QUEUE", 0))
+    return _pool
+
+async def run_inference(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """CPU 바운드 호출을 추론 풀에서 실행하고 결과를 await."""
+    return await get_pool().run(fn, *args, **kwargs)
+
+def pool_stats() -> Dict[str, Any]:
+    return get_pool().stats()
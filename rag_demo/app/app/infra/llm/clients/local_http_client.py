@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, AsyncIterator, Tuple
 import httpx
 from urllib.parse import urljoin
 
@@ -11,6 +11,11 @@ except Exception:
     except Exception:
         from configure.config import config
 
+try:
+    from app.app.infra.llm.provider import _iter_sse_deltas
+except Exception:
+    from infra.llm.provider import _iter_sse_deltas  # type: ignore
+
 _http: Optional[httpx.AsyncClient] = None
 _endpoint_path = "v1/chat/completions"  # 선행 슬래시 금지: base_url에 서브패스 있을 때 안전
 
@@ -25,18 +30,8 @@ def _build_base_url() -> str:
     # httpx base_url은 마지막에 슬래시 없어도 됨. urljoin 쓸 거면 보정.
     return str(base_url).rstrip("/")
 
-async def close_http() -> None:
-    global _http
-    if _http is not None:
-        await _http.aclose()
-        _http = None
-
-async def chat(
-    messages: List[Dict[str, str]],
-    model: Optional[str] = None,
-    max_tokens: int = 512,
-    temperature: float = 0.2,
-) -> str:
+def _prepare(model: Optional[str], *, accept: str) -> Tuple[str, float, Dict[str, str]]:
+    """chat/chat_stream 공용: 모델/타임아웃/헤더 결정 + 공유 AsyncClient 준비."""
     global _http
 
     base_url = _build_base_url()
@@ -63,16 +58,31 @@ async def chat(
     if _http is None:
         _http = httpx.AsyncClient(base_url=base_url, timeout=timeout)
 
-    headers = {"Content-Type": "application/json", "Accept": "application/json"}
+    headers = {"Content-Type": "application/json", "Accept": accept}
     if api_key:
         headers["Authorization"] = f"Bearer {api_key}"
+    return used_model, timeout, headers
+
+async def close_http() -> None:
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
+async def chat(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    max_tokens: int = 512,
+    temperature: float = 0.2,
+) -> str:
+    used_model, timeout, headers = _prepare(model, accept="application/json")
 
     payload = {
         "model": used_model,
         "messages": messages,
         "max_tokens": max_tokens,
         "temperature": temperature,
-        # "stream": False,  # 스트리밍 붙일 때 True + SSE로 처리
+        # 스트리밍은 chat_stream() 사용
     }
 
     # base_url이 서브패스를 포함할 수 있으므로 상대경로 사용
@@ -92,3 +102,30 @@ async def chat(
         raise RuntimeError(f"LLM HTTP {e.response.status_code}: {detail}") from e
     except httpx.HTTPError as e:
         raise RuntimeError(f"LLM HTTP error: {e}") from e
+
+async def chat_stream(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    max_tokens: int = 512,
+    temperature: float = 0.2,
+) -> AsyncIterator[str]:
+    """stream=True로 호출하고 SSE `data:` 라인에서 content 델타만 흘려보냄."""
+    used_model, timeout, headers = _prepare(model, accept="text/event-stream")
+
+    payload = {
+        "model": used_model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "stream": True,
+    }
+
+    try:
+        async with _http.stream("POST", _endpoint_path, json=payload, headers=headers, timeout=timeout) as resp:
+            resp.raise_for_status()
+            async for delta in _iter_sse_deltas(resp):
+                yield delta
+    except httpx.HTTPStatusError as e:
+        raise RuntimeError(f"LLM HTTP {e.response.status_code}") from e
+    except httpx.HTTPError as e:
+        raise RuntimeError(f"LLM HTTP error: {e}") from e
@@ -1,6 +1,7 @@
 
 from __future__ import annotations
-from typing import Optional, List, Dict, Awaitable, Callable
+from typing import Optional, List, Dict, Awaitable, Callable, AsyncIterator
+import asyncio, json, threading
 import httpx
 
 # Try both import paths to match your codebase
@@ -18,6 +19,11 @@ class LLMClient:
                    max_tokens: int = 512, temperature: float = 0.2) -> str:
         raise NotImplementedError
 
+    async def chat_stream(self, messages: List[Dict[str, str]], *, model: Optional[str] = None,
+                          max_tokens: int = 512, temperature: float = 0.2) -> AsyncIterator[str]:
+        """토큰(델타) 단위 스트림. 기본 구현은 완성본을 한 번에 흘려보냄."""
+        yield await self.chat(messages, model=model, max_tokens=max_tokens, temperature=temperature)
+
 # --- HTTP (OpenAI-compatible: OpenAI / vLLM / llama.cpp server) ---
 class _OpenAIHTTPClient(LLMClient):
     def __init__(self, http: httpx.AsyncClient, *, base_url: str,
@@ -45,6 +51,27 @@ class _OpenAIHTTPClient(LLMClient):
         j = r.json()
         return j["choices"][0]["message"]["content"]
 
+    async def chat_stream(self, messages: List[Dict[str, str]], *, model: Optional[str] = None,
+                          max_tokens: int = 512, temperature: float = 0.2) -> AsyncIterator[str]:
+        used_model = model or self._default_model
+        if not used_model:
+            raise RuntimeError("LLM model is not set (LLM_MODEL / OPENAI_MODEL / LOCAL_LLM_MODEL).")
+        headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+        if self._api_key:
+            headers["Authorization"] = f"Bearer {self._api_key}"
+        payload = {
+            "model": used_model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True,
+        }
+        async with self._http.stream("POST", f"{self._base_url}/chat/completions", json=payload,
+                                     headers=headers, timeout=self._timeout) as r:
+            r.raise_for_status()
+            async for delta in _iter_sse_deltas(r):
+                yield delta
+
 # --- In-process (llama-cpp-python) ---
 class _InprocClient(LLMClient):
     _llm = None
@@ -54,14 +81,20 @@ class _InprocClient(LLMClient):
     @classmethod
     def _get_llm(cls):
         if cls._llm is None:
-            from llama_cpp import Llama
-            cls._llm = Llama(
-                model_path=getattr(config, "LLAMA_MODEL_PATH", None),
-                n_ctx=int(getattr(config, "LLAMA_CTX", 8192)),
-                n_gpu_layers=int(getattr(config, "LLAMA_N_GPU_LAYERS", 0)),
-                chat_format=str(getattr(config, "LLAMA_CHAT_FORMAT", "gemma")),
-                verbose=False,
-            )
+            from ..model_registry import get_registry
+            path = getattr(config, "LLAMA_MODEL_PATH", None)
+
+            def _load():
+                from llama_cpp import Llama
+                return Llama(
+                    model_path=path,
+                    n_ctx=int(getattr(config, "LLAMA_CTX", 8192)),
+                    n_gpu_layers=int(getattr(config, "LLAMA_N_GPU_LAYERS", 0)),
+                    chat_format=str(getattr(config, "LLAMA_CHAT_FORMAT", "gemma")),
+                    verbose=False,
+                )
+            # 레지스트리 경유 → 로드 시간/메모리 기록, 프로세스당 1회
+            cls._llm = get_registry().get(f"llm:llama-cpp:{path}", _load, kind="llm", name=str(path))
         return cls._llm
 
     async def chat(self, messages: List[Dict[str, str]], *, model: Optional[str] = None,
@@ -74,6 +107,72 @@ class _InprocClient(LLMClient):
             return out["choices"][0]["message"]["content"]
         return await anyio.to_thread.run_sync(_do)
 
+    async def chat_stream(self, messages: List[Dict[str, str]], *, model: Optional[str] = None,
+                          max_tokens: int = 512, temperature: float = 0.2) -> AsyncIterator[str]:
+        def _gen():
+            it = self._get_llm().create_chat_completion(
+                messages=messages, max_tokens=max_tokens, temperature=temperature, stream=True
+            )
+            for chunk in it:
+                delta = (chunk["choices"][0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+        async for delta in _iter_in_thread(_gen):
+            yield delta
+
+# --- streaming helpers ---
+async def _iter_sse_deltas(resp: httpx.Response) -> AsyncIterator[str]:
+    """OpenAI 호환 SSE(`data: {...}` / `data: [DONE]`)에서 content 델타만 추출."""
+    async for line in resp.aiter_lines():
+        line = line.strip()
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        try:
+            j = json.loads(data)
+        except ValueError:
+            continue
+        choices = j.get("choices") or []
+        if not choices:
+            continue
+        delta = (choices[0].get("delta") or {}).get("content")
+        if delta:
+            yield delta
+
+_STREAM_END = object()
+
+async def _iter_in_thread(make_gen: Callable[[], object]) -> AsyncIterator[str]:
+    """동기 제너레이터(llama-cpp 스트림)를 워커 스레드에서 돌리고 큐로 이벤트 루프에 전달."""
+    loop = asyncio.get_running_loop()
+    q: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()  # 소비자가 중단(클라이언트 끊김)하면 생성도 멈춤
+
+    def _produce():
+        try:
+            for item in make_gen():
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(q.put_nowait, item)
+        except BaseException as e:  # 소비자 쪽에서 재발생
+            loop.call_soon_threadsafe(q.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(q.put_nowait, _STREAM_END)
+
+    fut = loop.run_in_executor(None, _produce)
+    try:
+        while True:
+            item = await q.get()
+            if item is _STREAM_END:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+    await fut
+
 # --- Factory / DI helpers ---
 _http_singleton: Optional[httpx.AsyncClient] = None
 _client_singleton: Optional[LLMClient] = None
@@ -106,15 +205,29 @@ def build_client(async_http_client: httpx.AsyncClient | None = None) -> LLMClien
 
     raise RuntimeError(f"Unknown LLM_PROVIDER: {provider}")
 
-async def get_client() -> LLMClient:
-    global _client_singleton, _http_singleton
+_client_lock = threading.Lock()
+
+def get_client_sync() -> LLMClient:
+    global _client_singleton
     if _client_singleton is None:
-        _client_singleton = build_client()
+        with _client_lock:
+            if _client_singleton is None:
+                _client_singleton = build_client()
     return _client_singleton
 
+async def get_client() -> LLMClient:
+    return get_client_sync()
+
 # --- Legacy wrapper (keeps old call sites working) ---
 def get_chat() -> Callable[[List[Dict[str, str]], int, float], Awaitable[str]]:
     async def _call(messages: List[Dict[str, str]], max_tokens: int = 512, temperature: float = 0.2) -> str:
         client = await get_client()
         return await client.chat(messages, max_tokens=max_tokens, temperature=temperature)
     return _call
+
+def get_chat_stream() -> Callable[..., AsyncIterator[str]]:
+    async def _call(messages: List[Dict[str, str]], max_tokens: int = 512, temperature: float = 0.2) -> AsyncIterator[str]:
+        client = await get_client()
+        async for delta in client.chat_stream(messages, max_tokens=max_tokens, temperature=temperature):
+            yield delta
+    return _call
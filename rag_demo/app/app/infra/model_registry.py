@@ -0,0 +1,231 @@
+# app/app/infra/model_registry.py
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import logging, os, threading, time
+
+log = logging.getLogger("model_registry")
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+def _rss_mb() -> Optional[float]:
+    """현재 프로세스 RSS(MB). /proc 우선, 없으면 psutil, 둘 다 없으면 None."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except Exception:
+        pass
+    try:
+        import psutil  # type: ignore
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except Exception:
+        return None
+
+def _param_mb(obj: Any) -> Optional[float]:
+    """torch 모듈이면 파라미터+버퍼 바이트 합(MB). CrossEncoder/BGEM3는 내부 .model을 본다."""
+    for cand in (obj, getattr(obj, "model", None), getattr(getattr(obj, "model", None), "model", None)):
+        if cand is None or not hasattr(cand, "parameters"):
+            continue
+        try:
+            n = sum(p.numel() * p.element_size() for p in cand.parameters())
+            n += sum(b.numel() * b.element_size() for b in cand.buffers())
+            return n / (1024 * 1024)
+        except Exception:
+            continue
+    return None
+
+def default_device() -> str:
+    dev = os.getenv("RAG_MODEL_DEVICE", "auto")
+    if dev != "auto":
+        return dev
+    try:
+        import torch  # type: ignore
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except Exception:
+        return "cpu"
+
+class ModelRegistry:
+    """
+    프로세스 전역 모델 레지스트리.
+    - key별로 한 번만 로드(키 단위 락 → 서로 다른 모델은 병렬 로드 가능)
+    - 로드 시간 / RSS 증가분 / 파라미터 메모리 기록(stats)
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._models: Dict[str, Any] = {}
+        self._info: Dict[str, Dict[str, Any]] = {}
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            lk = self._key_locks.get(key)
+            if lk is None:
+                lk = self._key_locks[key] = threading.Lock()
+            return lk
+
+    def get(self, key: str, loader: Callable[[], Any], *, kind: str, name: str = "",
+            device: Optional[str] = None) -> Any:
+        obj = self._models.get(key)
+        if obj is not None:
+            return obj
+        with self._key_lock(key):
+            obj = self._models.get(key)
+            if obj is not None:
+                return obj
+            rss0 = _rss_mb()
+            t0 = time.perf_counter()
+            obj = loader()
+            load_ms = (time.perf_counter() - t0) * 1000.0
+            rss1 = _rss_mb()
+            pmb = _param_mb(obj)
+            info = {
+                "kind": kind,
+                "name": name or key,
+                "device": device,
+                "load_ms": round(load_ms, 1),
+                "rss_delta_mb": round(rss1 - rss0, 1) if rss0 is not None and rss1 is not None else None,
+                "param_mb": round(pmb, 1) if pmb is not None else None,
+                "loaded_at": time.time(),
+            }
+            with self._lock:
+                self._models[key] = obj
+                self._info[key] = info
+            log.info(f"[model_registry] loaded {key} ({kind}) in {load_ms:.0f}ms "
+                     f"rss+={info['rss_delta_mb']}MB params={info['param_mb']}MB")
+            return obj
+
+    def peek(self, key: str) -> Any:
+        return self._models.get(key)
+
+    def evict(self, key: str) -> bool:
+        with self._lock:
+            self._info.pop(key, None)
+            return self._models.pop(key, None) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = {k: dict(v) for k, v in self._info.items()}
+        rss = _rss_mb()
+        return {"count": len(models), "rss_mb": round(rss, 1) if rss is not None else None, "models": models}
+
+# ───────────── singleton ─────────────
+_registry = ModelRegistry()
+
+def get_registry() -> ModelRegistry:
+    return _registry
+
+def model_stats() -> Dict[str, Any]:
+    return _registry.stats()
+
+# ───────────── 공용 모델 ─────────────
+RERANK_MODEL = os.getenv("RAG_RERANK_MODEL", "BAAI/bge-reranker-v2-m3")
+
+def rerank_backend() -> str:
+    """RAG_RERANK_BACKEND: torch(기본, sentence-transformers CrossEncoder) | onnx(ONNX Runtime int8, CPU)."""
+    return (os.getenv("RAG_RERANK_BACKEND", "torch") or "torch").strip().lower()
+
+def reranker_id(name: Optional[str] = None, *, max_length: Optional[int] = None,
+                backend: Optional[str] = None) -> str:
+    """점수 캐시 등에서 쓰는 리랭커 식별자(백엔드/모델/길이가 같으면 점수도 같다고 본다)."""
+    name = name or RERANK_MODEL
+    max_length = int(max_length or _env_int("RAG_RERANK_MAX_LEN", 512))
+    return f"{(backend or rerank_backend()).lower()}:{name}:{max_length}"
+
+def get_reranker(name: Optional[str] = None, *, max_length: Optional[int] = None,
+                 device: Optional[str] = None, backend: Optional[str] = None,
+                 batched: Optional[bool] = None) -> Any:
+    """
+    리랭커(백엔드/이름/길이/디바이스 조합당 1개). 어느 백엔드든 predict(pairs, batch_size) 계약 동일.
+    batched(기본 RAG_RERANK_MICROBATCH=1)면 동시 요청을 모아 predict 1회로 처리하는 래퍼를 돌려준다.
+    의존 패키지 미설치 시 ImportError.
+    """
+    name = name or RERANK_MODEL
+    max_length = int(max_length or _env_int("RAG_RERANK_MAX_LEN", 512))
+    backend = (backend or rerank_backend()).lower()
+    if batched is None:
+        batched = os.getenv("RAG_RERANK_MICROBATCH", "1") == "1"
+
+    if backend == "onnx":
+        def _load_onnx():
+            from .onnx_reranker import load_onnx_reranker
+            return load_onnx_reranker(name, max_length=max_length)
+        key = f"reranker:onnx:{name}:{max_length}"
+        model = _registry.get(key, _load_onnx, kind="reranker", name=f"{name} (onnx)", device="cpu")
+    elif backend == "torch":
+        device = device or default_device()
+
+        def _load():
+            from sentence_transformers import CrossEncoder  # pip install sentence-transformers
+            # max_length로 잘라 OOM 방지
+            return CrossEncoder(name, device=device, max_length=max_length)
+
+        key = f"reranker:torch:{name}:{max_length}:{device}"
+        model = _registry.get(key, _load, kind="reranker", name=name, device=device)
+    else:
+        raise ValueError(f"Unknown RAG_RERANK_BACKEND: {backend}")
+    return _batched_reranker(key, model) if batched else model
+
+# ───────────── 리랭커 마이크로배칭 ─────────────
+class BatchedReranker:
+    """
+    predict(pairs, ...) 호출을 MicroBatcher로 합쳐 실행.
+    여러 요청의 쌍이 한 배치로 합쳐지므로 모델 배치 크기는 max_batch(RAG_RERANK_MB_MAX_BATCH)가 정한다.
+    호출 측 batch_size 인자는 받아만 두고 쓰지 않는다(원본 predict와 호출 형태 호환용).
+    호출 스레드는 결과가 나올 때까지 블로킹(추론 풀 워커에서 호출되는 전제).
+    """
+    def __init__(self, model: Any, *, max_batch: int, max_wait_ms: float, name: str):
+        from ..utils.microbatch import MicroBatcher
+        self.model = model
+        self._bs = max_batch
+        self._mb = MicroBatcher(self._predict_flat, max_batch=max_batch, max_wait_ms=max_wait_ms, name=name)
+
+    def _predict_flat(self, pairs: List[Tuple[str, str]]) -> Any:
+        import numpy as np
+        return np.asarray(self.model.predict(pairs, batch_size=self._bs, convert_to_numpy=True),
+                          dtype=np.float32).reshape(-1)
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], *, convert_to_numpy: bool = True, **_: Any) -> Any:
+        import numpy as np
+        out = np.asarray(self._mb.submit(list(pairs)), dtype=np.float32)
+        return out if convert_to_numpy else out.tolist()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._mb.stats()
+
+_batchers: Dict[str, BatchedReranker] = {}
+_batchers_lock = threading.Lock()
+
+def _batched_reranker(key: str, model: Any) -> BatchedReranker:
+    b = _batchers.get(key)
+    if b is None:
+        with _batchers_lock:
+            b = _batchers.get(key)
+            if b is None:
+                b = _batchers[key] = BatchedReranker(
+                    model,
+                    max_batch=_env_int("RAG_RERANK_MB_MAX_BATCH", 64),
+                    max_wait_ms=float(os.getenv("RAG_RERANK_MB_WAIT_MS", "3")),
+                    name="rerank-batch",
+                )
+    return b
+
+def batcher_stats() -> Dict[str, Any]:
+    return {k: b.stats() for k, b in list(_batchers.items())}
+
+def get_embedder() -> Any:
+    """쿼리/패시지 임베딩 모델(domain.embeddings가 레지스트리를 통해 로드)."""
+    from ..domain import embeddings
+    embeddings.embedding_dim()  # 로드 보장
+    return embeddings._MODEL
+
+def get_llm() -> Any:
+    """LLM 핸들. in-process(llama-cpp)면 모델까지 로드, HTTP/OpenAI면 클라이언트 싱글턴."""
+    from .llm import provider
+    client = provider.get_client_sync()
+    if isinstance(client, provider._InprocClient):
+        client._get_llm()
+    return client
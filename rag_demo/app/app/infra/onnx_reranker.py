@@ -0,0 +1,126 @@
+# app/app/infra/onnx_reranker.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple
+import logging, os, time
+import numpy as np
+
+log = logging.getLogger("onnx_reranker")
+
+_FP32_FILE = "model.onnx"
+_INT8_FILE = "model.int8.onnx"
+
+def default_onnx_dir(name: str) -> Path:
+    """RAG_RERANK_ONNX_DIR 미지정 시 ~/.cache/rag_onnx/<모델명>."""
+    base = os.getenv("RAG_RERANK_ONNX_DIR")
+    if base:
+        return Path(base)
+    return Path.home() / ".cache" / "rag_onnx" / name.replace("/", "__")
+
+def export_onnx(name: str, out_dir: Path, *, max_length: int = 512, quantize: bool = True,
+                opset: int = 17) -> Path:
+    """
+    HF 시퀀스 분류(크로스 인코더) 모델을 ONNX로 내보내고, 옵션으로 동적 int8 양자화.
+    - 입력: input_ids / attention_mask (+ token_type_ids가 있는 모델이면 포함), 배치/길이 동적 축
+    - 토크나이저도 같은 디렉터리에 저장 → 로드 시 torch 불필요
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tok = AutoTokenizer.from_pretrained(name)
+    model = AutoModelForSequenceClassification.from_pretrained(name).eval()
+    tok.save_pretrained(out_dir)
+    model.config.save_pretrained(out_dir)
+
+    enc = tok([("질문", "문서")], truncation=True, max_length=max_length, return_tensors="pt")
+    names = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in enc]
+    dyn = {k: {0: "batch", 1: "seq"} for k in names}
+    dyn["logits"] = {0: "batch"}
+    fp32 = out_dir / _FP32_FILE
+    t0 = time.perf_counter()
+    with torch.no_grad():
+        torch.onnx.export(
+            model, tuple(enc[k] for k in names), str(fp32),
+            input_names=names, output_names=["logits"], dynamic_axes=dyn, opset_version=opset,
+        )
+    log.info(f"[onnx_reranker] exported {name} → {fp32} in {(time.perf_counter() - t0) * 1000:.0f}ms")
+    if not quantize:
+        return fp32
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    int8 = out_dir / _INT8_FILE
+    # 가중치만 int8(활성은 런타임 동적 스케일) → 캘리브레이션 데이터 불필요
+    quantize_dynamic(str(fp32), str(int8), weight_type=QuantType.QInt8)
+    log.info(f"[onnx_reranker] quantized → {int8}")
+    return int8
+
+class OnnxCrossEncoder:
+    """
+    sentence-transformers CrossEncoder와 같은 predict(pairs, batch_size) 계약의 ONNX Runtime 구현(CPU).
+    - 라벨 1개 모델은 CrossEncoder 기본과 같이 sigmoid 적용 → 점수 스케일 동일
+    - 배치는 길이순으로 묶어 패딩 낭비를 줄이고, 결과는 입력 순서로 복원
+    """
+    def __init__(self, model_dir: Path, *, max_length: int = 512, quantized: bool = True,
+                 threads: int = 0, name: str = ""):
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+
+        model_dir = Path(model_dir)
+        path = model_dir / (_INT8_FILE if quantized else _FP32_FILE)
+        if not path.exists():
+            raise FileNotFoundError(f"ONNX reranker not found: {path}")
+        self.name = name or str(model_dir)
+        self.path = path
+        self.max_length = int(max_length)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        try:
+            num_labels = int(AutoConfig.from_pretrained(model_dir).num_labels)
+        except Exception:
+            num_labels = 1
+        self._sigmoid = num_labels == 1
+
+        so = ort.SessionOptions()
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            so.intra_op_num_threads = int(threads)
+        self._sess = ort.InferenceSession(str(path), so, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self._sess.get_inputs()}
+
+    def _run(self, pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+        enc = self.tokenizer(
+            [p[0] for p in pairs], [p[1] for p in pairs],
+            padding=True, truncation="longest_first", max_length=self.max_length, return_tensors="np",
+        )
+        feed = {k: np.asarray(v, dtype=np.int64) for k, v in enc.items() if k in self._inputs}
+        logits = np.asarray(self._sess.run(None, feed)[0], dtype=np.float32)
+        return logits[:, 0] if logits.ndim == 2 else logits.reshape(-1)
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], batch_size: int = 32, *,
+                convert_to_numpy: bool = True, show_progress_bar: bool = False, **_: Any) -> Any:
+        n = len(pairs)
+        out = np.empty(n, dtype=np.float32)
+        if n:
+            bs = max(1, int(batch_size))
+            order = np.argsort([len(a) + len(b) for a, b in pairs], kind="stable")
+            for s in range(0, n, bs):
+                idx = order[s:s + bs]
+                out[idx] = self._run([pairs[i] for i in idx])
+            if self._sigmoid:
+                out = 1.0 / (1.0 + np.exp(-out))
+        return out if convert_to_numpy else out.tolist()
+
+def load_onnx_reranker(name: str, *, max_length: int = 512, quantized: Optional[bool] = None,
+                       threads: Optional[int] = None) -> OnnxCrossEncoder:
+    """
+    캐시 디렉터리에서 로드. 파일이 없고 RAG_RERANK_ONNX_EXPORT=1(기본)이면 최초 1회 내보내기+양자화.
+    """
+    quantized = (os.getenv("RAG_RERANK_ONNX_QUANT", "1") == "1") if quantized is None else quantized
+    threads = int(os.getenv("RAG_ONNX_THREADS", "0")) if threads is None else threads
+    d = default_onnx_dir(name)
+    want = d / (_INT8_FILE if quantized else _FP32_FILE)
+    if not want.exists():
+        if os.getenv("RAG_RERANK_ONNX_EXPORT", "1") != "1":
+            raise FileNotFoundError(f"ONNX reranker not found: {want} (RAG_RERANK_ONNX_EXPORT=0)")
+        export_onnx(name, d, max_length=max_length, quantize=quantized)
+    return OnnxCrossEncoder(d, max_length=max_length, quantized=quantized, threads=threads, name=name)
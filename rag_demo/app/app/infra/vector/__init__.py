@@ -1,9 +1,10 @@
 # app/vector_store/__init__.py
 from __future__ import annotations
-from typing import Dict, Any, List, Optional
-import logging
+from typing import Dict, Any, List, Optional, Tuple
+import importlib, json, logging, threading, time
 
 import app.app.configure.config as config  # 프로젝트 경로 유지
+from app.app.metrics.prom import observe_stage
 
 log = logging.getLogger("vector_store")
 
@@ -75,39 +76,161 @@ def _topk(n: Optional[int]) -> int:
     return 1 if k < 1 else k
 
 
-def _search_chroma(query: str, *, where: Optional[Dict[str, Any]] = None, n: Optional[int] = None) -> Dict[str, Any]:
-    # ✅ 지연 임포트: chroma만 쓸 때 chroma만 로드
-    from app.app.infra.vector.chroma_store import search as chroma_search
-    return chroma_search(query, where=where, n=_topk(n))
-
-
-def _search_faiss(query: str, *, top_k: int):
-    # ✅ 지연 임포트: faiss가 필요할 때만 시도. 실패하면 chroma로 폴백.
-    try:
-        from .faiss import get_relevant_docs as faiss_search
-    except Exception as e:
-        log.warning("FAISS backend requested but unavailable (%s). Falling back to Chroma.", e)
+# ───────────── backend dispatch ─────────────
+# 파일 백엔드: VECTOR_BACKEND 값 → (모듈, 로더, 통계, 재로드, 재빌드 때 저장본 meta에서 이어받을 build_index 인자).
+# 모듈은 chroma_store와 같은 search/search_many/get_by_ids + index_path/build_index 제공
+_FILE_BACKENDS = {
+    "faiss": ("faiss_store", "get_faiss_store", "faiss_stats", "reload_faiss_store", ("kind", "quant")),
+    "npmmap": ("npmmap_store", "get_npmmap_store", "npmmap_stats", "reload_npmmap_store", ("quant",)),
+}
+_resolved: Optional[Tuple[str, Any]] = None
+_resolve_lock = threading.Lock()
+
+
+def _resolve() -> Tuple[str, Any]:
+    global _resolved
+    if _resolved is None:
+        with _resolve_lock:
+            if _resolved is None:
+                backend = _backend()
+                spec = _FILE_BACKENDS.get(backend)
+                if spec is not None:
+                    # ✅ 지연 임포트 + 저장본 로드까지 확인. 실패하면 chroma로 폴백.
+                    try:
+                        mod = importlib.import_module(f".{spec[0]}", __name__)
+                        getattr(mod, spec[1])()
+                        _resolved = (backend, mod)
+                        st = file_index_status(backend)
+                        if st.get("stale"):
+                            log.warning("%s index is stale (built=%s, collection=%s); rebuild via ingest or "
+                                        "POST /admin/vector-index/rebuild", backend, st["built_count"],
+                                        st["collection_count"])
+                    except Exception as e:
+                        log.warning("%s backend requested but unavailable (%s). Falling back to Chroma.", backend, e)
+                if _resolved is None:
+                    from app.app.infra.vector import chroma_store
+                    _resolved = ("chroma", chroma_store)
+    return _resolved
+
+
+def reset_backend() -> None:
+    """백엔드 재판정(파일 인덱스를 새로 빌드/교체한 뒤)."""
+    global _resolved
+    with _resolve_lock:
+        _resolved = None
+
+
+def vector_backend() -> str:
+    """실제로 쓰이는 백엔드 이름(폴백 반영)."""
+    return _resolve()[0]
+
+
+def _prefiltered(backend: str, query_embeddings: Any, kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Chroma + where(문서 본문 조건 없음)면 비트맵 사전 필터 경로 시도. None이면 Chroma where 그대로."""
+    if backend != "chroma" or not kwargs.get("where") or kwargs.get("where_document"):
         return None
-    return faiss_search(query, top_k=top_k)  # 예상: [(id, text, score, meta), ...] 혹은 유사 구조
+    from app.app.infra.vector import prefilter
+    return prefilter.chroma_filtered(
+        query_embeddings, where=kwargs["where"], n=min(_topk(kwargs.get("n")), 100),
+        include_docs=kwargs.get("include_docs", True), include_metas=kwargs.get("include_metas", True),
+        include_distances=kwargs.get("include_distances", True),
+        include_embeddings=kwargs.get("include_embeddings", False),
+    )
+
+
+def search(query: str = "", **kwargs: Any) -> Dict[str, Any]:
+    """chroma_store.search와 같은 시그니처/원형 반환(백엔드 무관). 지연은 vector_query 단계로 기록(텍스트 질의면 임베딩 포함)."""
+    t0 = time.perf_counter()
+    try:
+        backend, mod = _resolve()
+        if backend == "chroma" and kwargs.get("where") and not kwargs.get("where_document"):
+            if kwargs.get("query_embeddings") is None:
+                if not query:
+                    raise ValueError("either 'query' (text) or 'query_embeddings' must be provided")
+                kwargs["query_embeddings"] = mod._embed_query(query)   # 폴백 시 재임베딩하지 않도록 먼저
+            res = _prefiltered(backend, [mod._as_vector(kwargs["query_embeddings"])], kwargs)
+            if res is not None:
+                return res
+        return mod.search(query, **kwargs)
+    finally:
+        observe_stage("vector_query", (time.perf_counter() - t0) * 1000.0)
+
+
+def search_many(query_embeddings: List[List[float]], **kwargs: Any) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    try:
+        backend, mod = _resolve()
+        if query_embeddings is not None and len(query_embeddings):
+            res = _prefiltered(backend, query_embeddings, kwargs)
+            if res is not None:
+                return res
+        return mod.search_many(query_embeddings, **kwargs)
+    finally:
+        observe_stage("vector_query", (time.perf_counter() - t0) * 1000.0)
+
+
+def get_by_ids(ids: List[str], **kwargs: Any) -> Dict[str, Any]:
+    return _resolve()[1].get_by_ids(ids, **kwargs)
+
+
+# ───────────── 파일 백엔드 저장본 신선도 ─────────────
+# 파일 인덱스는 빌드 시점 스냅샷이라 Chroma 적재를 따라가지 않는다 → 적재 끝/관리 API에서 재빌드 + 재로드
+def _file_meta(backend: str) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    from app.app.infra.vector.sidecar import live_dir
+    mod = importlib.import_module(f".{_FILE_BACKENDS[backend][0]}", __name__)
+    p = live_dir(mod.index_path()) / "meta.json"
+    return mod, (json.loads(p.read_text(encoding="utf-8")) if p.exists() else None)
+
+
+def file_index_status(backend: Optional[str] = None) -> Dict[str, Any]:
+    """요청된(또는 지정) 파일 백엔드 저장본 행 수 vs 컬렉션 행 수. 파일 백엔드가 아니면 stale=False."""
+    backend = backend or _backend()
+    if backend not in _FILE_BACKENDS:
+        return {"backend": backend, "stale": False}
+    from app.app.infra.vector import chroma_store
+    try:
+        _, meta = _file_meta(backend)
+    except Exception as e:   # 백엔드 패키지 미설치 등
+        return {"backend": backend, "stale": None, "error": str(e)}
+    built = int(meta["count"]) if meta and meta.get("count") is not None else None
+    current = int(chroma_store.get_collection().count())
+    return {"backend": backend, "built_count": built, "collection_count": current,
+            "built_at": (meta or {}).get("saved_at"), "stale": built != current}
 
 
-def retrieve(query: str, top_k: int = None, where: Dict[str, Any] | None = None):
+def refresh_file_index(*, force: bool = False) -> Dict[str, Any]:
     """
-    백엔드별 원래 반환을 유지:
-      - faiss: faiss 검색 결과 그대로 반환(튜플/리스트 등)
-      - chroma: chroma raw dict 그대로 반환
+    파일 백엔드면 컬렉션에서 재빌드 후 재로드(재로드가 결과/답변 캐시 세대도 올림).
+    force=False면 행 수가 어긋날 때만(같은 id 덮어쓰기는 행 수로 안 보이므로 적재 직후엔 force).
     """
     backend = _backend()
-    k = _topk(top_k)
+    spec = _FILE_BACKENDS.get(backend)
+    if spec is None:
+        return {"backend": backend, "rebuilt": False}
+    st = file_index_status(backend)
+    if not (force or st.get("stale")):
+        return {**st, "rebuilt": False}
+    mod, meta = _file_meta(backend)
+    kwargs = {k: meta[k] for k in spec[4] if meta and meta.get(k) is not None}
+    t0 = time.perf_counter()
+    info = mod.build_index(**kwargs)
+    getattr(mod, spec[3])()
+    log.info("%s index rebuilt rows=%s in %.0fms", backend, info.get("rows"), (time.perf_counter() - t0) * 1000.0)
+    return {**file_index_status(backend), "rebuilt": True, "build": info}
+
+
+def vector_stats() -> Dict[str, Any]:
+    backend, mod = _resolve()
+    spec = _FILE_BACKENDS.get(backend)
+    if spec is not None:
+        return {"backend": backend, "index": file_index_status(backend), **getattr(mod, spec[2])()}
+    from app.app.infra.vector import prefilter
+    return {"backend": backend, "requested": _backend(), "prefilter": prefilter.prefilter_stats()}
 
-    if backend == "faiss":
-        hits = _search_faiss(query, top_k=k)
-        if hits is not None:
-            return hits
-        # faiss 불가 시 chroma로 폴백
-        return _search_chroma(query, where=where, n=k)
 
-    return _search_chroma(query, where=where, n=k)
+def retrieve(query: str, top_k: int = None, where: Dict[str, Any] | None = None):
+    """백엔드 원형(dict) 그대로 반환: ids/documents/metadatas/distances 배치 리스트 + space."""
+    return search(query, where=where, n=_topk(top_k))
 
 
 def search_vectors(query: str, where: Optional[Dict[str, Any]] = None, n: int = None) -> List[Dict[str, Any]]:
@@ -115,41 +238,4 @@ def search_vectors(query: str, where: Optional[Dict[str, Any]] = None, n: int =
     항상 동일한 형태로 반환:
       [{"id": str, "text": str, "meta": dict, "score": float|None}, ...]
     """
-    backend = _backend()
-    k = _topk(n)
-
-    if backend == "faiss":
-        hits = _search_faiss(query, top_k=k)
-        if hits is None:
-            # faiss 없으면 chroma 폴백 + 평탄화
-            return _flatten_chroma(_search_chroma(query, where=where, n=k))
-
-        out: List[Dict[str, Any]] = []
-        for h in hits:
-            _id = ""
-            _txt = ""
-            _scr: Optional[float] = None
-            _met: Dict[str, Any] = {}
-
-            if isinstance(h, (list, tuple)):
-                if len(h) > 0 and h[0] is not None:
-                    _id = str(h[0])
-                if len(h) > 1 and h[1] is not None:
-                    _txt = str(h[1])
-                if len(h) > 2:
-                    _scr = h[2]
-                if len(h) > 3 and isinstance(h[3], dict):
-                    _met = h[3]
-            elif isinstance(h, dict):
-                _id  = "" if h.get("id")   is None else str(h.get("id"))
-                _txt = "" if h.get("text") is None else str(h.get("text"))
-                _scr = h.get("score")
-                meta_candidate = h.get("meta") or h.get("metadata")
-                if isinstance(meta_candidate, dict):
-                    _met = meta_candidate
-
-            out.append({"id": _id, "text": _txt, "meta": _met, "score": _scr})
-        return out
-
-    # chroma
-    return _flatten_chroma(_search_chroma(query, where=where, n=k))
+    return _flatten_chroma(retrieve(query, top_k=n, where=where))
@@ -0,0 +1,285 @@
+# app/app/infra/vector/alias_index.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import json, logging, os, re, threading, time, unicodedata
+from collections import deque
+
+from . import chroma_store
+
+log = logging.getLogger("alias_index")
+
+FORMAT = 2   # 저장본 형식(1: 제목도 탐지 키였음 → 재빌드)
+MANUAL_MIN_LEN = 2   # 손으로 고른 별칭("귀칼" 등)은 짧아도 탐지
+
+def norm_alias(s: str) -> str:
+    """ingest_namu_v3._norm과 같은 규칙(NFKC, 소문자, 공백/기호 제거) → aliases_norm_csv와 같은 공간."""
+    s = unicodedata.normalize("NFKC", s or "").lower()
+    return re.sub(r"[\s\W_]+", "", s, flags=re.UNICODE)
+
+# ───────────── Aho-Corasick (pyahocorasick 있으면 사용) ─────────────
+class _PyAutomaton:
+    """pyahocorasick.Automaton의 add_word / make_automaton / iter 부분만 구현한 순수 파이썬 폴백."""
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Any]] = [[]]
+
+    def add_word(self, key: str, value: Any) -> None:
+        s = 0
+        for ch in key:
+            nxt = self._goto[s].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[s][ch] = nxt
+                self._goto.append({}); self._fail.append(0); self._out.append([])
+            s = nxt
+        self._out[s].append(value)
+
+    def make_automaton(self) -> None:
+        q = deque(self._goto[0].values())
+        while q:
+            s = q.popleft()
+            for ch, t in self._goto[s].items():
+                q.append(t)
+                if s:
+                    f = self._fail[s]
+                    while f and ch not in self._goto[f]:
+                        f = self._fail[f]
+                    self._fail[t] = self._goto[f].get(ch, 0)
+                self._out[t] = self._out[t] + self._out[self._fail[t]]
+
+    def iter(self, text: str):
+        s = 0
+        for i, ch in enumerate(text):
+            while s and ch not in self._goto[s]:
+                s = self._fail[s]
+            s = self._goto[s].get(ch, 0)
+            for v in self._out[s]:
+                yield i, v
+
+def _new_automaton() -> Any:
+    try:
+        import ahocorasick  # pip install pyahocorasick
+        return ahocorasick.Automaton()
+    except Exception:
+        return _PyAutomaton()
+
+class AliasIndex:
+    """
+    정규화 별칭 → 별칭 그룹(문서 단위: 표시용 제목/별칭 목록).
+    - 탐지 키는 컬렉션 메타의 aliases_csv/aliases_norm_csv만(제목은 확장 결과로만 씀). 짧은 제목이
+      질의 속 일반 단어에 걸려 엉뚱한 작품을 부스트하지 않도록
+    - 질의 탐지는 Aho-Corasick 1패스(질의 길이에 선형, 사전 크기와 무관), 매치는 어절 시작에서만 인정
+    """
+    def __init__(self, *, min_len: int = 3):
+        self.min_len = int(min_len)
+        self._lock = threading.RLock()
+        self._groups: Dict[str, List[str]] = {}          # group key(doc_id 등) → 표시 문자열
+        self._keys: Dict[str, Set[str]] = {}             # 정규화 별칭 → group keys
+        self._ac: Any = None
+        self._dirty = True
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._groups.clear(); self._keys.clear()
+            self._ac = None; self._dirty = True
+
+    def add_group(self, gkey: str, display: Iterable[str], norms: Iterable[str] = (), *,
+                  index_display: bool = True, min_len: Optional[int] = None) -> None:
+        """display는 확장 결과. 탐지 키는 norms(+ index_display면 display의 정규화형), min_len 미만은 버림."""
+        min_len = self.min_len if min_len is None else int(min_len)
+        with self._lock:
+            disp = self._groups.setdefault(gkey, [])
+            for d in display:
+                d = (d or "").strip()
+                if d and d not in disp:
+                    disp.append(d)
+            for n in list(norms) + ([norm_alias(d) for d in disp] if index_display else []):
+                if len(n) >= min_len:
+                    self._keys.setdefault(n, set()).add(gkey)
+            self._dirty = True
+
+    def add_metas(self, metas: Iterable[Dict[str, Any]]) -> None:
+        seen: Set[str] = set()
+        for m in metas:
+            m = m or {}
+            did = m.get("doc_id")
+            if not did or did in seen:
+                continue
+            seen.add(did)
+            aliases = [x for x in str(m.get("aliases_csv") or "").split("|") if x]
+            norms = [x for x in str(m.get("aliases_norm_csv") or "").split("|") if x]
+            norms += [norm_alias(a) for a in aliases]
+            if not norms:
+                continue
+            display = [m.get("title") or "", m.get("seed_title") or m.get("seed") or ""] + aliases
+            self.add_group(f"doc:{did}", display, norms, index_display=False)
+
+    def _compile(self) -> Any:
+        with self._lock:
+            if self._dirty or self._ac is None:
+                ac = _new_automaton()
+                for n in self._keys:
+                    ac.add_word(n, n)
+                if self._keys:
+                    ac.make_automaton()
+                self._ac = ac if self._keys else None
+                self._dirty = False
+            return self._ac
+
+    def find(self, text: str) -> List[str]:
+        """
+        질의 안의 별칭(정규화형). 어절(공백 단위) 시작에서 시작하는 매치만 인정하고
+        (뒤쪽은 조사가 붙으므로 보지 않음), 다른 매치에 완전히 포함되는 짧은 매치는 제외.
+        """
+        ac = self._compile()
+        if ac is None:
+            return []
+        starts: Set[int] = set()
+        qn = ""
+        for tok in (text or "").split():
+            starts.add(len(qn))
+            qn += norm_alias(tok)
+        spans: List[Tuple[int, int, str]] = []
+        for end, key in ac.iter(qn):
+            if end - len(key) + 1 in starts:
+                spans.append((end - len(key) + 1, end, key))
+        spans.sort(key=lambda x: (x[0], -(x[1] - x[0])))
+        out: List[str] = []
+        for s, e, key in spans:
+            if any(s2 <= s and e <= e2 and (e2 - s2) > (e - s) for s2, e2, _ in spans):
+                continue
+            if key not in out:
+                out.append(key)
+        return out
+
+    def expand(self, text: str, *, limit: int = 4) -> List[str]:
+        """매칭된 별칭 그룹의 표시 문자열(제목 우선)을 최대 limit개. 질의에 이미 있는 형태는 제외."""
+        out: List[str] = []
+        with self._lock:
+            found = self.find(text)
+            for key in found:
+                for g in sorted(self._keys.get(key, ())):
+                    for d in self._groups.get(g, []):
+                        if d not in out and norm_alias(d) not in found:
+                            out.append(d)
+                        if len(out) >= limit:
+                            return out
+        return out
+
+    # ───────── persist ─────────
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with self._lock:
+            data = {"format": FORMAT, "min_len": self.min_len, "groups": self._groups,
+                    "keys": {k: sorted(v) for k, v in self._keys.items()}, "saved_at": time.time()}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def load(self, path: Path) -> bool:
+        """저장본 로드. 형식/최소 길이가 지금 설정과 다르면 False(호출 측이 재빌드)."""
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if data.get("format") != FORMAT or int(data.get("min_len", -1)) != self.min_len:
+            return False
+        with self._lock:
+            self._groups = {k: list(v) for k, v in (data.get("groups") or {}).items()}
+            self._keys = {k: set(v) for k, v in (data.get("keys") or {}).items()}
+            self._dirty = True
+        return True
+
+    def build_from_collection(self, coll: Any = None, *, batch: int = 5000) -> int:
+        coll = coll if coll is not None else chroma_store.get_collection()
+        t0 = time.perf_counter()
+        with self._lock:
+            self._groups.clear(); self._keys.clear(); self._dirty = True
+            offset = 0
+            while True:
+                got = coll.get(include=["metadatas"], limit=batch, offset=offset)
+                ids = got.get("ids") or []
+                if not ids:
+                    break
+                self.add_metas(got.get("metadatas") or [])
+                offset += len(ids)
+        log.info(f"[alias_index] built aliases={len(self._keys)} groups={len(self._groups)} "
+                 f"in {(time.perf_counter() - t0) * 1000:.0f}ms")
+        return len(self._keys)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "aliases": len(self._keys), "groups": len(self._groups),
+                "automaton": type(self._ac).__module__ if self._ac is not None else None}
+
+# ───────────── singleton + hooks ─────────────
+_index = AliasIndex(min_len=int(os.getenv("RAG_ALIAS_MIN_LEN", "3")))
+_build_lock = threading.Lock()
+_manual: Dict[str, List[str]] = {}
+_pending: List[Dict[str, Any]] = []   # 로드/빌드 전에 들어온 upsert 메타(별칭 있는 것만) → ready 직전에 반영
+_pending_lock = threading.Lock()
+_ALIAS_FIELDS = ("doc_id", "title", "seed_title", "seed", "aliases_csv", "aliases_norm_csv")
+
+def index_path() -> Path:
+    return Path(chroma_store.persist_dir()) / f"alias_{chroma_store.collection_name()}.json"
+
+def set_manual_aliases(alias_map: Dict[str, List[str]]) -> None:
+    """손으로 관리하는 별칭 맵(config.ALIAS_MAP)도 같은 오토마톤에 그룹으로 넣는다."""
+    _manual.clear(); _manual.update(alias_map or {})
+    for k, vs in _manual.items():
+        _index.add_group(f"manual:{k}", [k] + list(vs), min_len=MANUAL_MIN_LEN)
+
+def get_alias_index() -> AliasIndex:
+    """저장본 로드 → 없으면 컬렉션 메타로 빌드 후 저장(최초 1회)."""
+    if not _index.ready:
+        with _build_lock:
+            if not _index.ready:
+                p = index_path()
+                try:
+                    if not (p.exists() and _index.load(p)):
+                        _index.build_from_collection()
+                        _index.save(p)
+                except Exception as e:
+                    log.warning(f"[alias_index] load/build failed: {e} → manual aliases only")
+                set_manual_aliases(dict(_manual))
+                with _pending_lock:
+                    if _pending:
+                        _index.add_metas(_pending)
+                        log.info(f"[alias_index] applied {len(_pending)} pending upserts")
+                        _pending.clear()
+                    _index.ready = True
+    return _index
+
+def save_alias_index() -> str:
+    p = index_path()
+    get_alias_index().save(p)
+    return str(p)
+
+def _on_upsert(ids: List[str], documents: List[str], metas: List[Dict[str, Any]]) -> None:
+    # 아직 로드/빌드 전이면 별칭 필드만 쌓아 두고 ready 직전에 반영(적재 훅 안에서 전체 빌드를 돌리지 않도록).
+    # 저장본을 로드하는 경로(ingest 끝의 save_alias_index 등)에서도 새 작품 별칭이 빠지지 않게
+    with _pending_lock:
+        if not _index.ready:
+            _pending.extend({f: m[f] for f in _ALIAS_FIELDS if f in m}
+                            for m in (metas or []) if m and (m.get("aliases_csv") or m.get("aliases_norm_csv")))
+            return
+    _index.add_metas(metas)
+
+def _on_reset() -> None:
+    with _pending_lock:
+        _pending.clear()
+    _index.clear()
+    try:
+        index_path().unlink()
+    except FileNotFoundError:
+        pass
+    set_manual_aliases(dict(_manual))
+
+chroma_store.on_upsert(_on_upsert)
+chroma_store.on_reset(_on_reset)
+
+def alias_index_stats() -> Dict[str, Any]:
+    return {**_index.stats(), "pending": len(_pending)}
@@ -0,0 +1,322 @@
+# app/app/infra/vector/bm25_index.py
+from __future__ import annotations
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json, logging, os, re, shutil, threading, time, unicodedata
+import numpy as np
+
+from . import chroma_store
+from .sidecar import drop_dir, live_dir, swap_dir
+
+log = logging.getLogger("bm25_index")
+
+_WORD = re.compile(r"[^\W_]+")
+
+def char_ngrams(text: str, n: int = 2) -> List[str]:
+    """
+    한국어용 문자 n-gram 토큰. NFKC+소문자 후 단어(문자/숫자 연속) 안에서만 n-gram,
+    n보다 짧은 단어는 통째로 토큰. 조사/띄어쓰기 변형에 강하고 형태소 분석기가 필요 없다.
+    """
+    s = unicodedata.normalize("NFKC", text or "").lower()
+    out: List[str] = []
+    for w in _WORD.findall(s):
+        if len(w) <= n:
+            out.append(w)
+        else:
+            out.extend(w[i:i + n] for i in range(len(w) - n + 1))
+    return out
+
+class BM25Index:
+    """
+    청크 텍스트 문자 n-gram BM25 역색인(순수 numpy).
+    - 추가분은 COO(term, doc, tf) 조각으로 쌓아 두고, 검색 시 필요하면 CSR로 컴파일
+    - 같은 id 재추가/삭제는 tombstone → 컴파일 때 압축
+    - 저장은 .npy(mmap 로드 가능) + vocab/ids JSON
+    """
+    def __init__(self, *, k1: float = 1.2, b: float = 0.75, ngram: int = 2):
+        self.k1, self.b, self.ngram = float(k1), float(b), int(ngram)
+        self._lock = threading.RLock()
+        self._reset_state()
+
+    def _reset_state(self) -> None:
+        self.vocab: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self._pos: Dict[str, int] = {}
+        self._alive: List[bool] = []
+        self._len: List[int] = []
+        self._coo: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        # 컴파일 결과
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._docs = np.zeros(0, dtype=np.int32)
+        self._tfs = np.zeros(0, dtype=np.float32)
+        self._dl = np.zeros(0, dtype=np.float32)
+        self._idf = np.zeros(0, dtype=np.float32)
+        self._avgdl = 1.0
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+    # ───────── build ─────────
+    def add(self, ids: Iterable[str], texts: Iterable[str]) -> None:
+        terms: List[int] = []; docs: List[int] = []; tfs: List[int] = []
+        with self._lock:
+            for cid, text in zip(ids, texts):
+                cid = str(cid)
+                old = self._pos.get(cid)
+                if old is not None:
+                    self._alive[old] = False
+                cnt = Counter(char_ngrams(text, self.ngram))
+                d = len(self.ids)
+                self.ids.append(cid); self._alive.append(True); self._len.append(sum(cnt.values()))
+                self._pos[cid] = d
+                for tok, tf in cnt.items():
+                    t = self.vocab.get(tok)
+                    if t is None:
+                        t = self.vocab[tok] = len(self.vocab)
+                    terms.append(t); docs.append(d); tfs.append(tf)
+            if terms:
+                self._coo.append((np.asarray(terms, dtype=np.int32), np.asarray(docs, dtype=np.int32),
+                                  np.asarray(tfs, dtype=np.float32)))
+            self._dirty = True
+
+    def remove(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            for cid in ids:
+                d = self._pos.pop(str(cid), None)
+                if d is not None:
+                    self._alive[d] = False
+                    self._dirty = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset_state()
+
+    def _compile(self) -> None:
+        """COO 조각 + 기존 CSR → 죽은 문서 제거/재번호 → term 기준 CSR, idf/문서길이 갱신."""
+        with self._lock:
+            if not self._dirty:
+                return
+            parts = self._coo
+            if self._docs.size:
+                base_terms = np.repeat(np.arange(len(self._indptr) - 1, dtype=np.int32), np.diff(self._indptr))
+                parts = [(base_terms, np.asarray(self._docs), np.asarray(self._tfs))] + parts
+            T = np.concatenate([p[0] for p in parts]) if parts else np.zeros(0, np.int32)
+            D = np.concatenate([p[1] for p in parts]) if parts else np.zeros(0, np.int32)
+            F = np.concatenate([p[2] for p in parts]) if parts else np.zeros(0, np.float32)
+
+            alive = np.asarray(self._alive, dtype=bool)
+            remap = np.cumsum(alive, dtype=np.int64) - 1
+            keep = alive[D] if D.size else np.zeros(0, dtype=bool)
+            T, D, F = T[keep], remap[D[keep]].astype(np.int32), F[keep]
+
+            self.ids = [cid for cid, a in zip(self.ids, self._alive) if a]
+            self._len = [l for l, a in zip(self._len, self._alive) if a]
+            self._alive = [True] * len(self.ids)
+            self._pos = {cid: i for i, cid in enumerate(self.ids)}
+
+            order = np.lexsort((D, T))
+            T, D, F = T[order], D[order], F[order]
+            V = len(self.vocab)
+            df = np.bincount(T, minlength=V)
+            self._indptr = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+            self._docs, self._tfs = D, F
+            self._dl = np.asarray(self._len, dtype=np.float32)
+            N = max(1, len(self.ids))
+            self._avgdl = float(self._dl.mean()) if self._dl.size else 1.0
+            self._idf = np.log1p((N - df + 0.5) / (df + 0.5)).astype(np.float32)
+            self._coo = []
+            self._dirty = False
+
+    # ───────── search ─────────
+    def search(self, q: str, n: int = 50) -> List[Tuple[str, float]]:
+        """BM25 상위 n개 (청크 id, 점수). 질의 토큰은 중복 제거(짧은 질의라 qtf 무의미)."""
+        self._compile()
+        with self._lock:
+            if not self.ids:
+                return []
+            toks = {self.vocab[t] for t in char_ngrams(q, self.ngram) if t in self.vocab}
+            if not toks:
+                return []
+            docs: List[np.ndarray] = []; contrib: List[np.ndarray] = []
+            norm = self.k1 * (1.0 - self.b + self.b * self._dl / max(self._avgdl, 1e-6))
+            for t in toks:
+                s, e = int(self._indptr[t]), int(self._indptr[t + 1])
+                if s == e:
+                    continue
+                d = self._docs[s:e]; tf = self._tfs[s:e]
+                docs.append(d)
+                contrib.append(self._idf[t] * tf * (self.k1 + 1.0) / (tf + norm[d]))
+            if not docs:
+                return []
+            scores = np.bincount(np.concatenate(docs), weights=np.concatenate(contrib), minlength=len(self.ids))
+            nz = np.flatnonzero(scores)
+            if nz.size > n:
+                nz = nz[np.argpartition(-scores[nz], n - 1)[:n]]
+            nz = nz[np.argsort(-scores[nz], kind="stable")]
+            return [(self.ids[i], float(scores[i])) for i in nz]
+
+    # ───────── persist ─────────
+    def save(self, path: Path) -> None:
+        """임시 폴더에 쓰고 교체(부분 저장본이 읽히지 않도록)."""
+        self._compile()
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with self._lock:
+            shutil.rmtree(tmp, ignore_errors=True)
+            tmp.mkdir(parents=True, exist_ok=True)
+            np.save(tmp / "indptr.npy", self._indptr)
+            np.save(tmp / "docs.npy", self._docs)
+            np.save(tmp / "tfs.npy", self._tfs)
+            np.save(tmp / "doc_len.npy", np.asarray(self._len, dtype=np.int32))
+            (tmp / "vocab.json").write_text(json.dumps(self.vocab, ensure_ascii=False), encoding="utf-8")
+            (tmp / "ids.json").write_text(json.dumps(self.ids, ensure_ascii=False), encoding="utf-8")
+            (tmp / "meta.json").write_text(json.dumps(
+                {"k1": self.k1, "b": self.b, "ngram": self.ngram, "docs": len(self.ids), "saved_at": time.time()}
+            ), encoding="utf-8")
+            swap_dir(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        path = live_dir(path)
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        idx = cls(k1=meta.get("k1", 1.2), b=meta.get("b", 0.75), ngram=meta.get("ngram", 2))
+        idx.vocab = json.loads((path / "vocab.json").read_text(encoding="utf-8"))
+        idx.ids = json.loads((path / "ids.json").read_text(encoding="utf-8"))
+        idx._pos = {cid: i for i, cid in enumerate(idx.ids)}
+        idx._alive = [True] * len(idx.ids)
+        idx._len = np.load(path / "doc_len.npy").tolist()
+        idx._indptr = np.load(path / "indptr.npy", mmap_mode="r")
+        idx._docs = np.load(path / "docs.npy", mmap_mode="r")
+        idx._tfs = np.load(path / "tfs.npy", mmap_mode="r")
+        # 문서길이/idf는 작으니 메모리에서 재계산
+        idx._dl = np.asarray(idx._len, dtype=np.float32)
+        idx._avgdl = float(idx._dl.mean()) if idx._dl.size else 1.0
+        df = np.diff(idx._indptr)
+        N = max(1, len(idx.ids))
+        idx._idf = np.log1p((N - df + 0.5) / (df + 0.5)).astype(np.float32)
+        idx._dirty = False
+        return idx
+
+    def stats(self) -> Dict[str, Any]:
+        return {"docs": len(self), "vocab": len(self.vocab), "postings": int(self._docs.size),
+                "pending_chunks": len(self._coo), "ngram": self.ngram}
+
+# ───────────── singleton + hooks ─────────────
+_index: Optional[BM25Index] = None
+_index_lock = threading.Lock()
+# 다른 프로세스(CLI ingest)가 새 버전을 쓰면 다시 로드: 지금 인덱스의 저장본 버전과 CURRENT를 주기적으로 비교.
+# 이 프로세스의 upsert가 아직 저장 전(_unsaved)이면 덮어쓰지 않음
+_loaded_dir: Optional[Path] = None
+_unsaved = False
+_checked_at = 0.0
+
+def enabled() -> bool:
+    return os.getenv("RAG_BM25", "1") == "1"
+
+def index_path() -> Path:
+    """Chroma 폴더 옆(같은 폴더 안)에 컬렉션별로 저장."""
+    return Path(chroma_store.persist_dir()) / f"bm25_{chroma_store.collection_name()}"
+
+def _load(p: Path) -> Optional[BM25Index]:
+    global _loaded_dir
+    live = live_dir(p)
+    if not (live / "meta.json").exists():
+        return None
+    t0 = time.perf_counter()
+    try:
+        idx = BM25Index.load(p)
+    except Exception as e:
+        log.warning(f"[bm25] load failed ({p}): {e}")
+        return None
+    _loaded_dir = live
+    log.info(f"[bm25] loaded docs={len(idx)} from {live} in {(time.perf_counter() - t0) * 1000:.0f}ms")
+    return idx
+
+def _maybe_reload() -> None:
+    """RAG_BM25_RELOAD_S(기본 5초)마다 CURRENT만 읽어 보고, 다른 버전이면 새로 로드해 교체(0이면 끔)."""
+    global _index, _checked_at
+    every = float(os.getenv("RAG_BM25_RELOAD_S", "5"))
+    now = time.monotonic()
+    if every <= 0 or _unsaved or now - _checked_at < every:
+        return
+    _checked_at = now
+    p = index_path()
+    if live_dir(p) == _loaded_dir:
+        return
+    with _index_lock:
+        if _unsaved or live_dir(p) == _loaded_dir:
+            return
+        idx = _load(p)
+        if idx is not None:
+            _index = idx
+
+def get_bm25_index() -> BM25Index:
+    """저장본이 있으면 mmap 로드, 없으면 빈 인덱스(ingest가 채움). 다른 프로세스가 저장본을 바꾸면 다시 로드."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                p = index_path()
+                _index = _load(p)
+                if _index is None:
+                    _index = BM25Index(ngram=int(os.getenv("RAG_BM25_NGRAM", "2")))
+    else:
+        _maybe_reload()
+    return _index
+
+def save_bm25_index() -> Optional[str]:
+    """ingest 끝에서 호출. 비활성이면 None."""
+    if not enabled():
+        return None
+    global _loaded_dir, _unsaved
+    p = index_path()
+    idx = get_bm25_index()
+    idx.save(p)
+    _loaded_dir, _unsaved = live_dir(p), False
+    log.info(f"[bm25] saved docs={len(idx)} → {p}")
+    return str(p)
+
+def rebuild_from_collection(batch: int = 2000) -> int:
+    """기존 컬렉션(이 기능 이전에 적재된 것 포함)에서 전체 재구축 후 저장."""
+    global _unsaved
+    coll = chroma_store.get_collection()
+    _unsaved = True
+    idx = get_bm25_index()
+    idx.clear()
+    offset = 0
+    while True:
+        got = coll.get(include=["documents"], limit=batch, offset=offset)
+        ids = got.get("ids") or []
+        if not ids:
+            break
+        idx.add(ids, got.get("documents") or [""] * len(ids))
+        offset += len(ids)
+    save_bm25_index()
+    return len(idx)
+
+def _on_upsert(ids: List[str], documents: List[str], metas: List[Dict[str, Any]]) -> None:
+    global _unsaved
+    if enabled():
+        _unsaved = True
+        get_bm25_index().add(ids, documents)
+
+def _on_reset() -> None:
+    global _loaded_dir
+    if _index is not None:
+        _index.clear()
+    drop_dir(index_path())
+    _loaded_dir = live_dir(index_path())
+
+chroma_store.on_upsert(_on_upsert)
+chroma_store.on_reset(_on_reset)
+
+def bm25_stats() -> Dict[str, Any]:
+    return {"enabled": enabled(), "version": _loaded_dir.name if _loaded_dir is not None else None,
+            **(_index.stats() if _index is not None else {"loaded": False})}
+
+if __name__ == "__main__":
+    # python -m app.app.infra.vector.bm25_index  → 현재 컬렉션 기준 재구축
+    logging.basicConfig(level=logging.INFO)
+    print({"docs": rebuild_from_collection(), "path": str(index_path())})
@@ -62,6 +62,48 @@ _lock = threading.Lock()
 _EMBED_FN: Any = None  # 최종적으로 Chroma가 허용하는 EF 객체
 _EMBED_FN_LOCK = threading.Lock()
 
+# ───────────── change hooks ─────────────
+# 로컬 보조 인덱스(doc_id→청크 등)가 컬렉션 변경을 따라가도록 upsert/reset 시 호출
+_UPSERT_HOOKS: List[Callable[[List[str], List[str], List[Dict[str, Any]]], None]] = []
+_RESET_HOOKS: List[Callable[[], None]] = []
+# 컬렉션 세대: 내용이 바뀔 때마다 +1 → 결과/답변 캐시 무효화 기준
+_generation = 0
+_gen_lock = threading.Lock()
+
+def collection_generation() -> int:
+    return _generation
+
+def bump_generation() -> int:
+    global _generation
+    with _gen_lock:
+        _generation += 1
+        return _generation
+
+def on_upsert(fn: Callable[[List[str], List[str], List[Dict[str, Any]]], None]) -> None:
+    """fn(ids, documents, metadatas) 등록."""
+    if fn not in _UPSERT_HOOKS:
+        _UPSERT_HOOKS.append(fn)
+
+def on_reset(fn: Callable[[], None]) -> None:
+    if fn not in _RESET_HOOKS:
+        _RESET_HOOKS.append(fn)
+
+def _fire_upsert(ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]) -> None:
+    bump_generation()
+    for fn in list(_UPSERT_HOOKS):
+        try:
+            fn(ids, documents, metadatas)
+        except Exception as e:
+            log.warning(f"[Chroma] upsert hook failed ({getattr(fn, '__name__', fn)}): {e}")
+
+def _fire_reset() -> None:
+    bump_generation()
+    for fn in list(_RESET_HOOKS):
+        try:
+            fn()
+        except Exception as e:
+            log.warning(f"[Chroma] reset hook failed ({getattr(fn, '__name__', fn)}): {e}")
+
 # ───────────── config helpers ─────────────
 def _db_path() -> str:
     return (
@@ -74,6 +116,13 @@ def _db_path() -> str:
 def _col_name() -> str:
     return getattr(config, "CHROMA_COLLECTION", "namu_anime_v3")
 
+def persist_dir() -> str:
+    """Chroma 저장 폴더(보조 인덱스들이 같은 위치에 파일을 둔다)."""
+    return _db_path()
+
+def collection_name() -> str:
+    return _col_name()
+
 def _space() -> str:
     return str(getattr(config, "CHROMA_SPACE", "cosine")).lower()
 
@@ -288,6 +337,7 @@ def reset_collection() -> None:
             log.warning(f"[Chroma] delete_collection ignored: {e}")
         mode = _attach_ef_mode()
         _coll = _open_with_mode(_client, _col_name(), _space(), mode)
+    _fire_reset()
 
 def hard_reset_persist_dir() -> None:
     """저장 폴더 자체를 날리고 완전 초기화."""
@@ -301,6 +351,7 @@ def hard_reset_persist_dir() -> None:
     _client = None
     _coll = None
     _ensure_client_and_collection()
+    _fire_reset()
 
 def upsert(
     ids: List[str],
@@ -323,12 +374,14 @@ def upsert(
     except Exception:
         pass
 
+    clean_metas = [_sanitize_meta(m) for m in metadatas]
     coll.add(
         ids=ids,
         documents=documents,
-        metadatas=[_sanitize_meta(m) for m in metadatas],
+        metadatas=clean_metas,
         embeddings=embeddings,  # None이면 collection EF 사용
     )
+    _fire_upsert(ids, documents, clean_metas)
 
 def upsert_batch(
     batch: List[tuple[str, str, Dict[str, Any]]],
@@ -357,15 +410,29 @@ def upsert_batch(
     embs = emb_fn(docs)
     upsert(ids, docs, metas, embs)
 
-def _build_include(include_docs: bool, include_metas: bool, include_distances: bool) -> Optional[List[str]]:
+def _build_include(
+    include_docs: bool, include_metas: bool, include_distances: bool, include_embeddings: bool = False
+) -> Optional[List[str]]:
     include: List[str] = []
     if include_docs: include.append("documents")
     if include_metas: include.append("metadatas")
     if include_distances: include.append("distances")
+    if include_embeddings: include.append("embeddings")
     if not include:
         return None
     return [x for x in include if x in _VALID_INCLUDE] or None
 
+def _embed_query(query: str) -> List[float]:
+    """EF의 embed_query(쿼리 prefix + 캐시) 경유로 쿼리 벡터 1개 생성."""
+    emb_obj = _get_embed_fn()
+    try:
+        return emb_obj.embed_query(query)  # 객체형
+    except AttributeError:
+        return emb_obj([query])[0]         # 함수형 어댑터
+
+def _as_vector(v: Any) -> List[float]:
+    return v.tolist() if hasattr(v, "tolist") else list(v)
+
 def search(
     query: str = "",
     *,
@@ -377,10 +444,12 @@ def search(
     include_metas: bool = True,
     include_ids: bool = True,  # 유지하되 무시(Chroma 0.5+에선 include로 금지; ids는 항상 반환)
     include_distances: bool = True,
+    include_embeddings: bool = False,  # 저장된 청크 벡터 동봉(MMR 재임베딩 생략용)
 ) -> Dict[str, Any]:
     """
-    기본: query_texts(컬렉션 EF 경유)
-    실패 시: 직접 임베딩해서 query_embeddings로 폴백
+    기본: query_embeddings(호출자가 넘긴 벡터, list 또는 np.ndarray)
+    텍스트만 온 경우: EF.embed_query로 직접 임베딩해서 query_embeddings로 조회
+      (query_texts 경로는 EF가 __call__=문서 인코딩으로 한 번 더 임베딩하므로 사용하지 않음)
     """
     coll = get_collection()
     k = _top_k_default() if n is None else max(1, min(int(n), 100))
@@ -388,7 +457,7 @@ def search(
     if (not query) and (query_embeddings is None):
         raise ValueError("either 'query' (text) or 'query_embeddings' must be provided")
 
-    include = _build_include(include_docs, include_metas, include_distances)
+    include = _build_include(include_docs, include_metas, include_distances, include_embeddings)
     if include_ids:
         log.debug("[Chroma] include_ids=True (ignored; ids are returned by default)")
 
@@ -397,28 +466,56 @@ def search(
     if where: q_kwargs["where"] = where
     if where_document: q_kwargs["where_document"] = where_document
 
-    # 1) 클라이언트가 임베딩을 넘긴 경우
-    if query_embeddings is not None:
-        q_kwargs["query_embeddings"] = [query_embeddings]
-        res = coll.query(**q_kwargs)
-        return {"space": _space(), **res}
+    emb = _as_vector(query_embeddings) if query_embeddings is not None else _embed_query(query)
+    q_kwargs["query_embeddings"] = [emb]
+    res = coll.query(**q_kwargs)
+    return {"space": _space(), **res}
 
-    # 2) 텍스트 → EF 경유 시도, 실패 시 직접 임베딩 폴백
-    try:
-        q_kwargs["query_texts"] = [query]
-        res = coll.query(**q_kwargs)
-        return {"space": _space(), **res}
-    except Exception as e:
-        log.warning(f"[Chroma] query_texts failed, fallback to query_embeddings: {e}")
-        emb_obj = _get_embed_fn()
-        try:
-            emb = emb_obj.embed_query(query)  # 객체형
-        except AttributeError:
-            emb = emb_obj([query])[0]         # 함수형 어댑터
-        q_kwargs.pop("query_texts", None)
-        q_kwargs["query_embeddings"] = [emb]
-        res = coll.query(**q_kwargs)
-        return {"space": _space(), **res}
+def search_many(
+    query_embeddings: List[List[float]],
+    *,
+    where: Optional[Dict[str, Any]] = None,
+    where_document: Optional[Dict[str, Any]] = None,
+    n: Optional[int] = None,
+    include_docs: bool = True,
+    include_metas: bool = True,
+    include_distances: bool = True,
+    include_embeddings: bool = False,
+) -> Dict[str, Any]:
+    """
+    여러 쿼리 벡터를 coll.query 한 번으로 조회(HNSW 탐색/왕복 1회).
+    반환은 Chroma 원형 그대로: ids/documents/... 가 쿼리별 배치 리스트.
+    """
+    coll = get_collection()
+    k = _top_k_default() if n is None else max(1, min(int(n), 100))
+    embs = [_as_vector(v) for v in (query_embeddings if query_embeddings is not None else [])]
+    if not embs:
+        raise ValueError("'query_embeddings' must contain at least one vector")
+
+    q_kwargs: Dict[str, Any] = {"n_results": k, "query_embeddings": embs}
+    include = _build_include(include_docs, include_metas, include_distances, include_embeddings)
+    if include: q_kwargs["include"] = include
+    if where: q_kwargs["where"] = where
+    if where_document: q_kwargs["where_document"] = where_document
+
+    res = coll.query(**q_kwargs)
+    return {"space": _space(), **res}
+
+def get_by_ids(
+    ids: List[str],
+    *,
+    include_docs: bool = True,
+    include_metas: bool = True,
+    include_embeddings: bool = False,
+) -> Dict[str, Any]:
+    """id 배치 조회(coll.get 1회). 반환은 Chroma get 원형(ids/documents/metadatas 평면 리스트)."""
+    if not ids:
+        return {"ids": [], "documents": [], "metadatas": []}
+    include: List[str] = []
+    if include_docs: include.append("documents")
+    if include_metas: include.append("metadatas")
+    if include_embeddings: include.append("embeddings")
+    return get_collection().get(ids=list(ids), include=include)
 
 # ───────────── migration utils ─────────────
 def reembed_to_new_collection(
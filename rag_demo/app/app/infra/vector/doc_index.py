@@ -0,0 +1,149 @@
+# app/app/infra/vector/doc_index.py
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import logging, threading, time
+
+from . import chroma_store
+
+log = logging.getLogger("doc_index")
+
+# 확장 시 우선 섹션(낮을수록 먼저)
+_SECTION_PRIO = {"요약": 0, "본문": 1}
+
+def _prio_of(meta: Dict[str, Any]) -> int:
+    return _SECTION_PRIO.get((meta or {}).get("section") or "", 2)
+
+def _order_of(meta: Dict[str, Any]) -> int:
+    try:
+        return int((meta or {}).get("i") or 0)
+    except Exception:
+        return 0
+
+class DocSiblingIndex:
+    """
+    doc_id → 청크 id 목록(섹션 우선순위 요약/본문 → 나머지, 같은 섹션은 청크 순서).
+    컬렉션 메타데이터로 한 번 빌드하고, upsert 훅으로 증분 갱신.
+    빌드(offset 페이지 스캔) 중 들어온 upsert는 쌓아 두었다가 ready 직전에 반영 → 스캔 커서 뒤에 쓰인 청크도 빠지지 않음.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_doc: Dict[str, List[Tuple[int, int, int, str]]] = {}  # (prio, order, seq, id)
+        self._doc_of: Dict[str, str] = {}  # chunk id → doc_id
+        self._seq = 0
+        self._pend_lock = threading.Lock()
+        self._pending: List[Tuple[List[str], List[Dict[str, Any]]]] = []
+        self._building = False
+        self.ready = False
+        self.build_ms = 0.0
+
+    def __len__(self) -> int:
+        return len(self._doc_of)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_doc.clear()
+            self._doc_of.clear()
+            with self._pend_lock:
+                self._pending.clear()
+                self.ready = False
+
+    def add(self, ids: Iterable[str], metas: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            touched: Set[str] = set()
+            for cid, meta in zip(ids, metas):
+                cid = str(cid)
+                did = (meta or {}).get("doc_id")
+                old = self._doc_of.get(cid)
+                if old is not None:
+                    self._by_doc[old] = [e for e in self._by_doc.get(old, []) if e[3] != cid]
+                if not did:
+                    self._doc_of.pop(cid, None)
+                    continue
+                did = str(did)
+                self._seq += 1
+                self._by_doc.setdefault(did, []).append((_prio_of(meta), _order_of(meta), self._seq, cid))
+                self._doc_of[cid] = did
+                touched.add(did)
+            for did in touched:
+                self._by_doc[did].sort()
+
+    def upsert(self, ids: List[str], metas: List[Dict[str, Any]]) -> None:
+        """upsert 훅용: 준비됐으면 반영, 빌드 중이면 보류, 빌드 전이면 무시(빌드 때 컬렉션에서 읽힘)."""
+        with self._pend_lock:
+            if not self.ready:
+                if self._building:
+                    self._pending.append((list(ids), list(metas)))
+                return
+        self.add(ids, metas)
+
+    def siblings(self, doc_id: str, *, limit: Optional[int] = None, exclude: Optional[Set[str]] = None) -> List[str]:
+        with self._lock:
+            ent = self._by_doc.get(str(doc_id)) or []
+            out: List[str] = []
+            for _, _, _, cid in ent:
+                if exclude and cid in exclude:
+                    continue
+                out.append(cid)
+                if limit is not None and len(out) >= limit:
+                    break
+            return out
+
+    def build_from_collection(self, coll: Any = None, *, batch: int = 5000) -> int:
+        """컬렉션 메타데이터 전체를 페이지 단위로 읽어 빌드."""
+        coll = coll if coll is not None else chroma_store.get_collection()
+        t0 = time.perf_counter()
+        with self._pend_lock:
+            self._building = True
+            self._pending.clear()
+        try:
+            with self._lock:
+                self._by_doc.clear()
+                self._doc_of.clear()
+                offset = 0
+                while True:
+                    got = coll.get(include=["metadatas"], limit=batch, offset=offset)
+                    ids = got.get("ids") or []
+                    if not ids:
+                        break
+                    self.add(ids, got.get("metadatas") or [{}] * len(ids))
+                    offset += len(ids)
+                # 스캔 중 들어온 upsert 반영(이미 읽은 청크면 같은 id 재추가라 결과 동일)
+                with self._pend_lock:
+                    for ids, metas in self._pending:
+                        self.add(ids, metas)
+                    self._pending.clear()
+                    self.ready = True
+                self.build_ms = (time.perf_counter() - t0) * 1000.0
+        finally:
+            with self._pend_lock:
+                self._building = False
+        log.info(f"[doc_index] built chunks={len(self._doc_of)} docs={len(self._by_doc)} in {self.build_ms:.0f}ms")
+        return len(self._doc_of)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "docs": len(self._by_doc), "chunks": len(self._doc_of),
+                "build_ms": round(self.build_ms, 1)}
+
+# ───────────── singleton + hooks ─────────────
+_index = DocSiblingIndex()
+_build_lock = threading.Lock()
+
+def get_doc_index() -> DocSiblingIndex:
+    """준비 안 됐으면 동기 빌드(최초 1회)."""
+    if not _index.ready:
+        with _build_lock:
+            if not _index.ready:
+                _index.build_from_collection()
+    return _index
+
+def _on_upsert(ids: List[str], documents: List[str], metas: List[Dict[str, Any]]) -> None:
+    _index.upsert(ids, metas)
+
+def _on_reset() -> None:
+    _index.clear()
+
+chroma_store.on_upsert(_on_upsert)
+chroma_store.on_reset(_on_reset)
+
+def doc_index_stats() -> Dict[str, Any]:
+    return _index.stats()
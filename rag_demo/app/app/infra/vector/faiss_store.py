@@ -0,0 +1,242 @@
+# app/app/infra/vector/faiss_store.py
+"""
+VECTOR_BACKEND=faiss 용 파일 백엔드.
+- 빌드: Chroma 컬렉션 → DocTable(텍스트/메타/필터 컬럼) + faiss 인덱스(HNSW / IVF / Flat, 내적=코사인)
+- 로드: faiss IO_FLAG_MMAP(지원 안 되면 일반 로드), DocTable은 mmap → 시작이 빠르고 워커끼리 페이지 캐시 공유
+- 필터: where → DocTable 비트맵 행 집합. 통과 행이 적으면(RAG_PREFILTER_FILE_EXACT_MAX 이하) 그 행만 정확 검색,
+        많으면 IDSelector로 탐색 중에 거름
+- 양자화(--quant int8): SQ8 인덱스(차원별 int8)로 k×MULT개 → 원본 float32(mmap)로 그 행만 재채점
+- 반환: chroma_store.search / search_many / get_by_ids 와 같은 원형(dict, 배치 리스트 + space)
+
+python -m app.app.infra.vector.faiss_store --type hnsw [--quant int8]   → 현재 컬렉션 기준 빌드
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse, logging, os, shutil, threading, time
+import numpy as np
+
+from .file_store import FileVectorStore
+from .meta_index import FILE_EXACT_MAX
+from .quant import QUANT, RESCORE_MULT, file_mb, rescore
+from .sidecar import export_collection, live_dir, swap_dir, write_meta
+
+log = logging.getLogger("faiss_store")
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+INDEX_TYPE      = os.getenv("RAG_FAISS_INDEX", "hnsw").lower()   # hnsw | ivf | flat
+HNSW_M          = _env_int("RAG_FAISS_HNSW_M", 32)
+HNSW_EF_BUILD   = _env_int("RAG_FAISS_EF_CONSTRUCTION", 200)
+HNSW_EF_SEARCH  = _env_int("RAG_FAISS_EF_SEARCH", 128)
+IVF_NLIST       = _env_int("RAG_FAISS_NLIST", 0)                 # 0이면 4·sqrt(n)
+IVF_NPROBE      = _env_int("RAG_FAISS_NPROBE", 16)
+ADD_CHUNK       = 50_000
+
+def _faiss():
+    import faiss  # pip install faiss-cpu
+    return faiss
+
+def index_path() -> Path:
+    from . import chroma_store
+    return Path(os.getenv("RAG_FAISS_DIR") or
+                Path(chroma_store.persist_dir()) / f"faiss_{chroma_store.collection_name()}")
+
+# ───────────── build ─────────────
+def _new_index(faiss: Any, kind: str, dim: int, n: int, quant: str = "none") -> Any:
+    ip = faiss.METRIC_INNER_PRODUCT
+    sq = faiss.ScalarQuantizer.QT_8bit if quant == "int8" else None   # 차원별 min/max 8bit
+    if kind == "hnsw":
+        idx = faiss.IndexHNSWSQ(dim, sq, HNSW_M, ip) if sq is not None else faiss.IndexHNSWFlat(dim, HNSW_M, ip)
+        idx.hnsw.efConstruction = HNSW_EF_BUILD
+        return idx
+    if kind == "ivf":
+        nlist = IVF_NLIST or max(1, int(4 * np.sqrt(max(n, 1))))
+        coarse = faiss.IndexFlatIP(dim)
+        if sq is not None:
+            return faiss.IndexIVFScalarQuantizer(coarse, dim, nlist, sq, ip)
+        return faiss.IndexIVFFlat(coarse, dim, nlist, ip)
+    if kind == "flat":
+        return faiss.IndexScalarQuantizer(dim, sq, ip) if sq is not None else faiss.IndexFlatIP(dim)
+    raise ValueError(f"unknown faiss index type: {kind!r} (hnsw|ivf|flat)")
+
+def build_index(*, kind: str = INDEX_TYPE, batch: int = 2000, reuse_embeddings: bool = True,
+                quant: str = QUANT, path: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    컬렉션 전체를 내보내고 인덱스를 만든 뒤 임시 폴더 → 교체.
+    quant=int8이면 내보낸 float32 벡터(vectors.npy)를 재채점용으로 남긴다.
+    """
+    faiss = _faiss()
+    path = Path(path or index_path())
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    info = export_collection(tmp, batch=batch, reuse_embeddings=reuse_embeddings)
+    n, dim = info["rows"], info["dim"]
+    t0 = time.perf_counter()
+    vecs = np.load(tmp / "vectors.npy", mmap_mode="r")
+    idx = _new_index(faiss, kind, dim, n, quant)
+    if not idx.is_trained and n:
+        rng = np.random.default_rng(0)
+        size = min(n, getattr(idx, "nlist", 0) * 64 or 200_000)
+        idx.train(np.ascontiguousarray(vecs[np.sort(rng.choice(n, size=size, replace=False))]))
+    for s in range(0, n, ADD_CHUNK):
+        idx.add(np.ascontiguousarray(vecs[s:s + ADD_CHUNK]))
+        log.info(f"[faiss] added {min(s + ADD_CHUNK, n)}/{n}")
+    if kind == "ivf":
+        idx.make_direct_map()  # reconstruct(임베딩 동봉용) 지원
+    faiss.write_index(idx, str(tmp / "index.faiss"))
+    del vecs
+    if quant != "int8":
+        (tmp / "vectors.npy").unlink()
+    build_ms = round((time.perf_counter() - t0) * 1000.0)
+    write_meta(tmp, kind=kind, dim=dim, count=n, metric="ip", quant=quant, build_ms=build_ms,
+               params={"M": HNSW_M, "efConstruction": HNSW_EF_BUILD, "nlist": getattr(idx, "nlist", None)},
+               **{k: v for k, v in info.items() if k not in ("rows", "dim")})
+    swap_dir(tmp, path)
+    log.info(f"[faiss] built {kind} rows={n} dim={dim} in {build_ms}ms → {path}")
+    return {"path": str(path), "kind": kind, "rows": n, "dim": dim, "build_ms": build_ms}
+
+# ───────────── store ─────────────
+class FaissStore(FileVectorStore):
+    backend = "faiss"
+
+    def __init__(self, path: Path):
+        faiss = _faiss()
+        t0 = time.perf_counter()
+        super().__init__(path)
+        self.kind = self.info.get("kind", "hnsw")
+        f = str(self.path / "index.faiss")
+        try:
+            self.index = faiss.read_index(f, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            self.mmap = True
+        except Exception as e:  # 인덱스 종류/빌드에 따라 mmap 미지원
+            log.info(f"[faiss] mmap load unsupported ({e}); reading into memory")
+            self.index = faiss.read_index(f)
+            self.mmap = False
+        self.dim = int(self.index.d)
+        # 양자화 인덱스면 원본 float32를 mmap(재채점/임베딩 동봉 때 해당 행만 읽음)
+        self.full: Optional[np.ndarray] = None
+        if self.info.get("quant") == "int8" and (self.path / "vectors.npy").exists():
+            self.full = np.load(self.path / "vectors.npy", mmap_mode="r")
+        self.load_ms = round((time.perf_counter() - t0) * 1000.0, 1)
+        if self.index.ntotal != len(self.table):
+            raise RuntimeError(f"faiss index/table mismatch: {self.index.ntotal} vs {len(self.table)}")
+
+    def _params(self, k: int, mask: Optional[np.ndarray]) -> Any:
+        faiss = _faiss()
+        sel = _selector(faiss, mask) if mask is not None else None
+        if self.kind == "hnsw":
+            params = faiss.SearchParametersHNSW(efSearch=max(HNSW_EF_SEARCH, k))
+        elif self.kind == "ivf":
+            params = faiss.SearchParametersIVF(nprobe=IVF_NPROBE)
+        elif sel is not None:
+            params = faiss.SearchParameters()
+        else:
+            return None
+        if sel is not None:
+            params.sel = sel
+            params._sel_ref = sel  # C++ 쪽은 포인터만 들고 있으므로 파이썬 객체를 params에 묶어 둔다
+        return params
+
+    def _search(self, q: np.ndarray, k: int, mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        if mask is not None:
+            rows = np.flatnonzero(mask)
+            if rows.size <= max(FILE_EXACT_MAX, k):
+                return self._exact(q, rows, k)
+        kk = k * RESCORE_MULT if self.full is not None else k
+        params = self._params(kk, mask)
+        D, I = self.index.search(q, kk, params=params) if params is not None else self.index.search(q, kk)
+        if self.full is None:
+            return D, I
+        return rescore(q, I, self.full, k)
+
+    def reconstruct(self, rows: Sequence[int]) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        if self.full is not None:
+            return np.asarray(self.full[rows], dtype=np.float32)
+        try:
+            return self.index.reconstruct_batch(rows)
+        except Exception:
+            return np.stack([self.index.reconstruct(int(r)) for r in rows])
+
+    def memory(self) -> Dict[str, Any]:
+        """인덱스 파일(탐색 시 상주) vs 후보 행만 읽는 재채점 파일."""
+        return {"scan_mb": file_mb(self.path / "index.faiss"),
+                "rescore_mb": file_mb(self.path / "vectors.npy") if self.full is not None else 0.0}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "mmap": self.mmap, "load_ms": self.load_ms, "exact_max": FILE_EXACT_MAX,
+                "quant": self.info.get("quant", "none"), "rescore_mult": RESCORE_MULT,
+                **self.memory(), **super().stats()}
+
+def _selector(faiss: Any, mask: np.ndarray) -> Any:
+    """행 마스크 → IDSelector. 비트맵은 O(1) 판정(faiss ≥1.7.3), 없으면 id 배치(해시 집합)."""
+    if hasattr(faiss, "IDSelectorBitmap"):
+        bits = np.packbits(mask, bitorder="little")
+        sel = faiss.IDSelectorBitmap(mask.size, faiss.swig_ptr(bits))
+        sel._bits_ref = bits  # 비트맵은 복사되지 않으므로 검색이 끝날 때까지 살려 둔다
+        return sel
+    rows = np.flatnonzero(mask).astype(np.int64)
+    return faiss.IDSelectorBatch(rows.size, faiss.swig_ptr(rows))
+
+# ───────────── singleton + chroma_store 호환 API ─────────────
+_store: Optional[FaissStore] = None
+_store_lock = threading.Lock()
+
+def get_faiss_store() -> FaissStore:
+    """최초 호출 시 저장본 로드(없으면 FileNotFoundError → 호출 측에서 Chroma 폴백)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                p = index_path()
+                if not (live_dir(p) / "meta.json").exists():
+                    raise FileNotFoundError(f"faiss index not built: {p} (python -m app.app.infra.vector.faiss_store)")
+                _store = FaissStore(p)
+                log.info(f"[faiss] loaded {_store.kind} rows={len(_store)} mmap={_store.mmap} "
+                         f"in {_store.load_ms}ms from {p}")
+    return _store
+
+def reload_faiss_store() -> FaissStore:
+    """재빌드 후 교체. 결과/답변 캐시가 옛 인덱스 결과를 내지 않도록 세대도 올린다."""
+    global _store
+    from . import reset_backend
+    from .chroma_store import bump_generation
+    with _store_lock:
+        _store = None
+    st = get_faiss_store()
+    reset_backend()
+    bump_generation()
+    return st
+
+def search(query: str = "", **kwargs: Any) -> Dict[str, Any]:
+    return get_faiss_store().search(query, **kwargs)
+
+def search_many(query_embeddings: List[List[float]], **kwargs: Any) -> Dict[str, Any]:
+    return get_faiss_store().search_many(query_embeddings, **kwargs)
+
+def get_by_ids(ids: List[str], **kwargs: Any) -> Dict[str, Any]:
+    if not ids:
+        return {"ids": [], "documents": [], "metadatas": []}
+    return get_faiss_store().get_by_ids(ids, **kwargs)
+
+def faiss_stats() -> Dict[str, Any]:
+    return _store.stats() if _store is not None else {"loaded": False, "path": str(index_path())}
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--type", default=INDEX_TYPE, choices=["hnsw", "ivf", "flat"])
+    ap.add_argument("--batch", type=int, default=2000, help="컬렉션 읽기/인코딩 배치")
+    ap.add_argument("--reembed", action="store_true", help="저장된 임베딩 대신 문서를 다시 인코딩")
+    ap.add_argument("--quant", default=QUANT, choices=["none", "int8"], help="SQ8 인덱스 + float32 재채점")
+    ap.add_argument("--out", default="", help="저장 폴더(기본: index_path())")
+    args = ap.parse_args()
+    print(build_index(kind=args.type, batch=args.batch, reuse_embeddings=not args.reembed, quant=args.quant,
+                      path=Path(args.out) if args.out else None))
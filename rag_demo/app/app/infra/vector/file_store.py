@@ -0,0 +1,129 @@
+# app/app/infra/vector/file_store.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json, logging
+import numpy as np
+
+import app.app.configure.config as config
+
+from .meta_index import topn
+from .sidecar import DocTable, live_dir
+
+log = logging.getLogger("file_store")
+
+class FileVectorStore:
+    """
+    파일 백엔드(faiss / npmmap) 공통부.
+    - 하위 클래스는 _search(q, k, mask) → (D 내적, I 행번호; 모자라면 -1)와 reconstruct(rows)만 구현
+    - search / search_many / get_by_ids는 chroma_store와 같은 시그니처·원형(dict, space 포함)
+    """
+    backend = "file"
+
+    def __init__(self, path: Path):
+        self.path = live_dir(path)
+        self.info: Dict[str, Any] = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        self.table = DocTable(self.path / "table")
+        self.dim = int(self.info.get("dim") or 0)
+        self._warn_model()
+
+    def _warn_model(self) -> None:
+        from ...domain.embeddings import EMBED_MODEL
+        built = self.info.get("embed_model")
+        if built and built != EMBED_MODEL:
+            log.warning(f"[{self.backend}] index built with {built} but current embed model is {EMBED_MODEL}")
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    # ───────── 하위 클래스 구현 ─────────
+    def _search(self, q: np.ndarray, k: int, mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    def reconstruct(self, rows: Sequence[int]) -> np.ndarray:
+        raise NotImplementedError
+
+    # ───────── 공통 ─────────
+    def _exact(self, q: np.ndarray, rows: np.ndarray, k: int, *, block: int = 8192) -> Tuple[np.ndarray, np.ndarray]:
+        """필터 통과 행만 reconstruct로 읽어 정확 내적 top-k(선택도가 낮을 때 ANN+selector보다 재현율/지연 모두 유리)."""
+        S = np.concatenate([q @ self.reconstruct(rows[s:s + block]).T for s in range(0, rows.size, block)], axis=1)
+        top = topn(S, k)
+        return np.take_along_axis(S, top, axis=1), rows[top]
+
+    def query(self, qvecs: np.ndarray, k: int, *, where: Optional[Dict[str, Any]] = None,
+              include_docs: bool = True, include_metas: bool = True, include_distances: bool = True,
+              include_embeddings: bool = False) -> Dict[str, Any]:
+        q = np.ascontiguousarray(np.asarray(qvecs, dtype=np.float32).reshape(-1, self.dim))
+        q /= (np.linalg.norm(q, axis=1, keepdims=True) + 1e-8)
+        mask = self.table.mask_where(where)
+        if len(self) == 0 or (mask is not None and not mask.any()):
+            D = np.zeros((q.shape[0], 0), dtype=np.float32); I = np.zeros((q.shape[0], 0), dtype=np.int64)
+        else:
+            D, I = self._search(q, k, mask)
+        return self._result(D, I, include_docs, include_metas, include_distances, include_embeddings)
+
+    def _result(self, D: np.ndarray, I: np.ndarray, docs: bool, metas: bool, dists: bool,
+                embs: bool) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"space": "cosine", "ids": []}
+        if docs: out["documents"] = []
+        if metas: out["metadatas"] = []
+        if dists: out["distances"] = []
+        if embs: out["embeddings"] = []
+        for drow, irow in zip(D, I):
+            keep = irow >= 0  # 결과가 k개 미만이면 -1로 채워져 옴
+            rows = irow[keep].tolist()
+            out["ids"].append([self.table.ids[r] for r in rows])
+            if docs: out["documents"].append([self.table.text(r) for r in rows])
+            if metas: out["metadatas"].append([self.table.meta(r) for r in rows])
+            if dists: out["distances"].append((1.0 - drow[keep]).tolist())  # 내적 → 코사인 거리
+            if embs: out["embeddings"].append(self.reconstruct(rows))
+        return out
+
+    def search(self, query: str = "", *, query_embeddings: Optional[List[float]] = None,
+               where: Optional[Dict[str, Any]] = None, where_document: Optional[Dict[str, Any]] = None,
+               n: Optional[int] = None, include_docs: bool = True, include_metas: bool = True,
+               include_ids: bool = True, include_distances: bool = True,
+               include_embeddings: bool = False) -> Dict[str, Any]:
+        if query_embeddings is None:
+            if not query:
+                raise ValueError("either 'query' (text) or 'query_embeddings' must be provided")
+            from ...domain.embeddings import embed_queries
+            query_embeddings = embed_queries([query])
+        if where_document:
+            log.debug(f"[{self.backend}] where_document is not supported; ignored")
+        return self.query(query_embeddings, _k(n), where=where, include_docs=include_docs,
+                          include_metas=include_metas, include_distances=include_distances,
+                          include_embeddings=include_embeddings)
+
+    def search_many(self, query_embeddings: List[List[float]], *, where: Optional[Dict[str, Any]] = None,
+                    where_document: Optional[Dict[str, Any]] = None, n: Optional[int] = None,
+                    include_docs: bool = True, include_metas: bool = True, include_distances: bool = True,
+                    include_embeddings: bool = False) -> Dict[str, Any]:
+        if query_embeddings is None or len(query_embeddings) == 0:
+            raise ValueError("'query_embeddings' must contain at least one vector")
+        if where_document:
+            log.debug(f"[{self.backend}] where_document is not supported; ignored")
+        return self.query(np.asarray(query_embeddings, dtype=np.float32), _k(n), where=where,
+                          include_docs=include_docs, include_metas=include_metas,
+                          include_distances=include_distances, include_embeddings=include_embeddings)
+
+    def get_by_ids(self, ids: Sequence[str], *, include_docs: bool = True, include_metas: bool = True,
+                   include_embeddings: bool = False) -> Dict[str, Any]:
+        """Chroma get과 같이 없는 id는 빼고 평면 리스트로."""
+        pairs = [(cid, r) for cid, r in zip(ids, self.table.rows(ids)) if r >= 0]
+        if len(pairs) < len(ids):
+            log.warning(f"[{self.backend}] {len(ids) - len(pairs)}/{len(ids)} ids not in index "
+                        f"(stale snapshot? see vector_stats()['index'])")
+        rows = [r for _, r in pairs]
+        out: Dict[str, Any] = {"ids": [cid for cid, _ in pairs]}
+        if include_docs: out["documents"] = [self.table.text(r) for r in rows]
+        if include_metas: out["metadatas"] = [self.table.meta(r) for r in rows]
+        if include_embeddings: out["embeddings"] = self.reconstruct(rows)
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rows": len(self), "dim": self.dim, "table": self.table.stats(),
+                "built": {k: self.info.get(k) for k in ("embed_model", "saved_at", "build_ms")}}
+
+def _k(n: Optional[int]) -> int:
+    return max(1, int(n if n is not None else getattr(config, "TOP_K", 8)))
@@ -0,0 +1,297 @@
+# app/app/infra/vector/meta_index.py
+"""
+메타데이터 비트맵 인덱스(section / seed_title / type / doc_id …) + 필터 검색 플래너.
+- 컬럼 값마다 행 집합(posting). 행 집합은 roaring처럼 희소하면 정렬 배열, 조밀하면 bool 비트맵
+- where → 행 집합 → 선택도(통과 행 수)를 보고 plan()이
+    exact : 통과 행이 적으면 그 행들의 벡터만 가져와 정확 검색(항상 n개)
+    post  : 통과 비율이 높으면 필터 없이 ANN을 넉넉히 뽑아 비트맵으로 후필터
+    native: 그 사이면 백엔드 자체 필터(Chroma where / faiss IDSelector)
+- Chroma 백엔드(prefilter.py)는 컬렉션 메타로 빌드, 파일 백엔드(DocTable)는 저장된 코드 배열을 그대로 사용
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import math, os, threading
+import numpy as np
+
+from .where_filter import match_value
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+EXACT_MAX   = _env_int("RAG_PREFILTER_EXACT_MAX", 4096)    # 통과 행이 이 이하면 정확 검색(Chroma: 벡터를 get으로 가져옴)
+FILE_EXACT_MAX = _env_int("RAG_PREFILTER_FILE_EXACT_MAX", 50000)  # 파일 백엔드는 벡터가 mmap이라 더 크게
+POST_MAX    = _env_int("RAG_PREFILTER_POST_MAX", 400)      # 후필터용 ANN 후보 상한
+POST_SLACK  = 1.5                                          # 기대 통과 수 대비 여유 배수
+# 비트맵으로 들고 있을 메타 키(파일 백엔드 DocTable 코드 컬럼과 같음)
+COLUMNS     = tuple(c.strip() for c in os.getenv("RAG_SIDECAR_COLUMNS", "doc_id,section,seed_title,type").split(",")
+                    if c.strip())
+
+# ───────────── 행 집합 ─────────────
+class RowSet:
+    """행 번호 집합. 밀도 1/16 미만이면 정렬 int64 배열, 이상이면 bool 비트맵(roaring 컨테이너 기준과 같음)."""
+    __slots__ = ("n", "rows", "bits")
+
+    def __init__(self, n: int, rows: Optional[np.ndarray] = None, bits: Optional[np.ndarray] = None):
+        self.n, self.rows, self.bits = int(n), rows, bits
+
+    @classmethod
+    def of_rows(cls, n: int, rows: np.ndarray) -> "RowSet":
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size * 16 < n:
+            return cls(n, rows=rows)
+        bits = np.zeros(n, dtype=bool)
+        bits[rows] = True
+        return cls(n, bits=bits)
+
+    @classmethod
+    def of_mask(cls, mask: np.ndarray) -> "RowSet":
+        mask = np.asarray(mask, dtype=bool)
+        cnt = int(mask.sum())
+        return cls(mask.size, rows=np.flatnonzero(mask)) if cnt * 16 < mask.size else cls(mask.size, bits=mask)
+
+    @property
+    def count(self) -> int:
+        return int(self.rows.size) if self.rows is not None else int(self.bits.sum())
+
+    def to_rows(self) -> np.ndarray:
+        return self.rows if self.rows is not None else np.flatnonzero(self.bits)
+
+    def to_mask(self) -> np.ndarray:
+        if self.bits is not None:
+            return self.bits
+        m = np.zeros(self.n, dtype=bool)
+        m[self.rows] = True
+        return m
+
+    def contains(self, rows: np.ndarray) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.int64)
+        ok = (rows >= 0) & (rows < self.n)
+        out = np.zeros(rows.size, dtype=bool)
+        if self.bits is not None:
+            out[ok] = self.bits[rows[ok]]
+        else:
+            out[ok] = np.isin(rows[ok], self.rows, assume_unique=False)
+        return out
+
+    def __and__(self, other: "RowSet") -> "RowSet":
+        if self.rows is not None and other.rows is not None:
+            return RowSet(self.n, rows=np.intersect1d(self.rows, other.rows, assume_unique=True))
+        if self.rows is not None:
+            return RowSet(self.n, rows=self.rows[other.bits[self.rows]])
+        if other.rows is not None:
+            return RowSet(self.n, rows=other.rows[self.bits[other.rows]])
+        return RowSet.of_mask(self.bits & other.bits)
+
+    def __or__(self, other: "RowSet") -> "RowSet":
+        if self.rows is not None and other.rows is not None:
+            return RowSet.of_rows(self.n, np.union1d(self.rows, other.rows))
+        return RowSet.of_mask(self.to_mask() | other.to_mask())
+
+    def minus_from(self, universe: "RowSet") -> "RowSet":
+        """universe − self."""
+        return RowSet.of_mask(universe.to_mask() & ~self.to_mask())
+
+# ───────────── 인덱스 ─────────────
+class _Unindexed(Exception):
+    pass
+
+class MetaBitmapIndex:
+    """
+    컬럼별 사전 인코딩(int32 코드, 없는 값 -1) + 코드별 posting(안정 정렬 → 행 번호 오름차순).
+    - add로 증분(같은 id 재추가는 옛 행 tombstone), posting은 검색 시 필요하면 재컴파일
+    - from_codes: 이미 인코딩된 배열(DocTable mmap)로 읽기 전용 인덱스
+    """
+    def __init__(self, columns: Sequence[str] = COLUMNS):
+        self.columns = list(columns)
+        self._lock = threading.RLock()
+        self._reset_state()
+        self.ready = False
+        self.build_ms = 0.0
+
+    def _reset_state(self) -> None:
+        self.ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self._code_of: Dict[str, Dict[Any, int]] = {c: {} for c in self.columns}
+        self.values: Dict[str, List[Any]] = {c: [] for c in self.columns}
+        self._codes_list: Dict[str, List[int]] = {c: [] for c in self.columns}
+        self._codes: Dict[str, np.ndarray] = {}
+        self._post: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._dead: List[int] = []
+        self._alive: Optional[RowSet] = None
+        self._dirty = True
+
+    @classmethod
+    def from_codes(cls, ids: List[str], codes: Dict[str, np.ndarray], values: Dict[str, List[Any]]) -> "MetaBitmapIndex":
+        idx = cls(columns=list(codes))
+        idx.ids = ids
+        idx.values = {c: list(values.get(c) or []) for c in codes}
+        idx._code_of = {c: {v: i for i, v in enumerate(idx.values[c])} for c in codes}
+        idx._codes = dict(codes)
+        idx._codes_list = {}
+        idx._dirty = True
+        idx.ready = True
+        return idx
+
+    def __len__(self) -> int:
+        return len(self.ids) - len(self._dead)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset_state()
+
+    def add(self, ids: Iterable[str], metas: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            for cid, meta in zip(ids, metas):
+                cid, meta = str(cid), (meta or {})
+                old = self.row_of.get(cid)
+                if old is not None:
+                    self._dead.append(old)
+                self.row_of[cid] = len(self.ids)
+                self.ids.append(cid)
+                for c in self.columns:
+                    v = meta.get(c)
+                    if v is None:
+                        self._codes_list[c].append(-1)
+                        continue
+                    code = self._code_of[c].get(v)
+                    if code is None:
+                        code = self._code_of[c][v] = len(self.values[c])
+                        self.values[c].append(v)
+                    self._codes_list[c].append(code)
+            self._dirty = True
+
+    def _compile(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            n = len(self.ids)
+            for c in self.columns:
+                if self._codes_list:
+                    self._codes[c] = np.asarray(self._codes_list[c], dtype=np.int32)
+                codes = self._codes[c]
+                order = np.argsort(codes, kind="stable")
+                counts = np.bincount(codes.astype(np.int64) + 1, minlength=len(self.values[c]) + 1)
+                self._post[c] = (order, np.concatenate([[0], np.cumsum(counts)]))
+            if self._dead:
+                alive = np.ones(n, dtype=bool)
+                alive[np.asarray(self._dead, dtype=np.int64)] = False
+                self._alive = RowSet.of_mask(alive)
+            else:
+                self._alive = RowSet(n, bits=np.ones(n, dtype=bool))
+            self._dirty = False
+
+    def _posting(self, col: str, code: int) -> np.ndarray:
+        order, starts = self._post[col]
+        return order[starts[code + 1]:starts[code + 2]]           # code -1(없음)은 0번 칸
+
+    def _union(self, col: str, codes: Iterable[int]) -> RowSet:
+        parts = [self._posting(col, c) for c in codes]
+        parts = [p for p in parts if p.size]
+        rows = np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+        return RowSet.of_rows(len(self.ids), rows)
+
+    def _leaf(self, col: str, cond: Any) -> RowSet:
+        lookup = self._code_of[col]
+        # 빠른 경로: 값 / $eq / $in → 사전 조회만
+        want: Optional[List[Any]] = None
+        if not isinstance(cond, dict):
+            want = [cond]
+        elif set(cond) == {"$eq"}:
+            want = [cond["$eq"]]
+        elif set(cond) == {"$in"}:
+            want = list(cond["$in"] or [])
+        if want is not None:
+            codes = [lookup[v] for v in want if v is not None and v in lookup]
+            if any(v is None for v in want):
+                codes.append(-1)
+            return self._union(col, codes)
+        vals = self.values[col]
+        ok = [c for c, v in enumerate(vals) if match_value(v, cond)]
+        miss_ok = match_value(None, cond)
+        if len(ok) * 2 > len(vals):
+            # 대부분 통과($ne/$nin 등) → 제외 집합을 모아 여집합
+            ok_set = set(ok)
+            bad = [c for c in range(len(vals)) if c not in ok_set] + ([] if miss_ok else [-1])
+            return self._union(col, bad).minus_from(self._alive)
+        return self._union(col, ok + ([-1] if miss_ok else []))
+
+    def rowset(self, where: Optional[Dict[str, Any]], *,
+               fallback: Optional[Callable[[str, Any], RowSet]] = None) -> Optional[RowSet]:
+        """where → 살아 있는 행 집합. 인덱스에 없는 키가 있고 fallback도 없으면 None(평가 불가)."""
+        if not where:
+            return None
+        with self._lock:
+            self._compile()
+            try:
+                rs = self._eval(where, fallback)
+            except _Unindexed:
+                return None
+            return rs & self._alive if self._dead else rs
+
+    def _eval(self, where: Dict[str, Any], fallback: Optional[Callable[[str, Any], RowSet]]) -> RowSet:
+        acc: Optional[RowSet] = None
+        for key, cond in where.items():
+            if key == "$and":
+                cur = self._alive
+                for w in cond or []:
+                    cur = cur & self._eval(w, fallback)
+            elif key == "$or":
+                cur = RowSet(len(self.ids), rows=np.zeros(0, dtype=np.int64))
+                for w in cond or []:
+                    cur = cur | self._eval(w, fallback)
+            elif key in self._post:
+                cur = self._leaf(key, cond)
+            elif fallback is not None:
+                cur = fallback(key, cond)
+            else:
+                raise _Unindexed(key)
+            acc = cur if acc is None else acc & cur
+        return acc if acc is not None else self._alive
+
+    def selectivity(self, where: Optional[Dict[str, Any]]) -> Optional[float]:
+        """통과 비율(0~1). 평가 불가면 None."""
+        rs = self.rowset(where)
+        return None if rs is None else rs.count / float(max(1, len(self)))
+
+    def mark_built(self, build_ms: float) -> None:
+        with self._lock:
+            self._compile()
+            self.ready = True
+            self.build_ms = build_ms
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "rows": len(self), "dead": len(self._dead),
+                "values": {c: len(v) for c, v in self.values.items()}, "build_ms": round(self.build_ms, 1)}
+
+# ───────────── 플래너 ─────────────
+def plan(count: int, total: int, n: int, *, exact_max: int = EXACT_MAX) -> Tuple[str, int]:
+    """(전략, 후필터 ANN 후보 수). 전략: empty | exact | post | native."""
+    if count <= 0:
+        return "empty", 0
+    if count <= max(exact_max, n):
+        return "exact", 0
+    fetch = int(math.ceil(n * total / float(count) * POST_SLACK))
+    if fetch <= POST_MAX:
+        return "post", max(fetch, n)
+    return "native", 0
+
+def topn(S: np.ndarray, n: int, larger_first: bool = True) -> np.ndarray:
+    """행별 상위 n 열 인덱스(정렬됨)."""
+    X = -S if larger_first else S
+    n = min(n, S.shape[1])
+    part = np.argpartition(X, n - 1, axis=1)[:, :n] if n < S.shape[1] else np.tile(np.arange(S.shape[1]), (S.shape[0], 1))
+    order = np.argsort(np.take_along_axis(X, part, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+def distances(space: str, Q: np.ndarray, E: np.ndarray) -> np.ndarray:
+    """Chroma 공간별 거리(작을수록 가까움): cosine=1−cos, ip=1−q·e, l2=‖q−e‖²."""
+    if space == "l2":
+        return (Q * Q).sum(1)[:, None] + (E * E).sum(1)[None, :] - 2.0 * (Q @ E.T)
+    if space == "cosine":
+        Qn = Q / (np.linalg.norm(Q, axis=1, keepdims=True) + 1e-8)
+        En = E / (np.linalg.norm(E, axis=1, keepdims=True) + 1e-8)
+        return 1.0 - Qn @ En.T
+    return 1.0 - Q @ E.T
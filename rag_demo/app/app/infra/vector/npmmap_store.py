@@ -0,0 +1,203 @@
+# app/app/infra/vector/npmmap_store.py
+"""
+VECTOR_BACKEND=npmmap 용 정확(brute-force) 검색 백엔드.
+- 저장: 정규화 벡터 float16 .npy(np.load mmap) + DocTable(텍스트/메타/필터 컬럼)
+- 검색: 블록 단위 f16→f32 변환 후 행렬곱(BLAS, 질의 여러 개를 한 번에) + argpartition으로 블록별 top-k 병합
+- 필터: where → 행 마스크. 희소하면 해당 행만 모아서, 조밀하면 연속 블록을 읽고 마스크로 -inf
+- 양자화(--quant int8): 1차는 int8 코드(차원당 1B)로 k×MULT개, 2차는 f16 원본에서 그 행만 읽어 재채점
+- 수십만 청크 규모면 HNSW보다 재현율이 높고(정확 검색) 지연이 예측 가능, 시작은 mmap이라 즉시
+
+python -m app.app.infra.vector.npmmap_store [--quant int8]   → 현재 컬렉션 기준 빌드
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse, logging, os, shutil, threading, time
+import numpy as np
+
+from .file_store import FileVectorStore
+from .quant import QUANT, RESCORE_MULT, Int8Quantizer, file_mb, rescore
+from .sidecar import export_collection, live_dir, swap_dir, write_meta
+
+log = logging.getLogger("npmmap_store")
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+BLOCK         = _env_int("RAG_NPMMAP_BLOCK", 16384)   # 블록당 행 수(f32 임시 버퍼 = BLOCK × dim × 4B)
+DENSE_RATIO   = 0.5                                   # 필터 통과 비율이 이 이상이면 연속 블록 + 마스크
+
+def index_path() -> Path:
+    from . import chroma_store
+    return Path(os.getenv("RAG_NPMMAP_DIR") or
+                Path(chroma_store.persist_dir()) / f"npmmap_{chroma_store.collection_name()}")
+
+# ───────────── build ─────────────
+def build_index(*, batch: int = 2000, reuse_embeddings: bool = True, quant: str = QUANT,
+                path: Optional[Path] = None) -> Dict[str, Any]:
+    path = Path(path or index_path())
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    info = export_collection(tmp, batch=batch, reuse_embeddings=reuse_embeddings)
+    n, dim = info["rows"], info["dim"]
+    t0 = time.perf_counter()
+    src = np.load(tmp / "vectors.npy", mmap_mode="r")
+    dst = np.lib.format.open_memmap(tmp / "vectors.f16.npy", mode="w+", dtype=np.float16, shape=(n, dim))
+    for s in range(0, n, BLOCK):
+        dst[s:s + BLOCK] = src[s:s + BLOCK]
+    dst.flush()
+    if quant == "int8":
+        qz = Int8Quantizer.fit(src)
+        qz.encode_file(src, tmp / "codes.i8.npy")
+        qz.save(tmp / "quant.npz")
+    del src, dst
+    (tmp / "vectors.npy").unlink()
+    build_ms = round((time.perf_counter() - t0) * 1000.0)
+    write_meta(tmp, kind="npmmap", dim=dim, count=n, metric="ip", dtype="float16", quant=quant, build_ms=build_ms,
+               **{k: v for k, v in info.items() if k not in ("rows", "dim")})
+    swap_dir(tmp, path)
+    log.info(f"[npmmap] built rows={n} dim={dim} in {build_ms}ms → {path}")
+    return {"path": str(path), "rows": n, "dim": dim, "build_ms": build_ms}
+
+# ───────────── store ─────────────
+def _merge_topk(best_s: np.ndarray, best_i: np.ndarray, s: np.ndarray, i: np.ndarray,
+                k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(m, a) + (m, b) 후보를 합쳐 행별 상위 k(정렬 안 됨)만 남긴다."""
+    s = np.concatenate([best_s, s], axis=1)
+    i = np.concatenate([best_i, i], axis=1)
+    if s.shape[1] <= k:
+        return s, i
+    part = np.argpartition(-s, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(s, part, axis=1), np.take_along_axis(i, part, axis=1)
+
+class NpMmapStore(FileVectorStore):
+    backend = "npmmap"
+
+    def __init__(self, path: Path, *, use_quant: Optional[bool] = None):
+        """use_quant=None이면 저장본에 코드가 있을 때 사용, False면 f16 정확 검색 강제(비교용)."""
+        t0 = time.perf_counter()
+        super().__init__(path)
+        self.vecs = np.load(self.path / "vectors.f16.npy", mmap_mode="r")
+        self.dim = int(self.vecs.shape[1])
+        self.quant: Optional[Int8Quantizer] = None
+        self.codes: Optional[np.ndarray] = None
+        if use_quant is not False and (self.path / "quant.npz").exists():
+            self.quant = Int8Quantizer.load(self.path / "quant.npz")
+            self.codes = np.load(self.path / "codes.i8.npy", mmap_mode="r")
+        self.load_ms = round((time.perf_counter() - t0) * 1000.0, 1)
+        if self.vecs.shape[0] != len(self.table):
+            raise RuntimeError(f"npmmap vectors/table mismatch: {self.vecs.shape[0]} vs {len(self.table)}")
+
+    def _scan(self, mat: np.ndarray, q: np.ndarray, off: Optional[np.ndarray], k: int,
+              mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """mat(f16 벡터 또는 int8 코드) 전체를 블록 행렬곱으로 훑어 행별 top-k(정렬됨, 모자라면 -1)."""
+        n = len(self)
+        rows = None
+        if mask is not None and mask.sum() < DENSE_RATIO * n:
+            rows = np.flatnonzero(mask)          # 희소 필터: 통과 행만 모아서 계산
+            mask = None
+        total = n if rows is None else rows.size
+        k = min(int(k), total)
+        m = q.shape[0]
+        best_s = np.empty((m, 0), dtype=np.float32)
+        best_i = np.empty((m, 0), dtype=np.int64)
+        for s in range(0, total, BLOCK):
+            e = min(s + BLOCK, total)
+            if rows is None:
+                ids = np.arange(s, e, dtype=np.int64)
+                xb = np.asarray(mat[s:e], dtype=np.float32)
+            else:
+                ids = rows[s:e]
+                xb = np.asarray(mat[ids], dtype=np.float32)
+            sc = q @ xb.T                                        # (m, b)
+            if off is not None:
+                sc += off[:, None]
+            if mask is not None:
+                sc[:, ~mask[s:e]] = -np.inf                      # 조밀 필터: 읽기는 연속, 점수만 제외
+            best_s, best_i = _merge_topk(best_s, best_i, sc, np.broadcast_to(ids, sc.shape), k)
+        order = np.argsort(-best_s, axis=1, kind="stable")
+        D = np.take_along_axis(best_s, order, axis=1)
+        I = np.take_along_axis(best_i, order, axis=1).copy()
+        I[~np.isfinite(D)] = -1
+        return D, I
+
+    def _search(self, q: np.ndarray, k: int, mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        if self.quant is None:
+            return self._scan(self.vecs, q, None, k, mask)
+        qs, off = self.quant.prepare(q)
+        _, cand = self._scan(self.codes, qs, off, k * RESCORE_MULT, mask)
+        return rescore(q, cand, self.vecs, k)
+
+    def reconstruct(self, rows: Sequence[int]) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.asarray(self.vecs[rows], dtype=np.float32)
+
+    def memory(self) -> Dict[str, Any]:
+        """1차 검색이 매번 훑는 파일(상주 필요) vs 후보 행만 읽는 재채점 파일."""
+        if self.quant is None:
+            return {"scan_mb": file_mb(self.path / "vectors.f16.npy"), "rescore_mb": 0.0}
+        return {"scan_mb": file_mb(self.path / "codes.i8.npy"), "rescore_mb": file_mb(self.path / "vectors.f16.npy")}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"kind": "npmmap", "dtype": str(self.vecs.dtype), "block": BLOCK, "load_ms": self.load_ms,
+                "quant": "int8" if self.quant is not None else "none", "rescore_mult": RESCORE_MULT,
+                **self.memory(), **super().stats()}
+
+# ───────────── singleton + chroma_store 호환 API ─────────────
+_store: Optional[NpMmapStore] = None
+_store_lock = threading.Lock()
+
+def get_npmmap_store() -> NpMmapStore:
+    """최초 호출 시 저장본 mmap 로드(없으면 FileNotFoundError → 호출 측에서 Chroma 폴백)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                p = index_path()
+                if not (live_dir(p) / "meta.json").exists():
+                    raise FileNotFoundError(f"npmmap index not built: {p} (python -m app.app.infra.vector.npmmap_store)")
+                _store = NpMmapStore(p)
+                log.info(f"[npmmap] loaded rows={len(_store)} in {_store.load_ms}ms from {p}")
+    return _store
+
+def reload_npmmap_store() -> NpMmapStore:
+    """재빌드 후 교체. 결과/답변 캐시가 옛 인덱스 결과를 내지 않도록 세대도 올린다."""
+    global _store
+    from . import reset_backend
+    from .chroma_store import bump_generation
+    with _store_lock:
+        _store = None
+    st = get_npmmap_store()
+    reset_backend()
+    bump_generation()
+    return st
+
+def search(query: str = "", **kwargs: Any) -> Dict[str, Any]:
+    return get_npmmap_store().search(query, **kwargs)
+
+def search_many(query_embeddings: List[List[float]], **kwargs: Any) -> Dict[str, Any]:
+    return get_npmmap_store().search_many(query_embeddings, **kwargs)
+
+def get_by_ids(ids: List[str], **kwargs: Any) -> Dict[str, Any]:
+    if not ids:
+        return {"ids": [], "documents": [], "metadatas": []}
+    return get_npmmap_store().get_by_ids(ids, **kwargs)
+
+def npmmap_stats() -> Dict[str, Any]:
+    return _store.stats() if _store is not None else {"loaded": False, "path": str(index_path())}
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--batch", type=int, default=2000, help="컬렉션 읽기/인코딩 배치")
+    ap.add_argument("--reembed", action="store_true", help="저장된 임베딩 대신 문서를 다시 인코딩")
+    ap.add_argument("--quant", default=QUANT, choices=["none", "int8"], help="int8 코드 1차 검색 + f16 재채점")
+    ap.add_argument("--out", default="", help="저장 폴더(기본: index_path())")
+    args = ap.parse_args()
+    print(build_index(batch=args.batch, reuse_embeddings=not args.reembed, quant=args.quant,
+                      path=Path(args.out) if args.out else None))
@@ -0,0 +1,224 @@
+# app/app/infra/vector/prefilter.py
+"""
+Chroma 백엔드용 where 사전 필터.
+- 컬렉션 메타로 MetaBitmapIndex를 한 번 빌드(백그라운드), 이후 upsert 훅으로 증분
+- where가 온 검색을 비트맵 선택도로 라우팅(meta_index.plan)
+    exact : 통과 청크 벡터를 get으로 모아 정확 검색(같은 where 반복이면 캐시)
+    post  : where 없이 ANN을 넉넉히 → 비트맵 후필터(한 쿼리라도 n개 미달이면 native)
+    native: Chroma where 그대로(None 반환)
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+import json, logging, os, threading, time
+import numpy as np
+
+from . import chroma_store
+from .meta_index import EXACT_MAX, POST_MAX, MetaBitmapIndex, RowSet, distances, plan, topn
+from ...utils.ttl_cache import TTLCache
+
+log = logging.getLogger("prefilter")
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+ENABLED = os.getenv("RAG_PREFILTER", "1") == "1"
+
+_index = MetaBitmapIndex()
+_build_lock = threading.Lock()
+_building = False
+# 빌드(offset 페이지 스캔) 중 들어온 upsert → mark_built 직전에 반영(스캔 커서 뒤에 쓰인 청크도 빠지지 않도록)
+_pend_lock = threading.Lock()
+_pending: List[Tuple[List[str], List[Dict[str, Any]]]] = []
+_scanning = False
+
+def _subset_bytes(ent: Dict[str, Any]) -> int:
+    return int(ent["E"].nbytes) + sum(len(d or "") for d in ent["documents"]) * 3   # 문서는 UTF-8 상한으로 어림
+
+# exact 경로의 부분집합 벡터/문서 캐시(섹션 필터처럼 같은 where 반복 시 Chroma get 생략).
+# 항목 하나가 EXACT_MAX×dim×4B까지 커질 수 있으므로 바이트 합(RAG_PREFILTER_CACHE_MB)으로도 상한
+_subset_cache = TTLCache(maxsize=_env_int("RAG_PREFILTER_CACHE", 16), ttl=600.0, name="prefilter_subset",
+                         max_bytes=_env_int("RAG_PREFILTER_CACHE_MB", 64) * 1024 * 1024, sizeof=_subset_bytes)
+_counts: Dict[str, int] = {"exact": 0, "post": 0, "native": 0, "post_short": 0, "empty": 0, "skipped": 0}
+
+# ───────────── index ─────────────
+def _build(batch: int = 5000) -> int:
+    global _scanning
+    coll = chroma_store.get_collection()
+    t0 = time.perf_counter()
+    with _pend_lock:
+        _scanning = True
+        _pending.clear()
+    try:
+        _index.clear()
+        offset = 0
+        while True:
+            got = coll.get(include=["metadatas"], limit=batch, offset=offset)
+            ids = got.get("ids") or []
+            if not ids:
+                break
+            _index.add(ids, got.get("metadatas") or [{}] * len(ids))
+            offset += len(ids)
+        with _pend_lock:
+            for ids, metas in _pending:          # 이미 읽은 id면 옛 행 tombstone 후 재추가
+                _index.add(ids, metas)
+            _pending.clear()
+            _index.mark_built((time.perf_counter() - t0) * 1000.0)
+    finally:
+        with _pend_lock:
+            _scanning = False
+    log.info(f"[prefilter] meta index built rows={len(_index)} in {_index.build_ms:.0f}ms")
+    return len(_index)
+
+def get_meta_index() -> MetaBitmapIndex:
+    """준비 안 됐으면 동기 빌드(최초 1회, 워밍업용)."""
+    global _building
+    if not _index.ready:
+        with _build_lock:
+            if not _index.ready:
+                try:
+                    _build()
+                finally:
+                    _building = False
+    return _index
+
+def _ready_index() -> Optional[MetaBitmapIndex]:
+    """요청 경로용: 준비 전이면 백그라운드 빌드만 걸고 None(그동안은 Chroma where 그대로)."""
+    global _building
+    if _index.ready:
+        return _index
+    if not _building:
+        _building = True
+        threading.Thread(target=get_meta_index, name="meta-index-build", daemon=True).start()
+    return None
+
+# ───────────── strategies ─────────────
+def _cacheable(where: Any) -> bool:
+    """doc_id $in(계층 검색 2단계처럼 요청마다 다른 일회성 필터)은 캐시하지 않음 → 재사용되는 필터 항목을 밀어내지 않도록."""
+    if isinstance(where, dict):
+        for k, v in where.items():
+            if k == "doc_id" and isinstance(v, dict) and "$in" in v:
+                return False
+            if isinstance(v, (dict, list)) and not _cacheable(v):
+                return False
+    elif isinstance(where, list):
+        return all(_cacheable(w) for w in where)
+    return True
+
+def _subset(rs: RowSet, where_key: str, cache: bool = True) -> Dict[str, Any]:
+    key = (where_key, chroma_store.collection_generation())
+    hit = _subset_cache.get(key) if cache else None
+    if hit is not None:
+        return hit
+    ids = [_index.ids[r] for r in rs.to_rows().tolist()]
+    got = chroma_store.get_by_ids(ids, include_docs=True, include_metas=True, include_embeddings=True)
+    embs = got.get("embeddings")
+    ent = {"ids": list(got.get("ids") or []), "documents": list(got.get("documents") or []),
+           "metadatas": list(got.get("metadatas") or []),
+           "E": np.asarray(embs if embs is not None and len(embs) else np.zeros((0, 0)), dtype=np.float32)}
+    if cache:
+        _subset_cache.put(key, ent)
+    return ent
+
+def _shape(space: str, per_query: List[List[Tuple[str, Any, Any, float, Any]]],
+           docs: bool, metas: bool, dists: bool, embs: bool) -> Dict[str, Any]:
+    """coll.query 원형(쿼리별 배치 리스트 + space)."""
+    out: Dict[str, Any] = {"space": space, "ids": [[h[0] for h in hs] for hs in per_query]}
+    if docs: out["documents"] = [[h[1] for h in hs] for hs in per_query]
+    if metas: out["metadatas"] = [[h[2] for h in hs] for hs in per_query]
+    if dists: out["distances"] = [[h[3] for h in hs] for hs in per_query]
+    if embs: out["embeddings"] = [np.asarray([h[4] for h in hs], dtype=np.float32) for hs in per_query]
+    return out
+
+def _exact(Q: np.ndarray, rs: RowSet, where_key: str, n: int, space: str, inc: Dict[str, bool],
+           cache: bool = True) -> Dict[str, Any]:
+    sub = _subset(rs, where_key, cache)
+    E = sub["E"]
+    if E.size == 0:
+        return _shape(space, [[] for _ in range(Q.shape[0])], **inc)
+    D = distances(space, Q, E)
+    top = topn(D, n, larger_first=False)
+    per_query = [[(sub["ids"][j], sub["documents"][j], sub["metadatas"][j], float(D[i, j]), E[j])
+                  for j in top[i].tolist()] for i in range(Q.shape[0])]
+    return _shape(space, per_query, **inc)
+
+def _batch(res: Dict[str, Any], key: str, b: int) -> Any:
+    v = res.get(key)
+    return v[b] if v is not None and len(v) > b else None
+
+def _post(Q: np.ndarray, rs: RowSet, fetch: int, n: int, space: str, inc: Dict[str, bool]) -> Optional[Dict[str, Any]]:
+    """where 없이 ANN fetch개 → 비트맵 후필터. 한 쿼리라도 n개를 못 채우면 None."""
+    include = ["distances"] + (["documents"] if inc["docs"] else []) + (["metadatas"] if inc["metas"] else []) \
+        + (["embeddings"] if inc["embs"] else [])
+    res = chroma_store.get_collection().query(query_embeddings=Q.tolist(), n_results=fetch, include=include)
+    per_query = []
+    for b, ids in enumerate(res.get("ids") or []):
+        rows = np.asarray([_index.row_of.get(i, -1) for i in ids], dtype=np.int64)
+        keep = np.flatnonzero(rs.contains(rows))[:n]
+        if keep.size < n:
+            return None
+        docs, metas = _batch(res, "documents", b), _batch(res, "metadatas", b)
+        dists, embs = _batch(res, "distances", b), _batch(res, "embeddings", b)
+        per_query.append([(ids[j], docs[j] if docs is not None else None, metas[j] if metas is not None else None,
+                           dists[j], embs[j] if embs is not None else None) for j in keep.tolist()])
+    return _shape(space, per_query, **inc)
+
+def chroma_filtered(query_embeddings: Any, *, where: Optional[Dict[str, Any]], n: int,
+                    include_docs: bool = True, include_metas: bool = True, include_distances: bool = True,
+                    include_embeddings: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    where가 있는 Chroma 검색을 비트맵 선택도로 라우팅. None이면 호출 측이 Chroma where 그대로(native).
+    결과는 chroma_store.search / search_many와 같은 원형.
+    """
+    if not ENABLED or not where:
+        return None
+    idx = _ready_index()
+    rs = idx.rowset(where) if idx is not None else None
+    if rs is None:
+        _counts["skipped"] += 1           # 빌드 전이거나 인덱스에 없는 키
+        return None
+    space = chroma_store._space()
+    Q = np.asarray(query_embeddings, dtype=np.float32)
+    Q = Q.reshape(1, -1) if Q.ndim == 1 else Q
+    inc = {"docs": include_docs, "metas": include_metas, "dists": include_distances, "embs": include_embeddings}
+    strategy, fetch = plan(rs.count, len(idx), n)
+    if strategy == "empty":
+        _counts["empty"] += 1
+        return _shape(space, [[] for _ in range(Q.shape[0])], **inc)
+    if strategy == "exact":
+        _counts["exact"] += 1
+        return _exact(Q, rs, json.dumps(where, sort_keys=True, ensure_ascii=False, default=str), n, space, inc,
+                      cache=_cacheable(where))
+    if strategy == "post":
+        res = _post(Q, rs, fetch, n, space, inc)
+        if res is not None:
+            _counts["post"] += 1
+            return res
+        _counts["post_short"] += 1
+    _counts["native"] += 1
+    return None
+
+def prefilter_stats() -> Dict[str, Any]:
+    return {**_index.stats(), "enabled": ENABLED, "exact_max": EXACT_MAX, "post_max": POST_MAX,
+            "plans": dict(_counts), "subset_cache": _subset_cache.stats()}
+
+# ───────────── hooks ─────────────
+def _on_upsert(ids: List[str], documents: List[str], metas: List[Dict[str, Any]]) -> None:
+    # 빌드 전이면 무시(빌드 시 컬렉션에서 함께 읽힘), 빌드 중이면 보류
+    with _pend_lock:
+        if not _index.ready:
+            if _scanning:
+                _pending.append((list(ids), list(metas)))
+            return
+    _index.add(ids, metas)
+
+def _on_reset() -> None:
+    with _pend_lock:
+        _pending.clear()
+    _index.clear()
+    _index.ready = False
+
+chroma_store.on_upsert(_on_upsert)
+chroma_store.on_reset(_on_reset)
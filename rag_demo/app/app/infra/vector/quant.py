@@ -0,0 +1,84 @@
+# app/app/infra/vector/quant.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Tuple
+import os
+import numpy as np
+
+# 빌드 시 양자화 여부(저장본 meta.json에 기록되므로 검색 시에는 저장본을 따른다)
+QUANT = os.getenv("RAG_VECTOR_QUANT", "none").lower()          # none | int8
+try:
+    RESCORE_MULT = max(1, int(os.getenv("RAG_QUANT_RESCORE_MULT", "4")))  # 1차 후보 = k × MULT
+except ValueError:
+    RESCORE_MULT = 4
+
+class Int8Quantizer:
+    """
+    차원별 스칼라 양자화: x ≈ base + c·scale, c ∈ int8 (차원마다 min/max로 256단계).
+    q·x ≈ q·base + (q∘scale)·c → 1차 점수는 코드 행렬과 (q∘scale)의 행렬곱 한 번.
+    """
+    def __init__(self, lo: np.ndarray, scale: np.ndarray):
+        self.lo = np.asarray(lo, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.base = self.lo + 128.0 * self.scale       # c = -128 ↔ lo
+
+    @classmethod
+    def fit(cls, x: np.ndarray, *, block: int = 65536) -> "Int8Quantizer":
+        """전체 행을 블록으로 훑어 차원별 min/max(mmap 입력도 메모리 한 블록만)."""
+        lo = np.full(x.shape[1], np.inf, dtype=np.float32)
+        hi = np.full(x.shape[1], -np.inf, dtype=np.float32)
+        for s in range(0, x.shape[0], block):
+            b = np.asarray(x[s:s + block], dtype=np.float32)
+            np.minimum(lo, b.min(axis=0), out=lo)
+            np.maximum(hi, b.max(axis=0), out=hi)
+        if not np.isfinite(lo).all():
+            lo = np.zeros_like(lo); hi = np.ones_like(hi)
+        return cls(lo, np.maximum(hi - lo, 1e-8) / 255.0)
+
+    def encode(self, x: np.ndarray) -> np.ndarray:
+        c = np.rint((np.asarray(x, dtype=np.float32) - self.lo) / self.scale) - 128.0
+        return np.clip(c, -128, 127).astype(np.int8)
+
+    def decode(self, c: np.ndarray) -> np.ndarray:
+        return self.base + np.asarray(c, dtype=np.float32) * self.scale
+
+    def prepare(self, q: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """질의 (m, d) → (q∘scale, 행별 상수항). 점수 = codes_f32 @ qs.T + off."""
+        return q * self.scale, q @ self.base
+
+    def encode_file(self, src: np.ndarray, dst: Path, *, block: int = 65536) -> None:
+        out = np.lib.format.open_memmap(dst, mode="w+", dtype=np.int8, shape=src.shape)
+        for s in range(0, src.shape[0], block):
+            out[s:s + block] = self.encode(src[s:s + block])
+        out.flush()
+        del out
+
+    def save(self, path: Path) -> None:
+        np.savez(path, lo=self.lo, scale=self.scale)
+
+    @classmethod
+    def load(cls, path: Path) -> "Int8Quantizer":
+        z = np.load(path)
+        return cls(z["lo"], z["scale"])
+
+def rescore(q: np.ndarray, cand: np.ndarray, vecs: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    1차 후보(행번호, -1 패딩)를 원정밀도 벡터(mmap)로 다시 점수 매겨 행별 top-k.
+    후보 행만 읽으므로 원본 파일은 디스크/페이지 캐시에 두고 상주 메모리는 코드만.
+    """
+    m = q.shape[0]
+    D = np.full((m, k), -np.inf, dtype=np.float32)
+    I = np.full((m, k), -1, dtype=np.int64)
+    for i in range(m):
+        rows = np.sort(cand[i][cand[i] >= 0])          # 정렬된 행 → mmap 읽기가 순방향
+        if rows.size == 0:
+            continue
+        s = np.asarray(vecs[rows], dtype=np.float32) @ q[i]
+        top = np.argsort(-s, kind="stable")[:k]
+        D[i, :top.size] = s[top]
+        I[i, :top.size] = rows[top]
+    return D, I
+
+def file_mb(*paths: Path) -> float:
+    return round(sum(Path(p).stat().st_size for p in paths if Path(p).exists()) / 1e6, 1)
+
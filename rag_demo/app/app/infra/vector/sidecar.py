@@ -0,0 +1,234 @@
+# app/app/infra/vector/sidecar.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import json, logging, os, shutil, threading, time
+import numpy as np
+
+from .meta_index import COLUMNS, MetaBitmapIndex, RowSet
+from .where_filter import match_where
+
+log = logging.getLogger("sidecar")
+
+# 코드 배열로 들고 있을 메타 키(where 절에 자주 쓰이는 것들, RAG_SIDECAR_COLUMNS)
+FILTER_COLUMNS = COLUMNS
+
+def _blob_reader(path: Path) -> np.ndarray:
+    """바이트 blob을 uint8 memmap으로(빈 파일은 memmap이 안 되므로 빈 배열)."""
+    if path.stat().st_size == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+class DocTableWriter:
+    """
+    파일 백엔드(faiss 등)용 행 단위 문서 테이블을 스트리밍으로 쓴다.
+    - 행 번호 = 벡터 인덱스 내부 id (0..n-1)
+    - 텍스트/메타(JSON)는 이어 붙인 utf-8 blob + int64 오프셋
+    - FILTER_COLUMNS는 컬럼별 사전 인코딩(int32 코드, 없는 값은 -1) → where를 벡터 연산으로 평가
+    """
+    def __init__(self, path: Path, *, columns: Sequence[str] = FILTER_COLUMNS):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.columns = list(columns)
+        self.ids: List[str] = []
+        self._text = open(self.path / "text.bin", "wb")
+        self._meta = open(self.path / "meta.bin", "wb")
+        self._text_off: List[int] = [0]
+        self._meta_off: List[int] = [0]
+        self._vocab: Dict[str, Dict[Any, int]] = {c: {} for c in self.columns}
+        self._codes: Dict[str, List[int]] = {c: [] for c in self.columns}
+
+    def append(self, ids: Sequence[str], documents: Sequence[str], metas: Sequence[Dict[str, Any]]) -> None:
+        for cid, doc, meta in zip(ids, documents, metas):
+            meta = meta or {}
+            self.ids.append(str(cid))
+            b = (doc or "").encode("utf-8")
+            self._text.write(b)
+            self._text_off.append(self._text_off[-1] + len(b))
+            b = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            self._meta.write(b)
+            self._meta_off.append(self._meta_off[-1] + len(b))
+            for c in self.columns:
+                v = meta.get(c)
+                self._codes[c].append(-1 if v is None else self._vocab[c].setdefault(v, len(self._vocab[c])))
+
+    def close(self) -> int:
+        self._text.close(); self._meta.close()
+        np.save(self.path / "text_off.npy", np.asarray(self._text_off, dtype=np.int64))
+        np.save(self.path / "meta_off.npy", np.asarray(self._meta_off, dtype=np.int64))
+        for c in self.columns:
+            np.save(self.path / f"col_{c}.npy", np.asarray(self._codes[c], dtype=np.int32))
+        (self.path / "ids.json").write_text(json.dumps(self.ids, ensure_ascii=False), encoding="utf-8")
+        (self.path / "columns.json").write_text(json.dumps(
+            {c: list(self._vocab[c].keys()) for c in self.columns}, ensure_ascii=False), encoding="utf-8")
+        return len(self.ids)
+
+class DocTable:
+    """DocTableWriter 저장본 읽기(오프셋/코드 배열/blob 모두 mmap → 워커 프로세스끼리 페이지 캐시 공유)."""
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.ids: List[str] = json.loads((self.path / "ids.json").read_text(encoding="utf-8"))
+        self.row_of: Dict[str, int] = {cid: i for i, cid in enumerate(self.ids)}
+        self._text = _blob_reader(self.path / "text.bin")
+        self._meta = _blob_reader(self.path / "meta.bin")
+        self._text_off = np.load(self.path / "text_off.npy", mmap_mode="r")
+        self._meta_off = np.load(self.path / "meta_off.npy", mmap_mode="r")
+        vocab = json.loads((self.path / "columns.json").read_text(encoding="utf-8"))
+        self.vocab: Dict[str, List[Any]] = {c: list(vs) for c, vs in vocab.items()}
+        self.codes: Dict[str, np.ndarray] = {
+            c: np.load(self.path / f"col_{c}.npy", mmap_mode="r") for c in self.vocab
+        }
+        self._index: Optional[MetaBitmapIndex] = None
+        self._rs_cache: Dict[str, RowSet] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def text(self, row: int) -> str:
+        return bytes(self._text[self._text_off[row]:self._text_off[row + 1]]).decode("utf-8")
+
+    def meta(self, row: int) -> Dict[str, Any]:
+        return json.loads(bytes(self._meta[self._meta_off[row]:self._meta_off[row + 1]]).decode("utf-8"))
+
+    def rows(self, ids: Iterable[str]) -> List[int]:
+        """id → 행 번호(없는 id는 -1)."""
+        return [self.row_of.get(str(cid), -1) for cid in ids]
+
+    # ───────── where → 행 집합 ─────────
+    @property
+    def index(self) -> MetaBitmapIndex:
+        """코드 배열 그대로 비트맵 인덱스(posting은 첫 필터 검색 때 한 번 정렬)."""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = MetaBitmapIndex.from_codes(self.ids, self.codes, self.vocab)
+        return self._index
+
+    def _scan_leaf(self, key: str, cond: Any) -> RowSet:
+        # 인코딩 안 된 키는 메타 JSON을 전부 풀어 평가(느림 → 결과는 캐시)
+        return RowSet.of_mask(np.fromiter((match_where(self.meta(i), {key: cond}) for i in range(len(self))),
+                                          dtype=bool, count=len(self)))
+
+    def rowset_where(self, where: Optional[Dict[str, Any]]) -> Optional[RowSet]:
+        """where를 만족하는 행 집합. where가 없으면 None(필터 없음)."""
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True, ensure_ascii=False, default=str)
+        with self._lock:
+            hit = self._rs_cache.get(key)
+        if hit is not None:
+            return hit
+        rs = self.index.rowset(where, fallback=self._scan_leaf)
+        with self._lock:
+            if len(self._rs_cache) >= 256:
+                self._rs_cache.pop(next(iter(self._rs_cache)))
+            self._rs_cache[key] = rs
+        return rs
+
+    def mask_where(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """where를 만족하는 행 bool 마스크. where가 없으면 None(필터 없음)."""
+        rs = self.rowset_where(where)
+        return None if rs is None else rs.to_mask()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rows": len(self), "columns": {c: len(v) for c, v in self.vocab.items()},
+                "text_bytes": int(self._text.size), "meta_bytes": int(self._meta.size)}
+
+# ───────────── 저장본 교체(버전 폴더 + CURRENT 포인터) ─────────────
+# 저장본은 <path>/v<ns>/ 에 두고 <path>/CURRENT가 현재 버전 이름을 가리킨다.
+# 살아있는 프로세스가 mmap 중인 폴더를 지우거나 옮기지 않으므로 Windows에서도 교체가 실패하지 않고,
+# 포인터는 os.replace로 바뀌어 동시 로더는 항상 완성된 버전 하나를 본다.
+_CURRENT = "CURRENT"
+
+def live_dir(path: Path) -> Path:
+    """저장본 실제 폴더: CURRENT가 가리키는 버전, 포인터가 없으면 path 자체(이전 평면 저장본)."""
+    path = Path(path)
+    try:
+        name = (path / _CURRENT).read_text(encoding="utf-8").strip()
+    except OSError:
+        return path
+    return path / name if name else path
+
+def _prune(path: Path, keep: Sequence[str]) -> None:
+    """keep(현재·직전 버전)/포인터 외 정리. mmap 중이라 못 지운 건 남겨 두고 다음 교체 때 다시 시도."""
+    for child in path.iterdir():
+        if child.name in keep or child.name.startswith(_CURRENT):
+            continue
+        try:
+            if child.is_dir():
+                shutil.rmtree(child)
+            else:
+                child.unlink()
+        except OSError as e:
+            log.debug(f"[sidecar] keep {child} for now ({e})")
+
+def swap_dir(tmp: Path, path: Path) -> None:
+    """임시 폴더로 다 쓴 저장본을 새 버전으로 옮기고 CURRENT를 원자 교체(부분 저장본/빈 틈이 읽히지 않도록)."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    prev = live_dir(path).name         # 직전 버전은 남김(포인터를 막 읽은 로더가 열 수 있도록)
+    name = f"v{time.time_ns()}"
+    Path(tmp).rename(path / name)
+    ptr = path / f"{_CURRENT}.{name}.tmp"
+    ptr.write_text(name, encoding="utf-8")
+    os.replace(ptr, path / _CURRENT)
+    _prune(path, (name, prev))
+
+def drop_dir(path: Path) -> None:
+    """저장본 무효화(reset용): 포인터/평면 meta.json을 먼저 지워 로더가 못 보게 한 뒤 나머지는 가능한 만큼 삭제."""
+    path = Path(path)
+    for f in (path / _CURRENT, path / "meta.json"):
+        try:
+            f.unlink()
+        except FileNotFoundError:
+            pass
+    shutil.rmtree(path, ignore_errors=True)
+
+def write_meta(path: Path, **fields: Any) -> None:
+    (Path(path) / "meta.json").write_text(json.dumps({**fields, "saved_at": time.time()}, ensure_ascii=False),
+                                          encoding="utf-8")
+
+def export_collection(out_dir: Path, *, batch: int = 2000, reuse_embeddings: bool = True) -> Dict[str, Any]:
+    """
+    Chroma 컬렉션 → out_dir/table(DocTable) + out_dir/vectors.npy(정규화 float32, 행 순서 동일).
+    reuse_embeddings=False면 문서를 배치로 다시 인코딩(embed_passages 한 번에 batch개).
+    파일 백엔드 빌드의 공통 1단계.
+    """
+    from . import chroma_store
+    from ...domain.embeddings import embed_passages, EMBED_MODEL
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    coll = chroma_store.get_collection()
+    total = int(coll.count())
+    writer = DocTableWriter(out_dir / "table")
+    vecs: Optional[np.ndarray] = None
+    include = ["documents", "metadatas"] + (["embeddings"] if reuse_embeddings else [])
+    t0 = time.perf_counter()
+    row = 0
+    while row < total:
+        got = coll.get(include=include, limit=batch, offset=row)
+        ids = got.get("ids") or []
+        if not ids:
+            break
+        docs = got.get("documents") or [""] * len(ids)
+        embs = got.get("embeddings") if reuse_embeddings else None
+        x = np.asarray(embs if embs is not None and len(embs) else embed_passages(list(docs)), dtype=np.float32)
+        x /= (np.linalg.norm(x, axis=1, keepdims=True) + 1e-8)
+        if vecs is None:
+            vecs = np.lib.format.open_memmap(out_dir / "vectors.npy", mode="w+", dtype=np.float32,
+                                             shape=(total, x.shape[1]))
+        n = min(len(ids), total - row)
+        vecs[row:row + n] = x[:n]
+        writer.append(ids[:n], docs[:n], (got.get("metadatas") or [{}] * len(ids))[:n])
+        row += n
+        log.info(f"[export] {row}/{total} rows")
+    writer.close()
+    dim = int(vecs.shape[1]) if vecs is not None else 0
+    if vecs is not None:
+        vecs.flush()
+        del vecs
+    log.info(f"[export] done rows={row} dim={dim} in {time.perf_counter() - t0:.1f}s")
+    return {"rows": row, "dim": dim, "embed_model": EMBED_MODEL,
+            "collection": chroma_store.collection_name(), "reused_embeddings": bool(reuse_embeddings)}
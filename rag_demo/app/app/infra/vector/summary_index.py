@@ -0,0 +1,244 @@
+# app/app/infra/vector/summary_index.py
+"""
+문서(작품) 단위 벡터 인덱스 — 계층 검색 1단계용.
+- 문서 벡터 = 요약 섹션 청크 임베딩 평균(요약이 없으면 전체 청크 중심), 정규화
+- 컬렉션에 저장된 청크 임베딩을 그대로 쓰므로 재인코딩 없음
+- 적재 중에는 upsert 훅으로 바뀐 doc_id만 표시 → 검색/저장 직전에 그 문서 청크만 다시 읽어 갱신
+- 저장: Chroma 폴더 옆 docsum_<collection>/ (vecs.npy mmap + doc_ids/titles JSON)
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import json, logging, os, shutil, threading, time
+import numpy as np
+
+from . import chroma_store
+from .sidecar import drop_dir, live_dir, swap_dir
+
+log = logging.getLogger("summary_index")
+
+SUMMARY_SECTION = "요약"
+
+def _title_of(meta: Dict[str, Any]) -> str:
+    return str(meta.get("seed_title") or meta.get("title") or "")
+
+class DocSummaryIndex:
+    """doc_id → 정규화 문서 벡터(행). 검색은 행렬-벡터곱 한 번(문서 수는 청크 수보다 한두 자릿수 작음)."""
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.doc_ids: List[str] = []
+        self.titles: List[str] = []
+        self.vecs = np.zeros((0, 0), dtype=np.float32)
+        self._pos: Dict[str, int] = {}
+        self._dirty: Set[str] = set()
+        self.summary_docs = 0          # 요약 섹션으로 만든 문서 수(나머지는 청크 중심)
+        self.ready = False
+        self.build_ms = 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.doc_ids, self.titles, self._pos = [], [], {}
+            self.vecs = np.zeros((0, 0), dtype=np.float32)
+            self._dirty.clear()
+            self.summary_docs = 0
+
+    # ───────── build / update ─────────
+    @staticmethod
+    def _accumulate(acc: Dict[str, List[Any]], metas: Iterable[Dict[str, Any]], embs: Any) -> None:
+        """acc[doc_id] = [요약 합, 요약 수, 전체 합, 전체 수, 제목]."""
+        for meta, e in zip(metas, embs):
+            meta = meta or {}
+            did = meta.get("doc_id")
+            if not did or e is None:
+                continue
+            e = np.asarray(e, dtype=np.float32)
+            ent = acc.get(str(did))
+            if ent is None:
+                ent = acc[str(did)] = [np.zeros_like(e), 0, np.zeros_like(e), 0, ""]
+            if meta.get("section") == SUMMARY_SECTION:
+                ent[0] += e; ent[1] += 1
+            ent[2] += e; ent[3] += 1
+            if not ent[4]:
+                ent[4] = _title_of(meta)
+
+    def _apply(self, acc: Dict[str, List[Any]]) -> None:
+        if not acc:
+            return
+        with self._lock:
+            dids = list(acc)
+            V = np.stack([a[0] / a[1] if a[1] else a[2] / max(1, a[3]) for a in acc.values()]).astype(np.float32)
+            V /= (np.linalg.norm(V, axis=1, keepdims=True) + 1e-8)
+            if self.vecs.size == 0:
+                self.vecs = np.zeros((0, V.shape[1]), dtype=np.float32)
+            elif not self.vecs.flags.writeable:
+                self.vecs = np.array(self.vecs)   # mmap 저장본 → 메모리로 옮긴 뒤 갱신
+            new = [i for i, d in enumerate(dids) if d not in self._pos]
+            old = [i for i, d in enumerate(dids) if d in self._pos]
+            if old:
+                self.vecs[[self._pos[dids[i]] for i in old]] = V[old]
+                for i in old:
+                    self.titles[self._pos[dids[i]]] = acc[dids[i]][4]
+            if new:
+                for i in new:
+                    self._pos[dids[i]] = len(self.doc_ids)
+                    self.doc_ids.append(dids[i]); self.titles.append(acc[dids[i]][4])
+                self.vecs = np.vstack([self.vecs, V[new]])
+            self.summary_docs = self.summary_docs + sum(1 for i in new if acc[dids[i]][1])
+
+    def build_from_collection(self, coll: Any = None, *, batch: int = 2000) -> int:
+        """컬렉션 전체(메타+저장 임베딩)를 페이지 단위로 읽어 문서별 합산."""
+        coll = coll if coll is not None else chroma_store.get_collection()
+        t0 = time.perf_counter()
+        acc: Dict[str, List[Any]] = {}
+        offset = 0
+        while True:
+            got = coll.get(include=["metadatas", "embeddings"], limit=batch, offset=offset)
+            ids = got.get("ids") or []
+            if not ids:
+                break
+            embs = got.get("embeddings")
+            self._accumulate(acc, got.get("metadatas") or [{}] * len(ids), embs if embs is not None else [None] * len(ids))
+            offset += len(ids)
+        with self._lock:
+            dirty = set(self._dirty)       # 빌드 중 들어온 upsert 표시는 유지
+            self.clear()
+            self._dirty = dirty
+            self._apply(acc)
+            self.ready = True
+            self.build_ms = (time.perf_counter() - t0) * 1000.0
+        log.info(f"[summary_index] built docs={len(self)} (summary={self.summary_docs}) in {self.build_ms:.0f}ms")
+        return len(self)
+
+    def mark_dirty(self, doc_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._dirty.update(str(d) for d in doc_ids if d)
+
+    def refresh(self, *, batch_docs: int = 200) -> int:
+        """표시된 문서의 청크만 다시 읽어 문서 벡터 재계산."""
+        with self._lock:
+            todo, self._dirty = sorted(self._dirty), set()
+        if not todo:
+            return 0
+        coll = chroma_store.get_collection()
+        for s in range(0, len(todo), batch_docs):
+            part = todo[s:s + batch_docs]
+            got = coll.get(where={"doc_id": {"$in": part}}, include=["metadatas", "embeddings"])
+            embs = got.get("embeddings")
+            acc: Dict[str, List[Any]] = {}
+            self._accumulate(acc, got.get("metadatas") or [], embs if embs is not None else [])
+            self._apply(acc)
+        return len(todo)
+
+    # ───────── search ─────────
+    def search(self, qv: Any, n: int) -> List[Tuple[str, str, float]]:
+        """질의 벡터 → 상위 n개 (doc_id, 제목, 코사인)."""
+        if self._dirty:
+            self.refresh()
+        with self._lock:
+            if not self.doc_ids:
+                return []
+            q = np.asarray(qv, dtype=np.float32).reshape(-1)
+            s = np.asarray(self.vecs @ (q / (np.linalg.norm(q) + 1e-8)))
+            n = min(int(n), s.size)
+            top = np.argpartition(-s, n - 1)[:n] if n < s.size else np.arange(s.size)
+            top = top[np.argsort(-s[top], kind="stable")]
+            return [(self.doc_ids[i], self.titles[i], float(s[i])) for i in top]
+
+    # ───────── persist ─────────
+    def save(self, path: Path) -> None:
+        """임시 폴더에 쓰고 교체(부분 저장본이 읽히지 않도록)."""
+        if self._dirty:
+            self.refresh()
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with self._lock:
+            shutil.rmtree(tmp, ignore_errors=True)
+            tmp.mkdir(parents=True, exist_ok=True)
+            np.save(tmp / "vecs.npy", np.asarray(self.vecs, dtype=np.float32))
+            (tmp / "doc_ids.json").write_text(json.dumps(self.doc_ids, ensure_ascii=False), encoding="utf-8")
+            (tmp / "titles.json").write_text(json.dumps(self.titles, ensure_ascii=False), encoding="utf-8")
+            (tmp / "meta.json").write_text(json.dumps(
+                {"docs": len(self.doc_ids), "summary_docs": self.summary_docs, "saved_at": time.time()}
+            ), encoding="utf-8")
+            swap_dir(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "DocSummaryIndex":
+        path = live_dir(path)
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        idx = cls()
+        idx.doc_ids = json.loads((path / "doc_ids.json").read_text(encoding="utf-8"))
+        idx.titles = json.loads((path / "titles.json").read_text(encoding="utf-8"))
+        idx._pos = {d: i for i, d in enumerate(idx.doc_ids)}
+        idx.vecs = np.load(path / "vecs.npy", mmap_mode="r")
+        idx.summary_docs = int(meta.get("summary_docs") or 0)
+        idx.ready = True
+        return idx
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "docs": len(self), "summary_docs": self.summary_docs,
+                "centroid_docs": len(self) - self.summary_docs, "dirty": len(self._dirty),
+                "build_ms": round(self.build_ms, 1)}
+
+# ───────────── singleton + hooks ─────────────
+_index = DocSummaryIndex()
+_index_lock = threading.Lock()
+
+def enabled() -> bool:
+    return os.getenv("RAG_DOCSUM", "1") == "1"
+
+def index_path() -> Path:
+    return Path(chroma_store.persist_dir()) / f"docsum_{chroma_store.collection_name()}"
+
+def get_summary_index() -> DocSummaryIndex:
+    """저장본이 있으면 mmap 로드, 없으면 컬렉션에서 빌드 후 저장(최초 1회)."""
+    global _index
+    if not _index.ready:
+        with _index_lock:
+            if not _index.ready:
+                p = index_path()
+                t0 = time.perf_counter()
+                loaded = None
+                if (live_dir(p) / "meta.json").exists():
+                    try:
+                        loaded = DocSummaryIndex.load(p)
+                        loaded.mark_dirty(_index._dirty)
+                        log.info(f"[summary_index] loaded docs={len(loaded)} from {p} "
+                                 f"in {(time.perf_counter() - t0) * 1000:.0f}ms")
+                    except Exception as e:
+                        log.warning(f"[summary_index] load failed ({p}): {e} → rebuild")
+                if loaded is None:
+                    _index.build_from_collection()
+                    _index.save(p)
+                else:
+                    _index = loaded
+    return _index
+
+def save_summary_index() -> Optional[str]:
+    """ingest 끝에서 호출(바뀐 문서 갱신 후 저장). 비활성이면 None."""
+    if not enabled():
+        return None
+    p = index_path()
+    idx = get_summary_index()
+    idx.save(p)
+    log.info(f"[summary_index] saved docs={len(idx)} → {p}")
+    return str(p)
+
+def _on_upsert(ids: List[str], documents: List[str], metas: List[Dict[str, Any]]) -> None:
+    # 벡터는 훅으로 오지 않으므로 doc_id만 표시(빌드 전이면 빌드/로드 시 반영)
+    if enabled():
+        _index.mark_dirty((m or {}).get("doc_id") for m in metas)
+
+def _on_reset() -> None:
+    _index.clear()
+    _index.ready = False
+    drop_dir(index_path())
+
+chroma_store.on_upsert(_on_upsert)
+chroma_store.on_reset(_on_reset)
+
+def summary_index_stats() -> Dict[str, Any]:
+    return _index.stats()
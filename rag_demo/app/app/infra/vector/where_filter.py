@@ -0,0 +1,39 @@
+# app/app/infra/vector/where_filter.py
+from __future__ import annotations
+from typing import Any, Dict, Optional
+
+def match_value(v: Any, cond: Any) -> bool:
+    """단일 값 v가 조건(값 또는 {"$op": arg})을 만족하는지. 없는 키는 v=None."""
+    if not isinstance(cond, dict):
+        return v == cond
+    for op, arg in cond.items():
+        if op == "$eq" and not v == arg: return False
+        if op == "$ne" and not v != arg: return False
+        if op == "$in" and v not in (arg or []): return False
+        if op == "$nin" and v in (arg or []): return False
+        if op in ("$gt", "$gte", "$lt", "$lte"):
+            try:
+                if op == "$gt" and not v > arg: return False
+                if op == "$gte" and not v >= arg: return False
+                if op == "$lt" and not v < arg: return False
+                if op == "$lte" and not v <= arg: return False
+            except TypeError:
+                return False
+    return True
+
+def match_where(meta: Optional[Dict[str, Any]], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Chroma where 문법의 부분집합을 파이썬에서 평가(로컬 보조 인덱스 결과 후필터용).
+    지원: {"k": v}, {"k": {"$eq|$ne|$in|$nin|$gt|$gte|$lt|$lte": ...}}, {"$and": [...]}, {"$or": [...]}
+    """
+    if not where:
+        return True
+    meta = meta or {}
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(match_where(meta, w) for w in cond or []): return False
+        elif key == "$or":
+            if not any(match_where(meta, w) for w in cond or []): return False
+        elif not match_value(meta.get(key), cond):
+            return False
+    return True
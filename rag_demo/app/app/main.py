@@ -1,6 +1,7 @@
+import os, threading
 from fastapi import FastAPI
 from .security.auth_middleware import AuthOnlyMiddleware
-from .api import query_router, search_router, debug_router, admin_ingest_router, rag_router
+from .api import query_router, search_router, debug_router, admin_ingest_router, rag_router, metrics_router
 
 app = FastAPI()
 
@@ -18,6 +19,35 @@ app.include_router(search_router.router)
 app.include_router(debug_router.router)
 app.include_router(admin_ingest_router.router)
 app.include_router(rag_router.router)
+app.include_router(metrics_router.router)
+
+@app.on_event("startup")
+def _warm_indexes():
+    # doc_id→청크 인덱스는 컬렉션 메타 전체 스캔이라 백그라운드에서 빌드(첫 요청은 필요 시 동기 빌드)
+    if os.getenv("RAG_DOC_INDEX_WARM", "1") == "1":
+        from .infra.vector.doc_index import get_doc_index
+        threading.Thread(target=get_doc_index, name="doc-index-warm", daemon=True).start()
+    # 별칭 사전(저장본 없으면 컬렉션 메타로 빌드)
+    from .infra.vector.alias_index import get_alias_index
+    threading.Thread(target=get_alias_index, name="alias-index-warm", daemon=True).start()
+    # 문서 요약 벡터(계층 검색 1단계): 저장본 mmap 로드, 없으면 컬렉션 임베딩으로 빌드
+    from .infra.vector.summary_index import enabled as docsum_enabled, get_summary_index
+    if docsum_enabled():
+        threading.Thread(target=get_summary_index, name="summary-index-warm", daemon=True).start()
+    # BM25 저장본(vocab/ids JSON + mmap)도 첫 hybrid 요청 전에 로드
+    from .infra.vector.bm25_index import enabled as bm25_enabled, get_bm25_index
+    if bm25_enabled():
+        threading.Thread(target=get_bm25_index, name="bm25-warm", daemon=True).start()
+    # 파일 벡터 백엔드(faiss 등)는 시작 시 mmap 로드(실패하면 Chroma 폴백이 여기서 결정됨)
+    from .configure import config
+    from .infra.vector import vector_backend
+    if (config.VECTOR_BACKEND or "chroma") != "chroma":
+        threading.Thread(target=vector_backend, name="vector-backend-warm", daemon=True).start()
+    else:
+        # Chroma where 검색용 메타 비트맵(section/doc_id/seed_title) — 준비 전 요청은 Chroma where 그대로
+        from .infra.vector import prefilter
+        if prefilter.ENABLED:
+            threading.Thread(target=prefilter.get_meta_index, name="meta-index-warm", daemon=True).start()
 
 @app.get("/health")
 def health():
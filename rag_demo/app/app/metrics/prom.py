@@ -0,0 +1,145 @@
+# app/app/metrics/prom.py
+"""
+프로세스 내 지표 레지스트리 + Prometheus 텍스트 노출(GET /metrics).
+- 단계 지연 히스토그램(초): embed / vector_query / mmr / rerank / expand / context / llm
+- 카운터: 저신뢰 조기 종료, LLM 오류, retrieve 호출
+- 캐시 적중/미스, 추론 풀 대기열, 로드된 모델은 스크레이프 시점에 기존 stats()에서 읽음(hot path 비용 없음)
+hot path는 히스토그램 bisect 1회 + 락 안 덧셈, 카운터는 락 안 덧셈뿐. RAG_METRICS=0이면 전부 no-op.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Tuple
+import logging, os, threading
+
+from ..utils.microbatch import Histogram
+
+log = logging.getLogger("metrics")
+
+ENABLED = os.getenv("RAG_METRICS", "1") == "1"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGES = ("embed", "vector_query", "mmr", "rerank", "expand", "context", "llm")
+# ms 상한(임베딩/벡터 질의 수 ms ~ LLM 수십 초). 내부는 ms로 쌓고 노출할 때 초로 바꾼다
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_stage_hist: Dict[str, Histogram] = {s: Histogram(BUCKETS_MS) for s in STAGES}
+
+# 카운터: (이름, 정렬된 라벨) → 값. 라벨 없는 건 0부터 노출되도록 미리 등록
+_COUNTER_HELP = {
+    "rag_low_confidence_total": "Requests short-circuited because retrieval confidence was below RAG_MIN_CONF.",
+    "rag_llm_errors_total": "LLM calls that failed (reason=timeout|error).",
+    "rag_retrieve_total": "Calls to retrieval_service.retrieve.",
+}
+_counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {
+    ("rag_low_confidence_total", ()): 0,
+    ("rag_llm_errors_total", (("reason", "error"),)): 0,
+    ("rag_llm_errors_total", (("reason", "timeout"),)): 0,
+}
+_lock = threading.Lock()
+
+# ───────────── hot path ─────────────
+def observe_stage(stage: str, ms: float) -> None:
+    """단계 지연(ms) 기록. 모르는 단계는 무시."""
+    if ENABLED:
+        h = _stage_hist.get(stage)
+        if h is not None:
+            h.observe(ms)
+
+def inc(name: str, n: float = 1, **labels: Any) -> None:
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+# ───────────── exposition ─────────────
+def _esc(v: Any) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(pairs: Tuple[Tuple[str, Any], ...]) -> str:
+    return "{" + ",".join(f'{k}="{_esc(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+def _num(v: Any) -> str:
+    f = float(v)
+    return str(int(f)) if f.is_integer() else repr(f)
+
+def _family(out: List[str], name: str, kind: str, help_: str,
+            samples: List[Tuple[Tuple[Tuple[str, Any], ...], Any]]) -> None:
+    out.append(f"# HELP {name} {help_}")
+    out.append(f"# TYPE {name} {kind}")
+    for labels, v in samples:
+        out.append(f"{name}{_labels(labels)} {_num(v)}")
+
+def _render_histograms(out: List[str]) -> None:
+    name = "rag_stage_duration_seconds"
+    out.append(f"# HELP {name} Per-stage latency of the RAG pipeline.")
+    out.append(f"# TYPE {name} histogram")
+    for stage, h in _stage_hist.items():
+        snap = h.snapshot()
+        acc = 0
+        for b, c in zip(list(h.buckets) + [float("inf")], snap["buckets"].values()):
+            acc += c
+            le = "+Inf" if b == float("inf") else _num(b / 1000.0)
+            out.append(f"{name}_bucket{_labels((('stage', stage), ('le', le)))} {acc}")
+        out.append(f"{name}_sum{_labels((('stage', stage),))} {_num(snap['sum'] / 1000.0)}")
+        out.append(f"{name}_count{_labels((('stage', stage),))} {snap['count']}")
+
+def _render_counters(out: List[str]) -> None:
+    with _lock:
+        items = sorted(_counters.items())
+    by_name: Dict[str, List[Tuple[Tuple[Tuple[str, str], ...], float]]] = {}
+    for (name, labels), v in items:
+        by_name.setdefault(name, []).append((labels, v))
+    for name, samples in by_name.items():
+        _family(out, name, "counter", _COUNTER_HELP.get(name, name), samples)
+
+def _cache_stats() -> Dict[str, Dict[str, Any]]:
+    from ..services.answer_cache import get_answer_cache
+    from ..services.retrieval_cache import get_retrieval_cache
+    from ..services.rerank_cache import get_rerank_cache
+    from ..domain.embeddings import query_cache_stats
+    return {"answer": get_answer_cache().stats(), "retrieval": get_retrieval_cache().stats(),
+            "rerank": get_rerank_cache().stats(), "query_embed": query_cache_stats()}
+
+def _render_caches(out: List[str]) -> None:
+    caches = _cache_stats()
+    _family(out, "rag_cache_hits_total", "counter", "Cache hits per cache.",
+            [((("cache", c),), s.get("hits", 0)) for c, s in caches.items()])
+    _family(out, "rag_cache_misses_total", "counter", "Cache misses per cache.",
+            [((("cache", c),), s.get("misses", 0)) for c, s in caches.items()])
+
+def _render_pool(out: List[str]) -> None:
+    from ..infra.inference_pool import pool_stats
+    p = pool_stats()
+    _family(out, "rag_executor_queue_depth", "gauge", "Jobs waiting in the inference executor.", [((), p["pending"])])
+    _family(out, "rag_executor_running", "gauge", "Jobs running in the inference executor.", [((), p["running"])])
+    _family(out, "rag_executor_workers", "gauge", "Inference executor worker threads.", [((), p["workers"])])
+    _family(out, "rag_executor_rejected_total", "counter", "Jobs rejected because the queue was full.",
+            [((), p["rejected"])])
+
+def _render_models(out: List[str]) -> None:
+    from ..infra.model_registry import model_stats
+    m = model_stats()
+    _family(out, "rag_models_loaded", "gauge", "Models loaded in the process-wide registry.", [((), m["count"])])
+    _family(out, "rag_model_info", "gauge", "Loaded model (value is always 1).",
+            [((("key", k), ("kind", i.get("kind") or ""), ("device", i.get("device") or "")), 1)
+             for k, i in sorted(m["models"].items())])
+    if m.get("rss_mb") is not None:
+        _family(out, "process_resident_memory_bytes", "gauge", "Resident memory size in bytes.",
+                [((), int(m["rss_mb"] * 1024 * 1024))])
+
+_COLLECTORS: Tuple[Callable[[List[str]], None], ...] = (_render_caches, _render_pool, _render_models)
+
+def render() -> str:
+    """Prometheus 텍스트 포맷(0.0.4). 수집기 하나가 실패해도 나머지는 노출."""
+    out: List[str] = []
+    _render_histograms(out)
+    _render_counters(out)
+    for fn in _COLLECTORS:
+        part: List[str] = []
+        try:
+            fn(part)
+        except Exception as e:
+            log.warning(f"[metrics] {fn.__name__} failed: {e}")
+            continue
+        out.extend(part)
+    return "\n".join(out) + "\n"
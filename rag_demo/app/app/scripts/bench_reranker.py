@@ -0,0 +1,98 @@
+# app/app/scripts/bench_reranker.py
+# -*- coding: utf-8 -*-
+"""
+리랭커 백엔드 비교(torch CrossEncoder vs ONNX Runtime int8).
+- 쿼리: 컬렉션 메타에서 제목을 샘플링(또는 --queries 파일, 한 줄 1개)
+- 후보: Chroma 상위 --cand개 (RagService._rerank와 같은 800자 컷)
+- 점수 일치: Pearson / Spearman / max|Δ| / top-k 겹침
+- 지연: 쿼리당 predict 시간 p50/p95 (워밍업 제외)
+
+python -m app.app.scripts.bench_reranker --N 50 --cand 24 --k 6
+"""
+from __future__ import annotations
+import argparse, json, random, time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.app.infra.model_registry import get_reranker
+from app.app.infra.vector.chroma_store import search as chroma_search, get_collection
+from app.app.services.adapters import flatten_chroma_result
+from app.app.metrics.quality import p_percentile, average
+
+def _sample_queries(n: int, seed: int) -> List[str]:
+    coll = get_collection()
+    got = coll.get(include=["metadatas"], limit=max(n * 5, 200))
+    titles = sorted({(m or {}).get("seed_title") or (m or {}).get("title") or "" for m in (got.get("metadatas") or [])} - {""})
+    random.Random(seed).shuffle(titles)
+    return titles[:n]
+
+def _pairs_for(q: str, cand: int) -> List[Tuple[str, str]]:
+    res = chroma_search(query=q, n=cand, include_docs=True, include_metas=False)
+    return [(q, (it.get("text") or "")[:800]) for it in flatten_chroma_result(res)]
+
+def _rankdata(x: np.ndarray) -> np.ndarray:
+    r = np.empty(len(x), dtype=np.float64)
+    r[np.argsort(x, kind="stable")] = np.arange(len(x))
+    return r
+
+def _corr(a: np.ndarray, b: np.ndarray) -> float:
+    if len(a) < 2 or np.std(a) == 0 or np.std(b) == 0:
+        return 1.0
+    return float(np.corrcoef(a, b)[0, 1])
+
+def _time_predict(model, pairs, batch_size: int) -> Tuple[np.ndarray, float]:
+    t0 = time.perf_counter()
+    s = np.asarray(model.predict(pairs, batch_size=batch_size, convert_to_numpy=True), dtype=np.float32)
+    return s, (time.perf_counter() - t0) * 1000.0
+
+def run(N: int, cand: int, k: int, batch_size: int, seed: int, queries_file: str = "") -> Dict:
+    queries = (
+        [l.strip() for l in Path(queries_file).read_text(encoding="utf8").splitlines() if l.strip()][:N]
+        if queries_file else _sample_queries(N, seed)
+    )
+    workload = [p for p in (_pairs_for(q, cand) for q in queries) if p]
+    if not workload:
+        raise SystemExit("no candidates (empty collection?)")
+
+    ref = get_reranker(backend="torch", device="cpu", batched=False)
+    onx = get_reranker(backend="onnx", batched=False)
+    # 워밍업(세션 초기화/커널 선택 비용 제외)
+    for m in (ref, onx):
+        m.predict(workload[0], batch_size=batch_size)
+
+    lat_t, lat_o, pear, spear, maxd, overlap = [], [], [], [], [], []
+    for pairs in workload:
+        st, tt = _time_predict(ref, pairs, batch_size)
+        so, to = _time_predict(onx, pairs, batch_size)
+        lat_t.append(tt); lat_o.append(to)
+        pear.append(_corr(st, so))
+        spear.append(_corr(_rankdata(st), _rankdata(so)))
+        maxd.append(float(np.max(np.abs(st - so))))
+        kk = min(k, len(pairs))
+        overlap.append(len(set(np.argsort(-st)[:kk]) & set(np.argsort(-so)[:kk])) / float(kk))
+
+    summary = {
+        "queries": len(workload), "cand": cand, "k": k, "batch_size": batch_size,
+        "torch_ms": {"p50": round(p_percentile(lat_t, 50), 1), "p95": round(p_percentile(lat_t, 95), 1)},
+        "onnx_ms": {"p50": round(p_percentile(lat_o, 50), 1), "p95": round(p_percentile(lat_o, 95), 1)},
+        "speedup_p50": round(p_percentile(lat_t, 50) / max(p_percentile(lat_o, 50), 1e-6), 2),
+        "pearson": round(average(pear), 4),
+        "spearman": round(average(spear), 4),
+        "max_abs_diff": round(max(maxd), 4),
+        f"top{k}_overlap": round(average(overlap), 4),
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return summary
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--N", type=int, default=50, help="쿼리 수")
+    ap.add_argument("--cand", type=int, default=24, help="쿼리당 리랭크 후보 수")
+    ap.add_argument("--k", type=int, default=6, help="top-k 겹침 기준")
+    ap.add_argument("--batch", type=int, default=64)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--queries", default="", help="쿼리 파일(한 줄 1개). 비우면 컬렉션에서 샘플링")
+    args = ap.parse_args()
+    run(N=args.N, cand=args.cand, k=args.k, batch_size=args.batch, seed=args.seed, queries_file=args.queries)
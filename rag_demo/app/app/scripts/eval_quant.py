@@ -0,0 +1,123 @@
+# app/app/scripts/eval_quant.py
+# -*- coding: utf-8 -*-
+"""
+int8 양자화 저장본 vs 원정밀도 저장본 비교(같은 백엔드).
+- 메모리: 1차 검색이 매번 훑는 파일 크기(scan_mb) 절감량 / 재채점용 원본(rescore_mb, 후보 행만 읽음)
+- 품질: goldset에 대해 eval_service.evaluate_hit의 hit@k / mrr@k, 그리고 원정밀도 top-k 대비 이웃 재현율
+- 지연: 쿼리당 search p50/p95
+
+goldset: JSON 배열 또는 JSONL, 한 줄 {"q": "...", "gold": {"title"|"url"|"id": ...}}
+  (--gold 없으면 문서 테이블에서 요약 청크의 seed_title을 질의로, title을 정답으로 샘플링)
+
+python -m app.app.scripts.eval_quant --backend npmmap --gold gold.jsonl --k 5 --mode title
+python -m app.app.scripts.eval_quant --backend faiss --build          # <index>_int8 없으면 빌드
+"""
+from __future__ import annotations
+import argparse, json, random, time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from app.app.services.eval_service import evaluate_hit
+from app.app.metrics.quality import p_percentile, average
+from app.app.infra.vector.sidecar import live_dir
+
+def _load_gold(path: str) -> List[Dict[str, Any]]:
+    text = Path(path).read_text(encoding="utf8").strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(l) for l in text.splitlines() if l.strip()]
+
+def _sample_gold(store, n: int, seed: int) -> List[Dict[str, Any]]:
+    rows = list(range(len(store.table)))
+    random.Random(seed).shuffle(rows)
+    out, seen = [], set()
+    for r in rows:
+        m = store.table.meta(r)
+        q, title = m.get("seed_title") or m.get("title"), m.get("title")
+        if m.get("section") != "요약" or not q or not title or title in seen:
+            continue
+        seen.add(title)
+        out.append({"q": q, "gold": {"title": title}})
+        if len(out) >= n:
+            break
+    return out
+
+def _open_stores(backend: str, base: str, quant: str, build: bool) -> Tuple[Any, Any]:
+    if backend == "npmmap":
+        from app.app.infra.vector import npmmap_store as mod
+        base_dir = Path(base or mod.index_path())
+        # 같은 저장본에 코드가 있으면 원정밀도 쪽은 코드 없이 열어 비교
+        quant_dir = Path(quant) if quant else (base_dir if (live_dir(base_dir) / "quant.npz").exists()
+                                               else base_dir.with_name(base_dir.name + "_int8"))
+        if build and not (live_dir(quant_dir) / "meta.json").exists():
+            mod.build_index(quant="int8", path=quant_dir)
+        return mod.NpMmapStore(base_dir, use_quant=False), mod.NpMmapStore(quant_dir)
+    from app.app.infra.vector import faiss_store as mod
+    base_dir = Path(base or mod.index_path())
+    quant_dir = Path(quant) if quant else base_dir.with_name(base_dir.name + "_int8")
+    if build and not (live_dir(quant_dir) / "meta.json").exists():
+        mod.build_index(kind=json.loads((live_dir(base_dir) / "meta.json").read_text(encoding="utf8")).get("kind", "hnsw"),
+                        quant="int8", path=quant_dir)
+    return mod.FaissStore(base_dir), mod.FaissStore(quant_dir)
+
+def _neighbors(store, goldset: List[Dict[str, Any]], k: int) -> Tuple[List[List[str]], List[float]]:
+    ids, lat = [], []
+    for row in goldset:
+        t0 = time.perf_counter()
+        res = store.search(row["q"], n=k, include_docs=False, include_metas=False)
+        lat.append((time.perf_counter() - t0) * 1000.0)
+        ids.append(res["ids"][0])
+    return ids, lat
+
+def run(backend: str, gold: str, k: int, mode: str, sample: int, seed: int,
+        base: str = "", quant: str = "", build: bool = False) -> Dict[str, Any]:
+    s_full, s_q8 = _open_stores(backend, base, quant, build)
+    goldset = _load_gold(gold) if gold else _sample_gold(s_full, sample, seed)
+    if not goldset:
+        raise SystemExit("empty goldset")
+    if not gold:
+        mode = "title"
+
+    # 워밍업(질의 임베딩 캐시/페이지 캐시) 후 측정
+    _neighbors(s_full, goldset[:5], k); _neighbors(s_q8, goldset[:5], k)
+    nb_full, lat_full = _neighbors(s_full, goldset, k)
+    nb_q8, lat_q8 = _neighbors(s_q8, goldset, k)
+    overlap = [len(set(a) & set(b)) / float(max(1, len(a))) for a, b in zip(nb_full, nb_q8)]
+
+    ev_full = evaluate_hit(goldset, k=k, mode=mode, search_fn=s_full.search)
+    ev_q8 = evaluate_hit(goldset, k=k, mode=mode, search_fn=s_q8.search)
+    m_full, m_q8 = s_full.memory(), s_q8.memory()
+    summary = {
+        "backend": backend, "queries": len(goldset), "k": k, "mode": mode,
+        "memory": {
+            "full": m_full, "int8": m_q8,
+            "scan_saved_mb": round(m_full["scan_mb"] - m_q8["scan_mb"], 1),
+            "scan_ratio": round(m_q8["scan_mb"] / max(m_full["scan_mb"], 1e-6), 3),
+        },
+        "quality": {
+            "full": {"hit@k": round(ev_full["hit@k"], 4), "mrr@k": round(ev_full["mrr@k"], 4)},
+            "int8": {"hit@k": round(ev_q8["hit@k"], 4), "mrr@k": round(ev_q8["mrr@k"], 4)},
+            "hit@k_lost": round(ev_full["hit@k"] - ev_q8["hit@k"], 4),
+            f"neighbor_recall@{k}": round(average(overlap), 4),
+        },
+        "latency_ms": {
+            "full": {"p50": round(p_percentile(lat_full, 50), 2), "p95": round(p_percentile(lat_full, 95), 2)},
+            "int8": {"p50": round(p_percentile(lat_q8, 50), 2), "p95": round(p_percentile(lat_q8, 95), 2)},
+        },
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return summary
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backend", default="npmmap", choices=["npmmap", "faiss"])
+    ap.add_argument("--gold", default="", help="goldset 파일(JSON/JSONL). 비우면 문서 테이블에서 샘플링")
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--mode", default="title", choices=["page", "title", "chunk"])
+    ap.add_argument("--sample", type=int, default=200, help="샘플링 goldset 크기")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--base", default="", help="원정밀도 저장본 폴더(기본: 백엔드 index_path())")
+    ap.add_argument("--quant", default="", help="int8 저장본 폴더(기본: <base>_int8, npmmap은 base에 코드가 있으면 base)")
+    ap.add_argument("--build", action="store_true", help="int8 저장본이 없으면 빌드")
+    args = ap.parse_args()
+    run(args.backend, args.gold, args.k, args.mode, args.sample, args.seed, args.base, args.quant, args.build)
@@ -7,6 +7,10 @@ from ..infra.vector.chroma_store import (
     reset_collection,
     hard_reset_persist_dir,
 )
+from ..infra.vector.bm25_index import save_bm25_index  # import 시 upsert 훅 등록 → 적재와 함께 BM25 색인
+from ..infra.vector.alias_index import save_alias_index  # 〃 aliases_csv/aliases_norm_csv → 별칭 사전
+from ..infra.vector.summary_index import save_summary_index  # 〃 문서 요약 벡터(계층 검색 1단계)
+from ..infra.vector import refresh_file_index  # 파일 백엔드(faiss/npmmap)면 적재 후 재빌드
 from ..domain.embeddings import EmbedAdapter
 
 # ---- 정규화 & 별칭 유틸 -------------------------------------------------
@@ -245,7 +249,12 @@ def main():
         total_chunks += len(staged)
         staged.clear()
 
-    print(f"[INGEST DONE] docs={total_docs} chunks={total_chunks} mode={mode}")
+    bm25_path = save_bm25_index()
+    alias_path = save_alias_index()
+    docsum_path = save_summary_index()
+    vector_index = refresh_file_index(force=total_chunks > 0)
+    print(f"[INGEST DONE] docs={total_docs} chunks={total_chunks} mode={mode} bm25={bm25_path} aliases={alias_path} "
+          f"summary={docsum_path} vector_index={vector_index}")
 
 if __name__ == "__main__":
     main()
@@ -11,7 +11,10 @@ from app.app.metrics.quality import (
 )
 # 추가: raw Chroma top-50 리콜 측정을 위해 직접 조회
 from app.app.services.adapters import flatten_chroma_result
-from app.app.infra.vector.chroma_store import search as chroma_search
+from app.app.infra.vector import search as vector_search
+from app.app.domain.embeddings import clear_query_cache
+from app.app.services.retrieval_cache import get_retrieval_cache
+from app.app.services.rerank_cache import get_rerank_cache
 
 # ----- utils -----
 def _norm(s: str) -> str:
@@ -125,9 +128,9 @@ def _sample_from_chroma(max_docs: int, section_hint: str = "요약") -> List[Dic
     random.shuffle(uniq)
     return uniq
 
-# ----- raw chroma recall@50 (pre-rerank, pre-MMR) -----
+# ----- raw vector recall@50 (pre-rerank, pre-MMR) -----
 def _recall50_raw(q: str, gold: List[str], match_by: str) -> float:
-    res = chroma_search(
+    res = vector_search(
         query=q, n=50, where=None,
         include_docs=True, include_metas=True, include_ids=True, include_distances=True
     )
@@ -144,6 +147,37 @@ def _recall50_prerank_for_strategy(q: str, gold: List[str], strategy: str, match
     except Exception:
         return 0.0
 
+# ----- hierarchical 1단계(문서 선택) 리콜/지연: trace["hierarchical"] 기준 -----
+def _stage1(trace: Dict, gold: List[str], match_by: str) -> Dict:
+    h = (trace or {}).get("hierarchical") or {}
+    if not h.get("docs"):
+        return {}
+    keys = h["titles"] if match_by == "title" else h["docs"]
+    return {"doc_recall": recall_at_k(keys, gold, len(keys)), "doc_ms": h.get("doc_ms", 0.0),
+            "chunk_ms": h.get("chunk_ms", 0.0)}
+
+def _stage1_mean(rows: List[Dict], tag: str) -> Dict:
+    st = [r[f"stage1{tag}"] for r in rows if r.get(f"stage1{tag}")]
+    if not st:
+        return {}
+    n = len(st)
+    return {"n": n, "doc_recall": round(sum(x["doc_recall"] for x in st) / n, 4),
+            "doc_ms_mean": round(sum(x["doc_ms"] for x in st) / n, 2),
+            "chunk_ms_mean": round(sum(x["chunk_ms"] for x in st) / n, 2),
+            "chunk_ms_p95": round(p_percentile([x["chunk_ms"] for x in st], 95.0), 2)}
+
+def _cold() -> None:
+    """시간 재는 호출 직전에 질의 임베딩/검색 결과/CE 캐시를 비움 → A/B 모두 같은(콜드) 조건."""
+    clear_query_cache()
+    get_retrieval_cache().clear()
+    get_rerank_cache().clear()
+
+def _timed(svc: RagService, q: str, k: int, strategy: str, trace: Dict) -> Tuple[List[Dict], float]:
+    _cold()
+    t0 = time.perf_counter()
+    docs = svc.retrieve_docs(q, k=k, strategy=strategy, trace=trace)
+    return docs, time.perf_counter() - t0
+
 # ----- main A/B -----
 def run(max_docs: int, k: int, stratA: str, stratB: str, seed: int = 42,
         section_hint: str = "요약", match_by: str = "title", report: str = "B"):
@@ -169,9 +203,14 @@ def run(max_docs: int, k: int, stratA: str, stratB: str, seed: int = 42,
             continue
         q = random.choice(queries)
 
-        # A/B 최종(현재 설정, 보통 리랭커 on)
-        t0 = time.perf_counter(); A = svc.retrieve_docs(q, k=k, strategy=stratA); tA = time.perf_counter()-t0
-        t0 = time.perf_counter(); B = svc.retrieve_docs(q, k=k, strategy=stratB); tB = time.perf_counter()-t0
+        # A/B 최종(현재 설정, 보통 리랭커 on). 호출마다 캐시를 비우고, 순서도 질의마다 번갈아(남은 워밍 효과 상쇄)
+        trA, trB = {}, {}
+        if len(rows) % 2 == 0:
+            A, tA = _timed(svc, q, k, stratA, trA)
+            B, tB = _timed(svc, q, k, stratB, trB)
+        else:
+            B, tB = _timed(svc, q, k, stratB, trB)
+            A, tA = _timed(svc, q, k, stratA, trA)
 
         keysA = keys_from_docs(A, by=("title" if match_by=="title" else "doc"))
         keysB = keys_from_docs(B, by=("title" if match_by=="title" else "doc"))
@@ -193,6 +232,9 @@ def run(max_docs: int, k: int, stratA: str, stratB: str, seed: int = 42,
             "rec50_raw": rec50_raw,
             "rec50_preA": rec50_preA,
             "rec50_preB": rec50_preB,
+            # hierarchical이면 1단계 문서 리콜/단계별 지연
+            "stage1A": _stage1(trA, gold, match_by),
+            "stage1B": _stage1(trB, gold, match_by),
         })
 
     # aggregate
@@ -233,6 +275,11 @@ def run(max_docs: int, k: int, stratA: str, stratB: str, seed: int = 42,
     print(f"recall@50(pre-B)  {rec50_preB_mean:.3f}")
     print(f"p95               {p95:.0f} ms")
     print(f"dup_rate          {dup:.3f}")
+    stage1 = {"A": _stage1_mean(rows, "A"), "B": _stage1_mean(rows, "B")}
+    for tag, st in stage1.items():
+        if st:
+            print(f"stage1-{tag} doc_recall {st['doc_recall']:.3f}  doc {st['doc_ms_mean']:.1f} ms  "
+                  f"chunk {st['chunk_ms_mean']:.1f} ms (p95 {st['chunk_ms_p95']:.1f})")
 
     print(f"\n=== Self A/B on Chroma (N={len(rows)}, k={k}, section='{section_hint}', by={match_by}) ===")
     def pr(tag, R):
@@ -252,7 +299,8 @@ def run(max_docs: int, k: int, stratA: str, stratB: str, seed: int = 42,
                 "recall@50_preA": round(rec50_preA_mean, 4),
                 "recall@50_preB": round(rec50_preB_mean, 4),
                 "p95_ms": round(p95, 1), "dup_rate": round(dup, 4)
-            }
+            },
+            "stage1": stage1,
         }
     }, ensure_ascii=False, indent=2), encoding="utf8")
     print(f"\nSaved: {out.resolve()}")
@@ -261,8 +309,8 @@ if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--N", type=int, default=200, help="샘플링할 문서 수(=쿼리 수)")
     ap.add_argument("--k", type=int, default=6)
-    ap.add_argument("--A", default="baseline", help="전략 A (baseline|chroma_only)")
-    ap.add_argument("--B", default="chroma_only", help="전략 B (baseline|chroma_only)")
+    ap.add_argument("--A", default="baseline", help="전략 A (baseline|chroma_only|hybrid|hierarchical)")
+    ap.add_argument("--B", default="chroma_only", help="전략 B (baseline|chroma_only|hybrid|hierarchical)")
     ap.add_argument("--seed", type=int, default=42)
     ap.add_argument("--section", default="요약", help="샘플링할 섹션 필터 (빈문자열이면 전체)")
     ap.add_argument("--by", choices=["title","doc"], default="title", help="평가 매칭 기준")
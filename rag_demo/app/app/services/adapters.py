@@ -3,30 +3,69 @@ from typing import Any, Dict, List, Optional
 from ..domain.models.document_model import DocumentItem
 from ..infra.vector.metrics import to_similarity
 
-def flatten_chroma_result(res: Dict[str, Any]) -> List[Dict[str, Any]]:
+def flatten_chroma_result(res: Dict[str, Any], qi: int = 0) -> List[Dict[str, Any]]:
+    """Chroma query 결과의 qi번째 쿼리 배치를 평탄화."""
     ids = res.get("ids") or [[]]
     docs = res.get("documents") or [[]]
     metas = res.get("metadatas") or [[]]
     dists = res.get("distances") or [[]]
     space = (res.get("space") or "cosine").lower()  # chroma_store가 넣어줌  :contentReference[oaicite:2]{index=2}
+    # include=["embeddings"]일 때만 존재. Chroma 버전에 따라 np.ndarray라 truthiness 금지
+    embs = res.get("embeddings")
+    embs0 = embs[qi] if embs is not None and len(embs) > qi else None
 
     out = []
-    if not ids or not ids[0]:
+    if len(ids) <= qi or not ids[qi]:
         return out
+    ids0 = ids[qi]
+    docs0 = docs[qi] if len(docs) > qi else None
+    metas0 = metas[qi] if len(metas) > qi else None
+    dists0 = dists[qi] if len(dists) > qi else None
 
-    for i in range(len(ids[0])):
-        distance = dists[0][i] if dists and dists[0] and i < len(dists[0]) else None
-        out.append({
-            "id": ids[0][i],
-            "text": docs[0][i] if docs and docs[0] and i < len(docs[0]) else None,
-            "metadata": metas[0][i] if metas and metas[0] and i < len(metas[0]) else {},
+    for i in range(len(ids0)):
+        distance = dists0[i] if dists0 and i < len(dists0) else None
+        item = {
+            "id": ids0[i],
+            "text": docs0[i] if docs0 and i < len(docs0) else None,
+            "metadata": metas0[i] if metas0 and i < len(metas0) else {},
             "distance": distance,
             "score": to_similarity(distance, space=space),  # ← 공식 변환  :contentReference[oaicite:3]{index=3}
-        })
+        }
+        if embs0 is not None:
+            item["embedding"] = embs0[i] if i < len(embs0) else None
+        out.append(item)
     # 유사도 내림차순
     out.sort(key=lambda x: (x["score"] is not None, x["score"]), reverse=True)
     return out
 
+def flatten_chroma_batches(res: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+    """멀티 쿼리(search_many) 결과를 쿼리별 리스트로 평탄화."""
+    return [flatten_chroma_result(res, qi) for qi in range(len(res.get("ids") or []))]
+
+def flatten_chroma_get(res: Dict[str, Any], order: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """coll.get(ids=...) 결과(평면 리스트)를 평탄화. order가 있으면 그 id 순서로 정렬."""
+    ids = res.get("ids") or []
+    docs = res.get("documents") or []
+    metas = res.get("metadatas") or []
+    embs = res.get("embeddings")
+
+    out = []
+    for i, _id in enumerate(ids):
+        item = {
+            "id": _id,
+            "text": docs[i] if i < len(docs) else None,
+            "metadata": (metas[i] if i < len(metas) else None) or {},
+            "distance": None,
+            "score": None,
+        }
+        if embs is not None and len(embs) > i:
+            item["embedding"] = embs[i]
+        out.append(item)
+    if order:
+        pos = {str(x): j for j, x in enumerate(order)}
+        out.sort(key=lambda x: pos.get(str(x["id"]), len(pos)))
+    return out
+
 def to_docitem(hit: Any) -> DocumentItem:
     # dict 경로만 사실상 표준. 나머지는 호환 유지하되 제한적으로.
     if isinstance(hit, dict):
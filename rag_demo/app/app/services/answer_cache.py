@@ -0,0 +1,155 @@
+# app/app/services/answer_cache.py
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+import copy, json, os, threading, time
+import numpy as np
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+def params_key(**params: Any) -> str:
+    """where/k/strategy 등 응답을 바꾸는 파라미터를 정렬된 JSON 문자열 키로."""
+    return json.dumps(params, ensure_ascii=False, sort_keys=True, default=str)
+
+class SemanticAnswerCache:
+    """
+    의미 기반 답변 캐시.
+    - 이전 질문 벡터(정규화)를 (maxsize, d) 행렬에 보관, 조회는 내적 1회(소규모라 전수 = 정확 ANN)
+    - 코사인 >= threshold 이고 파라미터 키가 같을 때만 히트
+    - LRU 축출 + TTL + 컬렉션 세대가 바뀌면 전체 무효화
+    """
+    def __init__(self, maxsize: int = 512, ttl: float = 3600.0, threshold: float = 0.95):
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = float(ttl)
+        self.threshold = float(threshold)
+        self._lock = threading.Lock()
+        self._vecs: Optional[np.ndarray] = None            # (maxsize, d), 지연 할당
+        self._valid = np.zeros(self.maxsize, dtype=bool)
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * self.maxsize
+        self._lru: "OrderedDict[int, None]" = OrderedDict()  # slot 순서(오래된 것 앞)
+        self._generation: Optional[Hashable] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    @staticmethod
+    def _unit(v: np.ndarray) -> np.ndarray:
+        v = np.asarray(v, dtype=np.float32).reshape(-1)
+        return v / (np.linalg.norm(v) + 1e-8)
+
+    def _sync_generation(self, generation: Hashable) -> None:
+        if self._generation != generation:
+            if self._generation is not None and self._lru:
+                self.invalidations += 1
+            self._clear_locked()
+            self._generation = generation
+
+    def _clear_locked(self) -> None:
+        self._valid[:] = False
+        self._entries = [None] * self.maxsize
+        self._lru.clear()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._clear_locked()
+            self.invalidations += 1
+
+    def lookup(self, qv: np.ndarray, pkey: str, generation: Hashable) -> Optional[Tuple[Dict[str, Any], float, Dict[str, Any]]]:
+        """히트면 (응답 사본, 유사도, 엔트리 정보) 반환."""
+        if not self.enabled:
+            return None
+        q = self._unit(qv)
+        now = time.monotonic()
+        with self._lock:
+            self._sync_generation(generation)
+            if self._vecs is None or not self._lru or self._vecs.shape[1] != q.shape[0]:
+                self.misses += 1
+                return None
+            sims = self._vecs @ q
+            sims[~self._valid] = -1.0
+            # 유사도 높은 순으로 파라미터/TTL 맞는 첫 후보
+            for slot in np.argsort(-sims):
+                sim = float(sims[slot])
+                if sim < self.threshold:
+                    break
+                ent = self._entries[int(slot)]
+                if ent is None or ent["pkey"] != pkey:
+                    continue
+                if self.ttl > 0 and (now - ent["ts"]) > self.ttl:
+                    self._drop_locked(int(slot))
+                    continue
+                self._lru.move_to_end(int(slot))
+                self.hits += 1
+                info = {"q": ent["q"], "age_s": round(now - ent["ts"], 1)}
+                return copy.deepcopy(ent["resp"]), sim, info
+            self.misses += 1
+            return None
+
+    def _drop_locked(self, slot: int) -> None:
+        self._valid[slot] = False
+        self._entries[slot] = None
+        self._lru.pop(slot, None)
+
+    def put(self, qv: np.ndarray, pkey: str, generation: Hashable, q: str, resp: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        v = self._unit(qv)
+        with self._lock:
+            self._sync_generation(generation)
+            if self._vecs is None or self._vecs.shape[1] != v.shape[0]:
+                self._vecs = np.zeros((self.maxsize, v.shape[0]), dtype=np.float32)
+                self._clear_locked()
+            free = np.flatnonzero(~self._valid)
+            if free.size:
+                slot = int(free[0])
+            else:
+                slot, _ = self._lru.popitem(last=False)  # LRU 축출
+            self._vecs[slot] = v
+            self._valid[slot] = True
+            self._entries[slot] = {"pkey": pkey, "q": q, "ts": time.monotonic(), "resp": copy.deepcopy(resp)}
+            self._lru[slot] = None
+            self._lru.move_to_end(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._lru),
+            "maxsize": self.maxsize,
+            "ttl_s": self.ttl,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+# ───────────── singleton ─────────────
+_cache: Optional[SemanticAnswerCache] = None
+_cache_lock = threading.Lock()
+
+def get_answer_cache() -> SemanticAnswerCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticAnswerCache(
+                    maxsize=_env_int("RAG_ANSWER_CACHE_SIZE", 512),
+                    ttl=_env_float("RAG_ANSWER_CACHE_TTL", 3600.0),
+                    threshold=_env_float("RAG_ANSWER_CACHE_SIM", 0.95),
+                )
+    return _cache
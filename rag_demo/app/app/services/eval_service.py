@@ -1,7 +1,7 @@
 # services/eval_service.py
 from __future__ import annotations
 from typing import Any, Dict, List, Optional, Literal, Callable
-from ..infra.vector.chroma_store import search as chroma_search
+from ..infra.vector import search as vector_search
 from ..services.adapters import flatten_chroma_result
 
 SearchFn = Callable[..., Dict[str, Any]]
@@ -24,7 +24,7 @@ def evaluate_hit(
     k: int = 3,
     mode: Literal["page","title","chunk"] = "page",
     n_fetch: Optional[int] = None,
-    search_fn: SearchFn = chroma_search,
+    search_fn: SearchFn = vector_search,
 ) -> Dict[str, Any]:
     n = n_fetch or k
     total = hits = 0
@@ -1,13 +1,17 @@
 # app/app/services/ingest_v2_service.py
 from __future__ import annotations
 from typing import Dict, Any, List
-import json, hashlib, time
+import json, hashlib, os, time
 from pymongo import UpdateOne
 from pymongo.errors import PyMongoError
 
 from ..configure import config
 from ..domain.embeddings import embed_passages  # 반환: np.ndarray 또는 list 지원 권장
 from ..infra.vector.chroma_store import upsert as chroma_upsert
+from ..infra.vector.bm25_index import save_bm25_index  # import 시 upsert 훅 등록 → 적재와 함께 BM25 색인
+from ..infra.vector.alias_index import save_alias_index  # 〃 별칭 사전
+from ..infra.vector.summary_index import save_summary_index  # 〃 문서 요약 벡터(계층 검색 1단계)
+from ..infra.vector import file_index_status, refresh_file_index
 from ..infra.mongo.mongo_client import get_db  # db = get_db()
 
 from ..domain.chunker import window_by_chars
@@ -149,5 +153,15 @@ def ingest_v2_jsonl(
             pass
     if to_chroma and ids:
         pushed += _flush_chroma(ids, docs, metas)
-
-    return {"total": total, "mongo_works": up_w, "mongo_chars": up_c, "chroma_indexed": pushed}
+    bm25_path = save_bm25_index() if to_chroma else None
+    alias_path = save_alias_index() if to_chroma else None
+    docsum_path = save_summary_index() if to_chroma else None
+    # 파일 백엔드(faiss/npmmap)는 스냅샷 → 새 청크가 검색되도록 재빌드+재로드(끄면 stale 여부만 보고)
+    vector_index = None
+    if to_chroma:
+        vector_index = (refresh_file_index(force=pushed > 0)
+                        if os.getenv("RAG_FILE_INDEX_REBUILD_ON_INGEST", "1") == "1" else file_index_status())
+
+    return {"total": total, "mongo_works": up_w, "mongo_chars": up_c, "chroma_indexed": pushed,
+            "bm25_index": bm25_path, "alias_index": alias_path, "summary_index": docsum_path,
+            "vector_index": vector_index}
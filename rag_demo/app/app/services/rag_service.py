@@ -1,19 +1,30 @@
 # app/app/services/rag_service.py
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
-import os, re, unicodedata, time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio, os, re, unicodedata, time, threading, logging
+from functools import lru_cache
 import numpy as np
-import torch
 
-try:
-    from sentence_transformers import CrossEncoder  # pip install sentence-transformers
-except Exception:
-    CrossEncoder = None  # 미설치 시 자동 비활성
-
-from app.app.infra.vector.chroma_store import search as chroma_search
-from app.app.services.adapters import flatten_chroma_result
+from app.app.infra.vector import (
+    search as vector_search, search_many as vector_search_many, get_by_ids as vector_get_by_ids,
+)
+from app.app.infra.vector.chroma_store import collection_generation
+from app.app.infra.vector.doc_index import get_doc_index
+from app.app.infra.vector.summary_index import get_summary_index, enabled as docsum_enabled
+from app.app.infra.vector.bm25_index import get_bm25_index, enabled as bm25_enabled
+from app.app.infra.vector.where_filter import match_where
+from app.app.infra.vector.alias_index import get_alias_index, set_manual_aliases
+from app.app.services.adapters import flatten_chroma_result, flatten_chroma_batches, flatten_chroma_get
+from app.app.services.answer_cache import get_answer_cache, params_key
+from app.app.services.retrieval_cache import get_retrieval_cache, retrieval_key, slim
 from app.app.domain.embeddings import embed_queries, embed_passages
-from app.app.infra.llm.provider import get_chat
+from app.app.infra.llm.provider import get_chat, get_chat_stream
+from app.app.infra.inference_pool import run_inference, pool_stats
+from app.app.infra.model_registry import get_reranker, reranker_id, default_device
+from app.app.domain.mmr import mmr_select
+from app.app.services.rerank_cache import cached_predict, get_rerank_cache
+from app.app.utils.deadline import Deadline, StageCosts
+from app.app.metrics.prom import inc, observe_stage
 from app.app.configure import config
 
 # 모델 스키마 (표준 경로 우선)
@@ -45,17 +56,36 @@ except Exception:
                 out.append(m.get("seed_title") or m.get("parent") or m.get("title") or "")
         return out
 
-# --- 퍼지 매칭(rapidfuzz 있으면 사용, 없으면 difflib 폴백) --------------------------
+# --- 퍼지 매칭(rapidfuzz cdist 있으면 사용, 없으면 numpy 문자 bigram 포함도) ----------
 try:
-    from rapidfuzz import fuzz as _rf_fuzz
-    def _fuzzy(a: str, b: str) -> float:
-        return _rf_fuzz.partial_ratio(a, b) / 100.0
+    from rapidfuzz import fuzz as _rf_fuzz, process as _rf_process
 except Exception:
-    from difflib import SequenceMatcher
-    def _fuzzy(a: str, b: str) -> float:
-        return SequenceMatcher(None, a, b).ratio()
+    _rf_fuzz = _rf_process = None
+
+def _grams(s: str) -> List[str]:
+    return [s[i:i + 2] for i in range(len(s) - 1)] if len(s) > 1 else ([s] if s else [])
+
+def _fuzzy_matrix(queries: List[str], choices: List[str]) -> np.ndarray:
+    """(len(queries), len(choices)) 유사도 0..1. 한 번의 cdist(또는 행렬곱)로 전체 계산."""
+    if not queries or not choices:
+        return np.zeros((len(queries), len(choices)), dtype=np.float32)
+    if _rf_process is not None:
+        return _rf_process.cdist(queries, choices, scorer=_rf_fuzz.partial_ratio,
+                                 dtype=np.float32, workers=1) / 100.0
+    # 폴백: 짧은 쪽 bigram이 긴 쪽에 얼마나 포함되는지(partial_ratio 근사)
+    vocab: Dict[str, int] = {}
+    qr = [{vocab.setdefault(g, len(vocab)) for g in _grams(x)} for x in queries]
+    cr = [{vocab.setdefault(g, len(vocab)) for g in _grams(x)} for x in choices]
+    Q = np.zeros((len(qr), len(vocab)), dtype=np.float32)
+    C = np.zeros((len(cr), len(vocab)), dtype=np.float32)
+    for i, r in enumerate(qr): Q[i, list(r)] = 1.0
+    for i, r in enumerate(cr): C[i, list(r)] = 1.0
+    inter = Q @ C.T
+    denom = np.minimum(Q.sum(1)[:, None], C.sum(1)[None, :])
+    return np.where(denom > 0, inter / np.maximum(denom, 1.0), 0.0).astype(np.float32)
 
 # --- 간단 정규화/쿼리 확장 ---------------------------------------------------------
+@lru_cache(maxsize=65536)
 def _norm(s: str) -> str:
     s = unicodedata.normalize("NFKC", s).lower()
     return re.sub(r"[\s\W_]+", "", s, flags=re.UNICODE)
@@ -66,16 +96,43 @@ _DEFAULT_ALIAS_MAP = {
     "5등분의 신부": ["오등분의 신부", "The Quintessential Quintuplets", "5-toubun no hanayome", "五等分の花嫁"],
 }
 _ALIAS_MAP = getattr(config, "ALIAS_MAP", None) or _DEFAULT_ALIAS_MAP
+set_manual_aliases(_ALIAS_MAP)  # 수동 맵도 컬렉션 별칭 오토마톤에 합류
+
+log = logging.getLogger("rag_service")
+
+# 별칭 임베딩은 프로세스당 한 번만 계산(쿼리 캐시 TTL과 무관하게 상주)
+_ALIAS_VECS: Optional[Dict[str, np.ndarray]] = None
+_ALIAS_VECS_LOCK = threading.Lock()
+
+def _alias_vectors() -> Dict[str, np.ndarray]:
+    global _ALIAS_VECS
+    if _ALIAS_VECS is not None:
+        return _ALIAS_VECS
+    with _ALIAS_VECS_LOCK:
+        if _ALIAS_VECS is None:
+            names: List[str] = []
+            for vs in _ALIAS_MAP.values():
+                for v in vs:
+                    v = (v or "").strip()
+                    if len(v) >= 2 and v not in names:
+                        names.append(v)
+            vecs: Dict[str, np.ndarray] = {}
+            if names:
+                try:
+                    embs = np.asarray(embed_queries(names), dtype=np.float32)
+                    vecs = {n: embs[i] for i, n in enumerate(names)}
+                except Exception as e:
+                    log.warning(f"[rag] alias precompute skipped: {e}")
+            _ALIAS_VECS = vecs
+    return _ALIAS_VECS
 
 def _expand_queries(q: str) -> List[str]:
-    """원문 + 정규화 + 간단 별칭치환."""
+    """원문 + 정규화 + 별칭 확장(컬렉션 별칭 사전 Aho-Corasick 1패스)."""
     out = [q]
     nq = _norm(q)
     if nq != q:
         out.append(nq)
-    for k, vs in _ALIAS_MAP.items():
-        if k in q:
-            out.extend(vs)
+    out.extend(get_alias_index().expand(q, limit=_env_int("RAG_ALIAS_MAX_VARIANTS", 4)))
     # 고유화
     uniq, seen = [], set()
     for s in out:
@@ -88,17 +145,39 @@ def _expand_queries(q: str) -> List[str]:
 def _title_from_meta(meta: Dict[str, Any]) -> str:
     return meta.get("seed_title") or meta.get("parent") or meta.get("title") or ""
 
-def _title_boost(item: Dict[str, Any], qvars: List[str]) -> float:
-    """메타 타이틀 vs 확장쿼리 간 퍼지 스코어(0..1)."""
-    t = _title_from_meta(item.get("metadata") or {})
-    if not t:
-        return 0.0
-    tn = _norm(t)
-    best = 0.0
-    for s in qvars:
-        sn = _norm(s)
-        best = max(best, _fuzzy(tn, sn))
-    return float(best)
+def _title_keys(meta: Dict[str, Any]) -> List[str]:
+    """후보의 정규화 타이틀들. ingest_namu_v3가 쓴 *_norm/aliases_norm_csv 우선, 없으면 메모이즈된 _norm."""
+    keys: List[str] = []
+    for f in ("title_norm", "seed_title_norm"):
+        v = meta.get(f)
+        if v: keys.append(str(v))
+    v = meta.get("aliases_norm_csv")
+    if v:
+        keys.extend(x for x in str(v).split("|") if x)
+    if not keys:
+        t = _title_from_meta(meta)
+        if t: keys.append(_norm(t))
+    return keys
+
+def _title_boosts(items: List[Dict[str, Any]], qvars: List[str]) -> np.ndarray:
+    """
+    후보 전체 vs 확장쿼리의 타이틀 퍼지 스코어(0..1) 벡터.
+    고유 타이틀 문자열만 모아 cdist 1회 → 쿼리축 max → 후보별 자기 타이틀들 중 max.
+    """
+    out = np.zeros(len(items), dtype=np.float32)
+    qn = list(dict.fromkeys(x for x in (_norm(s) for s in qvars) if x))
+    if not items or not qn:
+        return out
+    choice_ix: Dict[str, int] = {}
+    owners: List[int] = []; cols: List[int] = []
+    for i, it in enumerate(items):
+        for key in _title_keys(it.get("metadata") or {}):
+            owners.append(i); cols.append(choice_ix.setdefault(key, len(choice_ix)))
+    if not cols:
+        return out
+    best_per_choice = _fuzzy_matrix(qn, list(choice_ix)).max(axis=0)
+    np.maximum.at(out, np.asarray(owners), best_per_choice[np.asarray(cols)])
+    return out
 
 # --- 유틸: 타이틀 캡/환경변수/섹션 쿼터 -------------------------------------------
 def _cap_by_title(items: List[Dict[str, Any]], cap: int = 2) -> List[Dict[str, Any]]:
@@ -127,61 +206,122 @@ def _env_float(name: str, default: float) -> float:
     except Exception:
         return default
 
+def _deadline_ms(v: Optional[float]) -> Optional[float]:
+    """요청 값 우선, 없으면 RAG_DEADLINE_MS(0 이하면 마감 없음)."""
+    ms = v if v is not None else _env_float("RAG_DEADLINE_MS", 0.0)
+    return ms if ms and ms > 0 else None
+
+# --- 적응형 후보 깊이(baseline): 얕게 1페이지 → 점수 모양 보고 조기 종료/그대로/깊게 ---------------
+_adapt_lock = threading.Lock()
+_adapt_counts: Dict[str, int] = {"queries": 0, "candidates": 0, "early_exit": 0, "shallow": 0, "deepen": 0}
+
+def _score_shape(items: List[Dict[str, Any]], dedup: List[Dict[str, Any]], k: int) -> Dict[str, Any]:
+    """1페이지 점수 모양: topk_gap / topk_rel_gap(1·2위), 평탄도(1위 대비 k위), 상위 타이틀 집중도."""
+    scores = [float(it.get("score") or 0.0) for it in dedup]
+    s1 = scores[0] if scores else 0.0
+    s2 = scores[1] if len(scores) > 1 else 0.0
+    sk = scores[min(k, len(scores)) - 1] if scores else 0.0
+    head = [_title_from_meta(it.get("metadata") or {}) for it in items[:max(2 * k, 10)]]
+    top_title = head[0] if head else ""
+    return {
+        "top1": round(s1, 4),
+        "topk_gap": round(s1 - s2, 4),
+        "topk_rel_gap": round((s1 - s2) / s1, 4) if s1 > 0 else 0.0,
+        "flat": round((s1 - sk) / s1, 4) if s1 > 0 else 0.0,
+        "title_conc": round(sum(1 for t in head if t and t == top_title) / float(len(head)), 4) if head else 0.0,
+    }
+
+def _adapt_note(trace: Optional[Dict[str, Any]], info: Dict[str, Any]) -> None:
+    with _adapt_lock:
+        _adapt_counts["queries"] += 1
+        _adapt_counts["candidates"] += int(info.get("candidates") or 0)
+        _adapt_counts[info["decision"]] = _adapt_counts.get(info["decision"], 0) + 1
+    if trace is not None:
+        trace["adaptive"] = info
+
+def adaptive_stats() -> Dict[str, Any]:
+    with _adapt_lock:
+        c = dict(_adapt_counts)
+    c["avg_candidates"] = round(c["candidates"] / c["queries"], 1) if c["queries"] else None
+    return c
+
+# 단계별 지연 추정(마감 예산 계획용, 프로세스 공유)
+_stage_costs = StageCosts()
+
+def stage_cost_stats() -> Dict[str, float]:
+    return _stage_costs.snapshot()
+
 class RagService:
     def __init__(self):
         self.chat = get_chat()
+        self.chat_stream = get_chat_stream()
         self._last_space: str = "cosine"  # 최근 검색 벡터 공간 저장(점수 변환에 필요)
         # 리랭커 세팅 (환경변수로 온/오프)
         self._use_reranker = bool(int(os.getenv("RAG_USE_RERANK", "1")))
         self._reranker = None
-        if self._use_reranker and CrossEncoder is not None:
-            dev = "cuda" if torch.cuda.is_available() else "cpu"
-            # 한국어 포함 멀티링구얼 성능/가성비 좋음
-            self._reranker = CrossEncoder("BAAI/bge-reranker-v2-m3", device=dev, max_length=512)
+        self._reranker_id = reranker_id()
+        if self._use_reranker:
+            # 한국어 포함 멀티링구얼 성능/가성비 좋음. 레지스트리 공유 → 인스턴스가 여러 개여도 1회 로드
+            try:
+                self._reranker = get_reranker()
+            except ImportError:
+                log.warning("sentence-transformers 미설치 → 리랭커 비활성")
+        # 잘 알려진 별칭(_ALIAS_MAP) 임베딩 선계산
+        if os.getenv("RAG_ALIAS_PRECOMPUTE", "1") == "1":
+            _alias_vectors()
 
     # ------------------- 공통 유틸 -------------------
-    def _mmr(self, q: str, items: List[Dict[str, Any]], k: int, lam: float = 0.5) -> List[Dict[str, Any]]:
-        """GPU(torch)로 MMR 계산."""
-        if not items:
-            return items
-        texts = [(it.get("text") or "") for it in items]
+    def _qvec(self, q: str) -> np.ndarray:
+        """쿼리 벡터 1개(embeddings 쪽 LRU+TTL 캐시 경유)."""
+        return np.asarray(embed_queries([q]))[0]
 
-        # 임베딩 -> numpy -> torch
-        cvs_np = np.array(embed_passages(texts))          # (n, d)
-        qv_np  = np.array(embed_queries([q]))[0]          # (d,)
+    def _qvecs(self, texts: List[str]) -> np.ndarray:
+        """여러 쿼리 벡터. 선계산된 별칭은 재사용, 나머지는 embed_queries 한 번으로 배치."""
+        pre = _alias_vectors()
+        rows: List[Optional[np.ndarray]] = [pre.get(t) for t in texts]
+        missing = [i for i, v in enumerate(rows) if v is None]
+        if missing:
+            fresh = np.asarray(embed_queries([texts[i] for i in missing]), dtype=np.float32)
+            for i, v in zip(missing, fresh):
+                rows[i] = v
+        return np.vstack(rows).astype(np.float32, copy=False)
 
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        cvs = torch.from_numpy(cvs_np).to(device)
-        qv  = torch.from_numpy(qv_np).to(device)
+    def _candidate_vectors(self, items: List[Dict[str, Any]]) -> np.ndarray:
+        """후보별 벡터. item["embedding"](Chroma 저장 벡터)이 있으면 그대로, 없으면 embed_passages."""
+        vecs: List[Any] = [it.get("embedding") for it in items]
+        missing = [i for i, v in enumerate(vecs) if v is None]
+        if missing:
+            fresh = embed_passages([(items[i].get("text") or "") for i in missing])
+            for i, v in zip(missing, fresh):
+                vecs[i] = v
+        return np.asarray(vecs, dtype=np.float32)
 
-        n = cvs.shape[0]
-        if n <= k:
+    def _mmr(self, q: str, items: List[Dict[str, Any]], k: int, lam: float = 0.5,
+             qv: Optional[np.ndarray] = None, trace: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """NumPy 증분 MMR(domain.mmr). qv를 넘기면 쿼리 재임베딩 생략."""
+        if not items or len(items) <= k:
             return items[:k]
+        t0 = time.perf_counter()
+        # 저장된 청크 벡터(include embeddings) 재사용 → 없는 것만 임베딩
+        cvs = self._candidate_vectors(items)             # (n, d)
+        qv_np = np.asarray(qv if qv is not None else self._qvec(q), dtype=np.float32)
+        idx = mmr_select(cvs, k, lam, query=qv_np)
+        mmr_ms = (time.perf_counter() - t0) * 1000.0
+        observe_stage("mmr", mmr_ms)
+        if trace is not None:
+            trace["mmr_ms"] = round(trace.get("mmr_ms", 0.0) + mmr_ms, 2)
+        return [items[i] for i in idx]
 
-        # cosine sim
-        qn = torch.norm(qv) + 1e-8
-        cn = torch.norm(cvs, dim=1) + 1e-8
-        sim_q = (cvs @ qv) / (qn * cn)  # (n,)
-
-        selected: List[int] = []
-        mask = torch.zeros(n, dtype=torch.bool, device=device)
-        while len(selected) < k:
-            if not selected:
-                i = int(torch.argmax(sim_q).item())
-            else:
-                sel = cvs[torch.tensor(selected, device=device)]
-                seln = torch.norm(sel, dim=1) + 1e-8
-                # (n, s)
-                sim_div = (cvs @ sel.T) / (cn.unsqueeze(1) * seln.unsqueeze(0))
-                sim_div = sim_div.max(dim=1).values
-                mmr = lam * sim_q - (1 - lam) * sim_div
-                mmr[mask] = -1e9
-                i = int(torch.argmax(mmr).item())
-            selected.append(i); mask[i] = True
-            if mask.all():
-                break
-
-        return [items[i] for i in selected]
+    def _fuse_batches(self, batches: List[List[Dict[str, Any]]], limits: List[int]) -> List[Dict[str, Any]]:
+        """쿼리별 결과를 한 번에 합침: 청크 id별 최고 점수 유지, 점수 내림차순."""
+        best: Dict[str, Dict[str, Any]] = {}
+        for batch, lim in zip(batches, limits):
+            for it in batch[:lim]:
+                cid = str(it.get("id"))
+                cur = best.get(cid)
+                if cur is None or (it.get("score") or 0.0) > (cur.get("score") or 0.0):
+                    best[cid] = it
+        return sorted(best.values(), key=lambda x: x.get("score") or 0.0, reverse=True)
 
     def _dedup_and_score(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """doc_id(또는 title+section) 기준 중복 제거 + score 보정."""
@@ -199,20 +339,33 @@ class RagService:
         return out
 
     # ───────────────── 리랭크/확장/컨피던스 ─────────────────
-    def _rerank(self, q: str, items: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
-        """CrossEncoder로 최종 재정렬."""
+    def _rerank(self, q: str, items: List[Dict[str, Any]], k: int,
+                trace: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """CrossEncoder로 최종 재정렬. (쿼리, 청크) 점수 캐시 미스만 모델로 보낸다."""
         if not self._reranker or not items:
             return items[:k]
-        pairs = [(q, (it.get("text") or "")[:800]) for it in items]  # 지나친 길이 컷
+        t0 = time.perf_counter()
+        texts = [(it.get("text") or "")[:800] for it in items]  # 지나친 길이 컷
         bs = int(os.getenv("RAG_RERANK_BATCH", "64"))
-        scores = self._reranker.predict(pairs, batch_size=bs, convert_to_numpy=True)
+        scores, hm = cached_predict(
+            self._reranker, self._reranker_id, q, texts, [it.get("id") for it in items], batch_size=bs,
+        )
+        rerank_ms = (time.perf_counter() - t0) * 1000.0
+        observe_stage("rerank", rerank_ms)
+        if trace is not None:
+            trace["rerank_ms"] = round(trace.get("rerank_ms", 0.0) + rerank_ms, 2)
+            trace["ce_cache_hits"] = trace.get("ce_cache_hits", 0) + hm["hits"]
+            trace["ce_cache_misses"] = trace.get("ce_cache_misses", 0) + hm["misses"]
         for it, s in zip(items, scores):
             it["_ce"] = float(s)
         items.sort(key=lambda x: x.get("_ce", 0.0), reverse=True)
         return items[:k]
 
     def _expand_same_doc(self, items: List[Dict[str, Any]], per_doc: int = 2) -> List[Dict[str, Any]]:
-        """상위 문서(doc_id)의 다른 섹션/청크를 몇 개 더 끌어와 컨텍스트를 두텁게."""
+        """
+        상위 문서(doc_id)의 다른 섹션/청크를 몇 개 더 끌어와 컨텍스트를 두텁게.
+        doc_id→청크 인덱스(요약/본문 우선)로 id를 고르고 coll.get 1회로 본문을 채운다.
+        """
         if not items:
             return items
         doc_ids: List[str] = []
@@ -220,28 +373,19 @@ class RagService:
             did = (it.get("metadata") or {}).get("doc_id")
             if did and did not in doc_ids:
                 doc_ids.append(did)
-        extras: List[Dict[str, Any]] = []
-        taken_per: Dict[str, int] = {}
+        if not doc_ids:
+            return items
+
+        idx = get_doc_index()
+        seen_ids = {str(it.get("id")) for it in items}
+        want: List[str] = []
         for did in doc_ids[:3]:  # 상위 3개 문서만 확장
-            res = chroma_search(
-                query="", n=per_doc * 6, where={"doc_id": did},
-                include_docs=True, include_metas=True, include_ids=True, include_distances=True
-            )
-            ext = flatten_chroma_result(res)
-            # 요약/본문 우선
-            def _prio(x):
-                sec = (x.get("metadata") or {}).get("section") or ""
-                return {"요약": 0, "본문": 1}.get(sec, 2), -(x.get("score") or 0.0)
-            ext.sort(key=_prio)
-            seen_ids = {str(it.get("id")) for it in items}
-            for e in ext:
-                if str(e.get("id")) in seen_ids:
-                    continue
-                cnt = taken_per.get(did, 0)
-                if cnt >= per_doc:
-                    break
-                extras.append(e); taken_per[did] = cnt + 1
-        return items + extras
+            want.extend(idx.siblings(did, limit=per_doc, exclude=seen_ids))
+        if not want:
+            return items
+
+        res = vector_get_by_ids(want, include_docs=True, include_metas=True)
+        return items + flatten_chroma_get(res, order=want)
 
     def _conf(self, items: List[Dict[str, Any]]) -> float:
         """상위 몇 개의 CE/유사도로 컨피던스(0..1). 리랭커가 있으면 softmax 기반."""
@@ -261,101 +405,239 @@ class RagService:
             return float(arr[0])
         return float(sum((a - lo) / (hi - lo) for a in arr) / len(arr))
 
+    def _select(
+        self, q: str, dedup: List[Dict[str, Any]], k: int, *, qv: np.ndarray, use_mmr: bool, lam: float,
+        trace: Optional[Dict[str, Any]], rerank: bool, cap: bool = True, mmr_pre_k: int = 120,
+    ) -> List[Dict[str, Any]]:
+        """전략 공통 꼬리: 타이틀 캡 → 다양화(MMR) → 리랭커 입력 제한 후 CE → 최종 k. cap=False면 이미 캡 적용된 입력."""
+        if cap:
+            dedup = _cap_by_title(dedup, cap=_env_int("RAG_TITLE_CAP", 2))
+        if use_mmr:
+            pre = dedup[:min(len(dedup), _env_int("RAG_MMR_PRE_K", mmr_pre_k))]
+            pool = self._mmr(q, pre, k=_env_int("RAG_MMR_K", max(k * 4, 40)), lam=lam, qv=qv, trace=trace)
+        else:
+            pool = dedup[:max(k * 12, 120)]
+
+        if self._reranker and rerank:
+            pool = pool[:min(len(pool), _env_int("RAG_RERANK_IN", 24))]
+            return self._rerank(q, pool, k, trace=trace)
+        return pool[:k]
+
     # ------------------- 전략별 검색 -------------------
     def _retrieve_baseline(
         self, q: str, *, k: int, where: Optional[Dict[str, Any]],
-        candidate_k: Optional[int], use_mmr: bool, lam: float
+        candidate_k: Optional[int], use_mmr: bool, lam: float,
+        trace: Optional[Dict[str, Any]] = None, rerank: bool = True,
     ) -> List[Dict[str, Any]]:
-        """단일 쿼리 경로. 후보 폭을 넓혀 MMR→(CE) 적용."""
+        """
+        단일 쿼리 경로. 후보 폭을 넓혀 MMR→(CE) 적용.
+        적응형(RAG_ADAPTIVE=1, candidate_k 미지정): 얕은 1페이지(RAG_ADAPT_FIRST_K)의 점수 모양으로
+          early_exit: 1위 격차가 크고 상위가 한 타이틀에 몰림 → MMR/CE 생략
+          deepen    : 점수가 평탄하거나 캡 후 k개 미달 → fetch_k까지 다시 조회
+          shallow   : 그 외 → 1페이지 그대로 MMR/CE
+        """
         # 파라미터화
         fetch_k = candidate_k or _env_int("RAG_FETCH_K", 160)            # 1차 후보(깊게)
-        mmr_pre_k = _env_int("RAG_MMR_PRE_K", 120)                       # MMR 입력 상한
         mmr_k = _env_int("RAG_MMR_K", max(k * 4, 40))                    # MMR로 뽑을 수
         title_cap = _env_int("RAG_TITLE_CAP", 2)                          # 타이틀당 상한
         rerank_in = _env_int("RAG_RERANK_IN", 24)                         # 리랭커 입력 수
+        adaptive = candidate_k is None and os.getenv("RAG_ADAPTIVE", "1") == "1"
+        first_k = min(fetch_k, _env_int("RAG_ADAPT_FIRST_K", max(k * 4, 24))) if adaptive else fetch_k
 
-        # 1) 깊게 긁기
-        res = chroma_search(
-            query=q, n=fetch_k, where=where,
-            include_docs=True, include_metas=True, include_ids=True, include_distances=True
-        )
-        self._last_space = (res.get("space") or "cosine").lower()
-        items = flatten_chroma_result(res)
+        # 1) 긁기 (쿼리 벡터는 한 번만 만들어 검색/MMR에 공유)
+        qv = self._qvec(q)
+
+        def _fetch(n: int) -> List[Dict[str, Any]]:
+            res = vector_search(
+                query=q, query_embeddings=qv, n=n, where=where,
+                include_docs=True, include_metas=True, include_ids=True, include_distances=True,
+                include_embeddings=use_mmr,
+            )
+            self._last_space = (res.get("space") or "cosine").lower()
+            return flatten_chroma_result(res)
+
+        items = _fetch(first_k)
         dedup = self._dedup_and_score(items)
+        info: Optional[Dict[str, Any]] = None
+        if adaptive:
+            shape = _score_shape(items, dedup, k)
+            capped = _cap_by_title(dedup, cap=title_cap)
+            if (shape["top1"] >= _env_float("RAG_ADAPT_MIN_TOP1", 0.5)
+                    and shape["topk_rel_gap"] >= _env_float("RAG_ADAPT_GAP", 0.08)
+                    and shape["title_conc"] >= _env_float("RAG_ADAPT_CONC", 0.5)
+                    and len(capped) >= k):
+                decision = "early_exit"
+            elif first_k < fetch_k and len(items) >= first_k and (
+                    shape["flat"] < _env_float("RAG_ADAPT_FLAT", 0.03) or len(capped) < k):
+                decision = "deepen"
+            else:
+                decision = "shallow"
+            candidates = len(items)
+            if decision == "deepen":
+                items = _fetch(fetch_k)
+                dedup = self._dedup_and_score(items)
+                candidates += len(items)
+            info = {"decision": decision, "first_k": first_k, "fetch_k": fetch_k, "candidates": candidates, **shape}
+            if decision == "early_exit":
+                _adapt_note(trace, {**info, "mmr": False, "rerank_in": 0})
+                return capped[:k]
 
         # 2) 타이틀 캡 → 다양화(MMR)
         dedup = _cap_by_title(dedup, cap=title_cap)
-        if use_mmr:
-            pre = dedup[:min(len(dedup), mmr_pre_k)]
-            pool = self._mmr(q, pre, k=mmr_k, lam=lam)
-        else:
-            pool = dedup[:max(k * 12, 120)]
-
-        # 3) 리랭커 입력 제한 후 최종 k
-        if self._reranker:
-            pool = pool[:min(len(pool), rerank_in)]
-            return self._rerank(q, pool, k)
-        else:
-            return pool[:k]
+        if info is not None:
+            _adapt_note(trace, {**info, "mmr": bool(use_mmr and len(dedup) > mmr_k),
+                                "rerank_in": min(len(dedup), rerank_in) if self._reranker and rerank else 0})
+        # 3) MMR → 리랭커 입력 제한 후 최종 k (캡은 위에서 적용)
+        return self._select(q, dedup, k, qv=qv, use_mmr=use_mmr, lam=lam, trace=trace, rerank=rerank, cap=False)
 
     def _retrieve_chroma_only(
         self, q: str, *, k: int, where: Optional[Dict[str, Any]],
-        use_mmr: bool, lam: float
+        use_mmr: bool, lam: float, trace: Optional[Dict[str, Any]] = None,
+        rerank: bool = True,
     ) -> List[Dict[str, Any]]:
         """
         Chroma만으로 성능 보강:
-        - 멀티쿼리(원문+정규화+간단 별칭) 병렬 조회 → 유니온
+        - 멀티쿼리(원문+정규화+간단 별칭) 배치 조회(coll.query 1회) → id별 최고점 융합
         - 타이틀 퍼지부스트(score와 가중 합성) → (MMR|CE)
         """
         qvars = _expand_queries(q)
+        variants = [q] + [qq for qq in qvars if qq != q]
 
         # fetch 파라미터화
         base_n = _env_int("RAG_FETCH_K", max(k * 8, 80))
         aux_n = _env_int("RAG_FETCH_K_AUX", max(k * 4, 40))
 
-        resA = chroma_search(
-            query=q, n=base_n, where=where,
-            include_docs=True, include_metas=True, include_ids=True, include_distances=True
+        # 변형 쿼리 전부 한 번에 임베딩 → coll.query 1회 → 원문은 base_n, 변형은 aux_n까지 사용
+        qvecs = self._qvecs(variants)
+        qv = qvecs[0]
+        res = vector_search_many(
+            qvecs, n=max(base_n, aux_n) if len(variants) > 1 else base_n, where=where,
+            include_docs=True, include_metas=True, include_distances=True,
+            include_embeddings=use_mmr,
         )
-        self._last_space = (resA.get("space") or "cosine").lower()
-        items = flatten_chroma_result(resA)
-
-        for qq in qvars:
-            if qq == q:
-                continue
-            res = chroma_search(
-                query=qq, n=aux_n, where=where,
-                include_docs=True, include_metas=True, include_ids=True, include_distances=True
-            )
-            items += flatten_chroma_result(res)
+        self._last_space = (res.get("space") or "cosine").lower()
+        batches = flatten_chroma_batches(res)
+        items = self._fuse_batches(batches, [base_n] + [aux_n] * (len(batches) - 1))
 
         dedup = self._dedup_and_score(items)
 
         W_SIM = getattr(config, "RAG_W_SIM", 0.8)
         W_TITLE = getattr(config, "RAG_W_TITLE", 0.2)
-        for it in dedup:
-            boost = _title_boost(it, qvars)
-            it["_combo"] = W_SIM * float(it.get("score") or 0.0) + W_TITLE * boost
+        boosts = _title_boosts(dedup, qvars)
+        for it, boost in zip(dedup, boosts):
+            it["_combo"] = W_SIM * float(it.get("score") or 0.0) + W_TITLE * float(boost)
         dedup.sort(key=lambda x: x.get("_combo", 0.0), reverse=True)
 
-        # 타이틀 캡 + MMR 파라미터화
-        title_cap = _env_int("RAG_TITLE_CAP", 2)
-        mmr_pre_k = _env_int("RAG_MMR_PRE_K", 160)
-        mmr_k = _env_int("RAG_MMR_K", max(k * 4, 40))
-        rerank_in = _env_int("RAG_RERANK_IN", 24)
+        # 타이틀 캡 + MMR(멀티쿼리라 MMR 입력을 조금 더 넓게)
+        return self._select(q, dedup, k, qv=qv, use_mmr=use_mmr, lam=lam, trace=trace, rerank=rerank, mmr_pre_k=160)
 
-        dedup = _cap_by_title(dedup, cap=title_cap)
-        if use_mmr:
-            pre = dedup[:min(len(dedup), mmr_pre_k)]
-            pool = self._mmr(q, pre, k=mmr_k, lam=lam)
-        else:
-            pool = dedup[:max(k * 12, 120)]
+    def _retrieve_hybrid(
+        self, q: str, *, k: int, where: Optional[Dict[str, Any]],
+        candidate_k: Optional[int], use_mmr: bool, lam: float,
+        trace: Optional[Dict[str, Any]] = None, rerank: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        BM25(문자 n-gram) + 벡터 후보를 RRF로 융합:
+        - 벡터는 얕게(RAG_HYBRID_FETCH_K), 희귀어/고유명사는 BM25가 보충
+        - BM25에만 있는 청크는 coll.get 1회로 본문/메타/벡터를 채우고 where는 로컬 평가
+        """
+        fetch_k = candidate_k or _env_int("RAG_HYBRID_FETCH_K", max(k * 6, 48))
+        bm25_k = _env_int("RAG_BM25_K", fetch_k)
+        rrf_k = _env_int("RAG_RRF_K", 60)
 
-        if self._reranker:
-            pool = pool[:min(len(pool), rerank_in)]
-            return self._rerank(q, pool, k)
-        else:
-            return pool[:k]
+        qv = self._qvec(q)
+        res = vector_search(
+            query=q, query_embeddings=qv, n=fetch_k, where=where,
+            include_docs=True, include_metas=True, include_ids=True, include_distances=True,
+            include_embeddings=use_mmr,
+        )
+        self._last_space = (res.get("space") or "cosine").lower()
+        vec_items = flatten_chroma_result(res)
+        by_id: Dict[str, Dict[str, Any]] = {str(it["id"]): it for it in vec_items}
+        vec_ids = set(by_id)
+
+        # where가 있으면 후필터로 줄어드니 넉넉히 뽑는다
+        lex = get_bm25_index().search(q, n=bm25_k * (4 if where else 1)) if bm25_enabled() else []
+        missing = [cid for cid, _ in lex if cid not in by_id]
+        if missing:
+            got = flatten_chroma_get(
+                vector_get_by_ids(missing, include_docs=True, include_metas=True, include_embeddings=True),
+                order=missing,
+            )
+            for it in got:
+                if not match_where(it.get("metadata"), where):
+                    continue
+                emb = it.get("embedding")
+                if emb is not None:  # 벡터 거리도 채워 컨피던스/MMR 스케일을 맞춤(Chroma 거리 정의 기준)
+                    dot = float(np.dot(np.asarray(emb, dtype=np.float32), qv))
+                    it["distance"] = (2.0 - 2.0 * dot) if self._last_space == "l2" else (1.0 - dot)
+                by_id[str(it["id"])] = it
+        lex = [(cid, s) for cid, s in lex if cid in by_id][:bm25_k]
+
+        # RRF: 1/(rrf_k + rank) 합
+        fused: Dict[str, float] = {}
+        for rank, it in enumerate(vec_items, 1):
+            cid = str(it["id"])
+            fused[cid] = fused.get(cid, 0.0) + 1.0 / (rrf_k + rank)
+        for rank, (cid, s) in enumerate(lex, 1):
+            fused[cid] = fused.get(cid, 0.0) + 1.0 / (rrf_k + rank)
+            by_id[cid]["_bm25"] = s
+        items = []
+        for cid in sorted(fused, key=fused.get, reverse=True):
+            it = by_id[cid]
+            it["_combo"] = fused[cid]
+            items.append(it)
+        if trace is not None:
+            trace["hybrid"] = {"vec": len(vec_items), "bm25": len(lex),
+                               "bm25_only": sum(1 for cid, _ in lex if cid not in vec_ids)}
+
+        dedup = self._dedup_and_score(items)
+        return self._select(q, dedup, k, qv=qv, use_mmr=use_mmr, lam=lam, trace=trace, rerank=rerank)
+
+    def _retrieve_hierarchical(
+        self, q: str, *, k: int, where: Optional[Dict[str, Any]],
+        candidate_k: Optional[int], use_mmr: bool, lam: float,
+        trace: Optional[Dict[str, Any]] = None, rerank: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        2단계 검색:
+        1) 문서 요약 인덱스(요약 섹션 벡터/청크 중심)에서 상위 doc_id N개
+        2) 그 문서들 안에서만 청크 검색(where에 doc_id $in 결합) → 캡/MMR/CE는 baseline과 같음
+        요약 인덱스가 비어 있거나, 1단계는 where를 모르므로 2단계에서 where와 겹치는 청크가 k개 미만이면 baseline으로 폴백.
+        """
+        n_docs = _env_int("RAG_HIER_DOCS", 12)                            # 1단계 문서 수
+        fetch_k = candidate_k or _env_int("RAG_HIER_FETCH_K", max(k * 8, 48))  # 2단계 청크 후보
+
+        qv = self._qvec(q)
+        t0 = time.perf_counter()
+        top_docs = get_summary_index().search(qv, n_docs) if docsum_enabled() else []
+        doc_ms = (time.perf_counter() - t0) * 1000.0
+        if not top_docs:
+            if trace is not None: trace["hierarchical"] = {"fallback": "baseline"}
+            return self._retrieve_baseline(q, k=k, where=where, candidate_k=candidate_k, use_mmr=use_mmr,
+                                           lam=lam, trace=trace, rerank=rerank)
+
+        doc_filter = {"doc_id": {"$in": [d for d, _, _ in top_docs]}}
+        t0 = time.perf_counter()
+        res = vector_search(
+            query=q, query_embeddings=qv, n=fetch_k, where={"$and": [where, doc_filter]} if where else doc_filter,
+            include_docs=True, include_metas=True, include_ids=True, include_distances=True,
+            include_embeddings=use_mmr,
+        )
+        chunk_ms = (time.perf_counter() - t0) * 1000.0
+        self._last_space = (res.get("space") or "cosine").lower()
+        items = flatten_chroma_result(res)
+        dedup = self._dedup_and_score(items)
+        if trace is not None:
+            trace["hierarchical"] = {
+                "docs": [d for d, _, _ in top_docs], "titles": [t for _, t, _ in top_docs],
+                "doc_ms": round(doc_ms, 1), "chunk_ms": round(chunk_ms, 1), "chunks": len(items),
+            }
+        if len(dedup) < k:
+            if trace is not None: trace["hierarchical"]["fallback"] = "baseline"
+            return self._retrieve_baseline(q, k=k, where=where, candidate_k=candidate_k, use_mmr=use_mmr,
+                                           lam=lam, trace=trace, rerank=rerank)
+        return self._select(q, dedup, k, qv=qv, use_mmr=use_mmr, lam=lam, trace=trace, rerank=rerank)
 
     # ------------------- 공개 API -------------------
     def retrieve_docs(
@@ -367,14 +649,56 @@ class RagService:
         candidate_k: Optional[int] = None,
         use_mmr: bool = True,
         lam: float = 0.5,
-        strategy: str = "baseline",  # 'baseline' | 'chroma_only' | 'multiq'
+        strategy: str = "baseline",  # 'baseline' | 'chroma_only' | 'multiq' | 'hybrid' | 'hierarchical'
+        trace: Optional[Dict[str, Any]] = None,  # 단계별 결정/캐시 여부 기록용(선택)
+        rerank: bool = True,  # False면 CrossEncoder 생략(마감 예산 부족 등)
     ) -> List[Dict[str, Any]]:
+        if strategy not in ("baseline", "chroma_only", "multiq", "hybrid", "hierarchical"):
+            raise ValueError(f"unknown strategy: {strategy}")
+
+        # 결과 캐시: 같은 컬렉션 세대에서 동일 파라미터면 최종 id/점수만 재사용하고 본문은 재조회
+        rcache = get_retrieval_cache()
+        key = retrieval_key(
+            q, k=k, where=where, candidate_k=candidate_k, use_mmr=use_mmr, lam=lam,
+            strategy=strategy, rerank=bool(self._reranker) and rerank, generation=collection_generation(),
+        )
+        cached = rcache.get(key) if rcache.enabled else None
+        if cached is not None:
+            docs = self._rehydrate(cached)
+            if len(docs) == len(cached):
+                if trace is not None: trace["retrieval_cache"] = "hit"
+                return docs
+        if trace is not None: trace["retrieval_cache"] = "miss" if rcache.enabled else "off"
+
         if strategy == "baseline":
-            return self._retrieve_baseline(q, k=k, where=where, candidate_k=candidate_k, use_mmr=use_mmr, lam=lam)
-        elif strategy in ("chroma_only", "multiq"):
-            return self._retrieve_chroma_only(q, k=k, where=where, use_mmr=use_mmr, lam=lam)
+            docs = self._retrieve_baseline(q, k=k, where=where, candidate_k=candidate_k, use_mmr=use_mmr, lam=lam,
+                                           trace=trace, rerank=rerank)
+        elif strategy == "hierarchical":
+            docs = self._retrieve_hierarchical(q, k=k, where=where, candidate_k=candidate_k, use_mmr=use_mmr,
+                                               lam=lam, trace=trace, rerank=rerank)
+        elif strategy == "hybrid":
+            docs = self._retrieve_hybrid(q, k=k, where=where, candidate_k=candidate_k, use_mmr=use_mmr, lam=lam,
+                                         trace=trace, rerank=rerank)
         else:
-            raise ValueError(f"unknown strategy: {strategy}")
+            docs = self._retrieve_chroma_only(q, k=k, where=where, use_mmr=use_mmr, lam=lam, trace=trace,
+                                              rerank=rerank)
+        if rcache.enabled:
+            rcache.put(key, slim(docs))
+        return docs
+
+    def _rehydrate(self, slims: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """캐시된 (id, 점수) 목록 → coll.get 1회로 본문/메타 채워 원래 순서대로 복원."""
+        order = [str(x["id"]) for x in slims]
+        got = flatten_chroma_get(vector_get_by_ids(order, include_docs=True, include_metas=True), order=order)
+        by_id = {str(it["id"]): it for it in got}
+        out: List[Dict[str, Any]] = []
+        for x in slims:
+            it = by_id.get(str(x["id"]))
+            if it is None:
+                continue
+            it.update(x)
+            out.append(it)
+        return out
 
     def _quota_by_section(self, items: List[Dict[str, Any]], quota: Dict[str, int], k: int) -> List[Dict[str, Any]]:
         out, used, rest = [], {s: 0 for s in quota}, []
@@ -419,100 +743,303 @@ class RagService:
             f"<질문>\n{question}\n"
         )
 
-    async def ask(
-        self,
-        q: str,
-        *,
-        k: int = 6,
-        where: Optional[Dict[str, Any]] = None,
-        candidate_k: Optional[int] = None,
-        use_mmr: bool = True,
-        lam: float = 0.5,
-        max_tokens: int = 512,
-        temperature: float = 0.2,
-        preview_chars: int = 600,
-        strategy: str = "baseline",
+    def _metrics(
+        self, *, k: int, strategy: str, t_total0: float, t_retr_ms: float, t_expand_ms: float,
+        t_llm_ms: float, conf: float, docs: List[Dict[str, Any]], retrieved: int,
+        trace: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
-        t_total0 = time.perf_counter()
+        return {
+            **(trace or {}),
+            "k": k,
+            "strategy": strategy,
+            "use_reranker": bool(self._reranker),
+            "retriever_ms": round(t_retr_ms, 1),
+            "expand_ms": round(t_expand_ms, 1),
+            "llm_ms": round(t_llm_ms, 1),
+            "total_ms": round((time.perf_counter() - t_total0) * 1000.0, 1),
+            "conf": round(conf, 4),
+            "dup_rate_doc": dup_rate(keys_from_docs(docs, by="doc")),
+            "dup_rate_title": dup_rate(keys_from_docs(docs, by="title")),
+            "device": default_device(),
+            "retrieved": retrieved,
+            "infer_queue": pool_stats()["pending"],
+            "ce_cache_hit_rate": self._ce_hit_rate(trace),
+            "ce_cache_hit_rate_total": get_rerank_cache().stats()["hit_rate"],
+        }
+
+    @staticmethod
+    def _ce_hit_rate(trace: Optional[Dict[str, Any]]) -> Optional[float]:
+        """이번 요청의 리랭크 점수 캐시 적중률(리랭크를 안 했으면 None)."""
+        h = (trace or {}).get("ce_cache_hits", 0)
+        n = h + (trace or {}).get("ce_cache_misses", 0)
+        return round(h / n, 4) if n else None
+
+    def _messages(self, q: str, context: str) -> List[Dict[str, str]]:
+        prompt = self._render_prompt(q, context)
+        return [
+            {"role": "system", "content": "답변은 한국어. 제공된 컨텍스트만 사용. 모르면 모른다고 답하라."},
+            {"role": "user", "content": prompt},
+        ]
+
+    async def _prepare(
+        self, q: str, *, k: int, where: Optional[Dict[str, Any]], candidate_k: Optional[int],
+        use_mmr: bool, lam: float, max_tokens: int, temperature: float, strategy: str, t_total0: float,
+        deadline: Deadline,
+    ) -> Dict[str, Any]:
+        """
+        LLM 호출 전 단계(답변 캐시 → 검색 → 컨피던스 → 확장 → 컨텍스트).
+        조기 종료면 st["resp"]에 완성 응답이 담김. ask/ask_stream 공용.
+        마감이 있으면 남은 예산으로 expand → rerank → MMR 순서로 선택 단계를 뺀다(trace["deadline"]).
+        """
+        st: Dict[str, Any] = {"resp": None, "qv": None, "trace": {}, "conf": 0.0,
+                              "t_retr_ms": 0.0, "t_expand_ms": 0.0, "docs": [], "context": ""}
 
-        # 1) 문서 검색 (+ latency)
+        # 0) 의미 기반 답변 캐시: 유사 질문 + 동일 파라미터 + 같은 컬렉션 세대면 저장 응답 반환
+        acache = get_answer_cache()
+        st["pkey"] = params_key(where=where, k=k, strategy=strategy, candidate_k=candidate_k,
+                                use_mmr=use_mmr, lam=lam, max_tokens=max_tokens, temperature=temperature)
+        if acache.enabled:
+            st["qv"] = await run_inference(self._qvec, q)
+            hit = acache.lookup(st["qv"], st["pkey"], collection_generation())
+            if hit is not None:
+                resp, sim, info = hit
+                resp["question"] = q
+                resp["metrics"] = {
+                    **(resp.get("metrics") or {}),
+                    "total_ms": round((time.perf_counter() - t_total0) * 1000.0, 1),
+                    "answer_cache": {"hit": True, "sim": round(sim, 4), **info},
+                }
+                st["resp"] = resp
+                return st
+
+        # 0.5) 마감 예산 계획: 검색(필수) + 선택 단계 + LLM 최소분이 남은 예산에 들어가도록
+        trace = st["trace"]
+        optional = ["expand"] + (["rerank"] if self._reranker else []) + (["mmr"] if use_mmr else [])
+        keep = deadline.plan(_stage_costs, optional, max_tokens=max_tokens,
+                             base_ms=_stage_costs.estimate("retrieve") + _stage_costs.estimate("context"))
+        if deadline.active:
+            trace["deadline"] = deadline.report()
+
+        # 1) 문서 검색 (+ latency) — CPU 바운드라 추론 풀에서 실행(이벤트 루프 비차단)
         t0 = time.perf_counter()
-        docs = self.retrieve_docs(q, k=k, where=where, candidate_k=candidate_k, use_mmr=use_mmr, lam=lam, strategy=strategy)
-        t_retr_ms = (time.perf_counter() - t0) * 1000.0
+        docs = await run_inference(
+            self.retrieve_docs, q, k=k, where=where, candidate_k=candidate_k,
+            use_mmr=use_mmr and "mmr" in keep, lam=lam, strategy=strategy, trace=trace,
+            rerank="rerank" in keep,
+        )
+        st["t_retr_ms"] = t_retr_ms = (time.perf_counter() - t0) * 1000.0
+        if trace.get("retrieval_cache") != "hit":
+            _stage_costs.observe("retrieve", t_retr_ms - trace.get("mmr_ms", 0.0) - trace.get("rerank_ms", 0.0))
+            if "mmr_ms" in trace: _stage_costs.observe("mmr", trace["mmr_ms"])
+            if "rerank_ms" in trace: _stage_costs.observe("rerank", trace["rerank_ms"])
 
         # 1.1) 리랭크/선정 결과로 컨피던스 먼저 계산
-        conf = self._conf(docs)
+        st["conf"] = conf = self._conf(docs)
         min_conf = _env_float("RAG_MIN_CONF", float(os.getenv("RAG_MIN_CONF", "0.20")))
         if conf < min_conf:
+            inc("rag_low_confidence_total")
             resp = RAGQueryResponse(question=q, answer="컨텍스트가 불충분합니다. 더 구체적인 단서가 필요합니다.", documents=[]).model_dump()
-            resp["metrics"] = {
-                "k": k, "strategy": strategy, "use_reranker": bool(self._reranker),
-                "retriever_ms": round(t_retr_ms, 1),
-                "expand_ms": 0.0,
-                "llm_ms": 0.0,
-                "total_ms": round((time.perf_counter() - t_total0) * 1000.0, 1),
-                "conf": round(conf, 4),
-                "dup_rate_doc": dup_rate(keys_from_docs(docs, by="doc")),
-                "dup_rate_title": dup_rate(keys_from_docs(docs, by="title")),
-                "device": "cuda" if torch.cuda.is_available() else "cpu",
-                "retrieved": len(docs),
-            }
-            return resp
+            resp["metrics"] = self._metrics(
+                k=k, strategy=strategy, t_total0=t_total0, t_retr_ms=t_retr_ms, t_expand_ms=0.0,
+                t_llm_ms=0.0, conf=conf, docs=docs, retrieved=len(docs), trace=trace,
+            )
+            st["resp"] = resp
+            return st
 
-        # 1.5) 동일 문서 확장 (+ latency)  — conf에는 영향 주지 않음
-        t1_0 = time.perf_counter()
-        docs = self._expand_same_doc(docs, per_doc=2)
-        t_expand_ms = (time.perf_counter() - t1_0) * 1000.0
+        # 1.5) 동일 문서 확장 (+ latency)  — conf에는 영향 주지 않음. 검색이 예산을 더 먹었으면 여기서 다시 판정
+        if "expand" in deadline.plan(_stage_costs, [s for s in optional if s == "expand" and s in keep],
+                                     max_tokens=max_tokens, base_ms=_stage_costs.estimate("context")):
+            t1_0 = time.perf_counter()
+            docs = await run_inference(self._expand_same_doc, docs, per_doc=2)
+            st["t_expand_ms"] = t_expand_ms = (time.perf_counter() - t1_0) * 1000.0
+            _stage_costs.observe("expand", t_expand_ms)
+            observe_stage("expand", t_expand_ms)
+        else:
+            t_expand_ms = 0.0
 
         # (선택) 섹션 쿼터 적용
         if os.getenv("RAG_USE_SECTION_QUOTA", "0") == "1":
             quota = {"요약": 2, "본문": 4}
             docs = self._quota_by_section(docs, quota, k)
+        st["docs"] = docs
 
-        context = self.build_context(docs)
+        t_ctx0 = time.perf_counter()
+        st["context"] = context = self.build_context(docs)
+        observe_stage("context", (time.perf_counter() - t_ctx0) * 1000.0)
+        if deadline.active:
+            trace["deadline"] = deadline.report()
         if not context:
             resp = RAGQueryResponse(question=q, answer="관련 컨텍스트가 없습니다.", documents=[]).model_dump()
-            resp["metrics"] = {
-                "k": k, "strategy": strategy, "use_reranker": bool(self._reranker),
-                "retriever_ms": round(t_retr_ms, 1),
-                "expand_ms": round(t_expand_ms, 1),
-                "llm_ms": 0.0,
-                "total_ms": round((time.perf_counter() - t_total0) * 1000.0, 1),
-                "conf": round(conf, 4),
-                "dup_rate_doc": dup_rate(keys_from_docs(docs, by="doc")),
-                "dup_rate_title": dup_rate(keys_from_docs(docs, by="title")),
-                "device": "cuda" if torch.cuda.is_available() else "cpu",
-                "retrieved": len(docs),
-            }
-            return resp
+            resp["metrics"] = self._metrics(
+                k=k, strategy=strategy, t_total0=t_total0, t_retr_ms=t_retr_ms, t_expand_ms=t_expand_ms,
+                t_llm_ms=0.0, conf=conf, docs=docs, retrieved=len(docs), trace=trace,
+            )
+            st["resp"] = resp
+        return st
 
-        # 2) 프롬프트 구성 & 호출 (+ LLM latency)
-        prompt = self._render_prompt(q, context)
-        messages = [
-            {"role": "system", "content": "답변은 한국어. 제공된 컨텍스트만 사용. 모르면 모른다고 답하라."},
-            {"role": "user", "content": prompt},
-        ]
+    async def ask(
+        self,
+        q: str,
+        *,
+        k: int = 6,
+        where: Optional[Dict[str, Any]] = None,
+        candidate_k: Optional[int] = None,
+        use_mmr: bool = True,
+        lam: float = 0.5,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        preview_chars: int = 600,
+        strategy: str = "baseline",
+        deadline_ms: Optional[float] = None,  # 요청 마감(ms). None이면 RAG_DEADLINE_MS(0=없음)
+    ) -> Dict[str, Any]:
+        t_total0 = time.perf_counter()
+        deadline = Deadline(_deadline_ms(deadline_ms), t0=t_total0)
+        st = await self._prepare(
+            q, k=k, where=where, candidate_k=candidate_k, use_mmr=use_mmr, lam=lam,
+            max_tokens=max_tokens, temperature=temperature, strategy=strategy, t_total0=t_total0,
+            deadline=deadline,
+        )
+        if st["resp"] is not None:
+            return st["resp"]
+        docs, trace, conf = st["docs"], st["trace"], st["conf"]
+
+        # 2) 프롬프트 구성 & 호출 (+ LLM latency) — 마감이 있으면 남은 예산에 맞춰 max_tokens 축소 + 타임아웃
+        messages = self._messages(q, st["context"])
+        llm_tokens = deadline.fit_tokens(_stage_costs, max_tokens)
         try:
             t_llm0 = time.perf_counter()
-            out = await self.chat(messages, max_tokens=max_tokens, temperature=temperature)
+            out = await asyncio.wait_for(self.chat(messages, max_tokens=llm_tokens, temperature=temperature),
+                                         timeout=deadline.llm_timeout_s())
             t_llm_ms = (time.perf_counter() - t_llm0) * 1000.0
+            _stage_costs.observe_llm(t_llm_ms, llm_tokens)
+            observe_stage("llm", t_llm_ms)
         except Exception as e:
+            if deadline.active:
+                trace["deadline"] = deadline.report()
+            inc("rag_llm_errors_total", reason="timeout" if isinstance(e, asyncio.TimeoutError) else "error")
+            if isinstance(e, asyncio.TimeoutError):
+                e = "deadline exceeded"
             resp = RAGQueryResponse(question=q, answer=f"LLM 호출 실패: {e}", documents=[]).model_dump()
-            resp["metrics"] = {
-                "k": k, "strategy": strategy, "use_reranker": bool(self._reranker),
-                "retriever_ms": round(t_retr_ms, 1),
-                "expand_ms": round(t_expand_ms, 1),
-                "llm_ms": 0.0,
-                "total_ms": round((time.perf_counter() - t_total0) * 1000.0, 1),
-                "conf": round(conf, 4),
-                "dup_rate_doc": dup_rate(keys_from_docs(docs, by="doc")),
-                "dup_rate_title": dup_rate(keys_from_docs(docs, by="title")),
-                "device": "cuda" if torch.cuda.is_available() else "cpu",
-                "retrieved": len(docs),
-            }
+            resp["metrics"] = self._metrics(
+                k=k, strategy=strategy, t_total0=t_total0, t_retr_ms=st["t_retr_ms"], t_expand_ms=st["t_expand_ms"],
+                t_llm_ms=0.0, conf=conf, docs=docs, retrieved=len(docs), trace=trace,
+            )
             return resp
 
         # 3) 문서들을 DocumentItem으로 변환
+        items = self._to_items(docs)
+
+        # 4) 스키마 응답 + 지표
+        if deadline.active:
+            trace["deadline"] = deadline.report()
+        resp = RAGQueryResponse(question=q, answer=out, documents=items).model_dump()
+        resp["metrics"] = self._metrics(
+            k=k, strategy=strategy, t_total0=t_total0, t_retr_ms=st["t_retr_ms"], t_expand_ms=st["t_expand_ms"],
+            t_llm_ms=t_llm_ms, conf=conf, docs=docs, retrieved=len(items), trace=trace,
+        )
+        # 정상 생성된 답변만 캐시(LLM 실패/저신뢰/예산 때문에 단계를 뺀 응답은 제외)
+        if st["qv"] is not None and not deadline.skipped:
+            get_answer_cache().put(st["qv"], st["pkey"], collection_generation(), q, resp)
+        return resp
+
+    async def ask_stream(
+        self,
+        q: str,
+        *,
+        k: int = 6,
+        where: Optional[Dict[str, Any]] = None,
+        candidate_k: Optional[int] = None,
+        use_mmr: bool = True,
+        lam: float = 0.5,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        strategy: str = "baseline",
+        deadline_ms: Optional[float] = None,
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        스트리밍 ask. (event, data) 순서:
+          sources(문서+검색 지표) → token* → done(최종 지표)   | 실패 시 error → done
+        마감이 지나면 생성을 끊고 done 지표의 deadline.truncated=True.
+        """
+        t_total0 = time.perf_counter()
+        deadline = Deadline(_deadline_ms(deadline_ms), t0=t_total0)
+        st = await self._prepare(
+            q, k=k, where=where, candidate_k=candidate_k, use_mmr=use_mmr, lam=lam,
+            max_tokens=max_tokens, temperature=temperature, strategy=strategy, t_total0=t_total0,
+            deadline=deadline,
+        )
+        if st["resp"] is not None:
+            resp = st["resp"]
+            yield "sources", {"question": q, "documents": resp.get("documents") or [], "metrics": resp["metrics"]}
+            yield "token", {"text": resp.get("answer") or ""}
+            yield "done", {"metrics": resp["metrics"]}
+            return
+        docs, trace, conf = st["docs"], st["trace"], st["conf"]
+
+        items = self._to_items(docs)
+        doc_dicts = [it.model_dump() for it in items]
+        yield "sources", {
+            "question": q,
+            "documents": doc_dicts,
+            "metrics": self._metrics(
+                k=k, strategy=strategy, t_total0=t_total0, t_retr_ms=st["t_retr_ms"], t_expand_ms=st["t_expand_ms"],
+                t_llm_ms=0.0, conf=conf, docs=docs, retrieved=len(items), trace=trace,
+            ),
+        }
+
+        parts: List[str] = []
+        llm_tokens = deadline.fit_tokens(_stage_costs, max_tokens)
+        t_llm0 = time.perf_counter()
+        t_first_ms: Optional[float] = None
+        failed = truncated = False
+        stream = self.chat_stream(self._messages(q, st["context"]), max_tokens=llm_tokens, temperature=temperature)
+        try:
+            while True:
+                # 토큰 사이(첫 토큰 전 포함)에 LLM이 멈춰도 남은 예산(하한 LLM_MIN_MS)까지만 기다림 — ask의 wait_for와 같은 상한
+                try:
+                    delta = await asyncio.wait_for(stream.__anext__(), timeout=deadline.llm_timeout_s())
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    truncated = True
+                    inc("rag_llm_errors_total", reason="timeout")
+                    break
+                if t_first_ms is None:
+                    t_first_ms = (time.perf_counter() - t_llm0) * 1000.0
+                parts.append(delta)
+                yield "token", {"text": delta}
+                if deadline.active and deadline.remaining_ms() <= 0:
+                    truncated = True
+                    break
+        except Exception as e:
+            failed = True
+            inc("rag_llm_errors_total", reason="error")
+            yield "error", {"message": f"LLM 호출 실패: {e}"}
+        finally:
+            try:
+                await stream.aclose()
+            except Exception:
+                pass
+        t_llm_ms = (time.perf_counter() - t_llm0) * 1000.0
+        if not failed:
+            observe_stage("llm", t_llm_ms)
+        if not failed and not truncated:
+            _stage_costs.observe_llm(t_llm_ms, llm_tokens)
+        if deadline.active:
+            trace["deadline"] = {**deadline.report(), "truncated": truncated}
+
+        metrics = self._metrics(
+            k=k, strategy=strategy, t_total0=t_total0, t_retr_ms=st["t_retr_ms"], t_expand_ms=st["t_expand_ms"],
+            t_llm_ms=t_llm_ms, conf=conf, docs=docs, retrieved=len(items), trace=trace,
+        )
+        metrics["ttft_ms"] = round(t_first_ms, 1) if t_first_ms is not None else None  # LLM 첫 토큰까지
+        if not failed and not truncated and not deadline.skipped and st["qv"] is not None:
+            resp = RAGQueryResponse(question=q, answer="".join(parts), documents=items).model_dump()
+            resp["metrics"] = metrics
+            get_answer_cache().put(st["qv"], st["pkey"], collection_generation(), q, resp)
+        yield "done", {"metrics": metrics}
+
+    def _to_items(self, docs: List[Dict[str, Any]]) -> List[DocumentItem]:
         items: List[DocumentItem] = []
         space = self._last_space
         for d in docs:
@@ -537,21 +1064,17 @@ class RagService:
                     text=text[:1200],
                 )
             )
+        return items
 
-        # 4) 스키마 응답 + 지표
-        resp = RAGQueryResponse(question=q, answer=out, documents=items).model_dump()
-        resp["metrics"] = {
-            "k": k,
-            "strategy": strategy,
-            "use_reranker": bool(self._reranker),
-            "retriever_ms": round(t_retr_ms, 1),
-            "expand_ms": round(t_expand_ms, 1),
-            "llm_ms": round(t_llm_ms, 1),
-            "total_ms": round((time.perf_counter() - t_total0) * 1000.0, 1),
-            "conf": round(conf, 4),
-            "dup_rate_doc": dup_rate(keys_from_docs(docs, by="doc")),
-            "dup_rate_title": dup_rate(keys_from_docs(docs, by="title")),
-            "device": "cuda" if torch.cuda.is_available() else "cpu",
-            "retrieved": len(items),
-        }
-        return resp
+# ───────────── 공유 인스턴스 ─────────────
+_service: Optional[RagService] = None
+_service_lock = threading.Lock()
+
+def get_rag_service() -> RagService:
+    """라우터들이 공유하는 RagService(모델은 model_registry가 별도로 공유)."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = RagService()
+    return _service
@@ -0,0 +1,76 @@
+# app/app/services/rerank_cache.py
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import hashlib, os, threading
+import numpy as np
+
+from ..utils.ttl_cache import TTLCache
+from .retrieval_cache import normalize_query
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+def _h(s: str) -> str:
+    return hashlib.blake2b(s.encode("utf-8"), digest_size=12).hexdigest()
+
+def ce_key(qh: str, chunk_id: str, text: str, model_id: str) -> Tuple[str, str, str, str]:
+    """(정규화 쿼리 해시, 청크 id, 청크 텍스트 해시, 리랭커 id). 텍스트가 바뀌면 자동으로 다른 키."""
+    return (qh, str(chunk_id), _h(text), model_id)
+
+def cached_predict(
+    reranker: Any, model_id: str, q: str, texts: Sequence[str], ids: Sequence[Optional[str]],
+    *, batch_size: int = 64,
+) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    캐시 조회 후 미스만 reranker.predict에 보내고 결과를 채워 넣는다.
+    id가 없는 후보는 캐시하지 않고 항상 계산. 반환: (점수 배열, {"hits", "misses"}).
+    """
+    cache = get_rerank_cache()
+    n = len(texts)
+    scores = np.empty(n, dtype=np.float32)
+    qh = _h(normalize_query(q))
+    keys: List[Optional[Tuple[str, str, str, str]]] = [
+        ce_key(qh, cid, t, model_id) if (cid and cache.enabled) else None for cid, t in zip(ids, texts)
+    ]
+    miss: List[int] = []
+    for i, key in enumerate(keys):
+        v = cache.get(key) if key is not None else None
+        if v is None:
+            miss.append(i)
+        else:
+            scores[i] = v
+    if miss:
+        fresh = np.asarray(
+            reranker.predict([(q, texts[i]) for i in miss], batch_size=batch_size, convert_to_numpy=True),
+            dtype=np.float32,
+        ).reshape(-1)
+        for i, s in zip(miss, fresh):
+            scores[i] = s
+            if keys[i] is not None:
+                cache.put(keys[i], float(s))
+    return scores, {"hits": n - len(miss), "misses": len(miss)}
+
+# ───────────── singleton ─────────────
+_cache: Optional[TTLCache] = None
+_cache_lock = threading.Lock()
+
+def get_rerank_cache() -> TTLCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TTLCache(
+                    maxsize=_env_int("RAG_CE_CACHE_SIZE", 50000),
+                    ttl=_env_float("RAG_CE_CACHE_TTL", 3600.0),
+                    name="rerank",
+                )
+    return _cache
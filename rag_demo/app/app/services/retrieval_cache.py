@@ -0,0 +1,54 @@
+# app/app/services/retrieval_cache.py
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+import json, os, threading, unicodedata
+
+from ..utils.ttl_cache import TTLCache
+
+# 히트 시 재구성에 필요한 최소 필드(본문/메타는 id로 다시 읽는다)
+_KEEP = ("id", "score", "distance", "_ce", "_combo")
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+def normalize_query(q: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", q or "").split())
+
+def retrieval_key(
+    q: str, *, k: int, where: Optional[Dict[str, Any]], candidate_k: Optional[int],
+    use_mmr: bool, lam: float, strategy: str, rerank: bool, generation: int,
+) -> Tuple[Any, ...]:
+    """세대(generation)를 키에 포함 → 컬렉션이 바뀌면 예전 엔트리는 절대 매칭되지 않음."""
+    return (
+        normalize_query(q), int(k),
+        json.dumps(where, ensure_ascii=False, sort_keys=True, default=str) if where else "",
+        candidate_k, bool(use_mmr), round(float(lam), 4), strategy, bool(rerank), int(generation),
+    )
+
+def slim(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{f: it.get(f) for f in _KEEP if it.get(f) is not None} for it in items]
+
+# ───────────── singleton ─────────────
+_cache: Optional[TTLCache] = None
+_cache_lock = threading.Lock()
+
+def get_retrieval_cache() -> TTLCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TTLCache(
+                    maxsize=_env_int("RAG_RETR_CACHE_SIZE", 1024),
+                    ttl=_env_float("RAG_RETR_CACHE_TTL", 600.0),
+                    name="retrieval",
+                )
+    return _cache
@@ -1,26 +1,30 @@
 # services/retrieval_service.py
 from __future__ import annotations
 from typing import Any, Dict, Optional, Callable, List
-from functools import lru_cache
-from ..infra.vector.chroma_store import search as chroma_search
+import logging
+import numpy as np
+from ..infra.vector import search as vector_search
+from ..domain.mmr import mmr_select
+from ..infra.model_registry import get_reranker, reranker_id
+from ..services.rerank_cache import cached_predict
 from ..services.adapters import flatten_chroma_result
 from ..infra.vector.metrics import to_similarity  # <- distance -> score 정규화
+from ..metrics.prom import inc
+
+log = logging.getLogger("retrieval_service")
 
 SearchFn = Callable[..., Dict[str, Any]]
 
-@lru_cache(maxsize=1)
 def _get_ce():
-    """CrossEncoder는 한번만 로드(서빙 병목 방지)."""
-    from sentence_transformers import CrossEncoder
-    # max_length로 잘라 OOM 방지
-    return CrossEncoder("BAAI/bge-reranker-v2-m3", max_length=512)
+    """CrossEncoder는 프로세스 전역 레지스트리에서 공유(RagService와 같은 인스턴스)."""
+    return get_reranker()
 
 # (옵션) 간단 리랭크 & MMR 유틸
 def _rerank_ce(query: str, items: List[Dict[str, Any]], top_k: int, text_max_chars: int = 4000) -> List[Dict[str, Any]]:
     try:
         ce = _get_ce()
-        pairs = [(query, (it.get("text") or "")[:text_max_chars]) for it in items]
-        scores = ce.predict(pairs).tolist()
+        texts = [(it.get("text") or "")[:text_max_chars] for it in items]
+        scores, _ = cached_predict(ce, reranker_id(), query, texts, [it.get("id") for it in items])
         for it, s in zip(items, scores):
             it["rerank_score"] = float(s)
         items.sort(key=lambda x: x["rerank_score"], reverse=True)
@@ -30,31 +34,26 @@ def _rerank_ce(query: str, items: List[Dict[str, Any]], top_k: int, text_max_cha
         return items[:top_k]
 
 def _mmr(items: List[Dict[str, Any]], top_k: int, lambda_: float = 0.7) -> List[Dict[str, Any]]:
+    """
+    같은 title 중복 최소화(간이 페널티 0.6). title one-hot × sqrt(0.6) 벡터면 내적이 같은 title일 때 0.6,
+    아니면 0 → 공용 NumPy MMR 엔진에 그대로 태운다.
+    """
     if len(items) <= top_k:
         return items
-    selected: List[Dict[str, Any]] = []
-    candidates = items[:]
-    while candidates and len(selected) < top_k:
-        best, best_val = None, -1e9
-        for c in candidates:
-            rel = float(c.get("score") or 0.0)  # score가 반드시 채워져 있어야 효과 있음
-            # 같은 title 중복 최소화(간이 페널티)
-            div = 0.0
-            for s in selected:
-                if (c.get("metadata") or {}).get("title") == (s.get("metadata") or {}).get("title"):
-                    div = max(div, 0.6)
-            val = lambda_ * rel - (1.0 - lambda_) * div
-            if val > best_val:
-                best, best_val = c, val
-        selected.append(best)     # type: ignore[arg-type]
-        candidates.remove(best)   # type: ignore[arg-type]
-    return selected
+    titles = [(c.get("metadata") or {}).get("title") for c in items]
+    col: Dict[Any, int] = {}
+    cols = np.fromiter((col.setdefault(t, len(col)) for t in titles), dtype=np.int64, count=len(items))
+    onehot = np.zeros((len(items), len(col)), dtype=np.float32)
+    onehot[np.arange(len(items)), cols] = np.sqrt(0.6)
+    rel = np.array([float(c.get("score") or 0.0) for c in items], dtype=np.float32)  # score가 반드시 채워져 있어야 효과 있음
+    idx = mmr_select(onehot, top_k, lambda_, relevance=rel, normalized=True)
+    return [items[i] for i in idx]
 
 def retrieve(
     q: str,
     k: int = 6,
     include_docs: bool = True,
-    search_fn: SearchFn = chroma_search,
+    search_fn: SearchFn = vector_search,
     where: Optional[Dict[str, Any]] = None,
     candidate_k: Optional[int] = None,
     use_rerank: bool = False,
@@ -103,10 +102,10 @@ def retrieve(
         if s1 > 1e-9:
             topk_rel_gap = round((s1 - s2) / s1, 4)
 
+    inc("rag_retrieve_total", rerank=str(use_rerank).lower(), mmr=str(use_mmr).lower())
     if trace_id:
-        print({"trace": trace_id, "route": "retrieve",
-               "k": k, "cand": cand, "rerank": use_rerank, "mmr": use_mmr,
-               "where": where, "min_score": min_score})
+        log.info(f"[retrieve] trace={trace_id} k={k} cand={cand} rerank={use_rerank} mmr={use_mmr} "
+                 f"where={where} min_score={min_score}")
 
     return {
         "space": space,
@@ -0,0 +1,114 @@
+# app/app/utils/deadline.py
+"""
+요청 마감(deadline) 예산 + 단계별 비용 추정.
+- StageCosts: 단계별 지연 EWMA(초기값은 RAG_COST_<STAGE>_MS), LLM은 max_tokens당 ms로 추정
+- Deadline: 남은 예산 안에 들어가도록 선택 단계를 DROP_ORDER 순서로 빼고, 그래도 모자라면 max_tokens 축소
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Set
+import math, os, threading, time
+
+# 예산이 모자랄 때 빼는 순서(앞일수록 먼저). 그 다음은 max_tokens 축소
+DROP_ORDER = ("expand", "rerank", "mmr")
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+MIN_TOKENS = int(_env_float("RAG_DEADLINE_MIN_TOKENS", 64))      # 축소 하한
+LLM_MIN_MS = _env_float("RAG_DEADLINE_LLM_MIN_MS", 500.0)        # 예산이 바닥나도 LLM에 주는 최소 시간
+_DEFAULT_MS = {"retrieve": 60.0, "mmr": 15.0, "rerank": 120.0, "expand": 20.0, "context": 2.0}
+
+class StageCosts:
+    """단계별 지연 EWMA(스레드 안전). 관측이 없으면 env 초기값."""
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = float(alpha)
+        self._lock = threading.Lock()
+        self._ms: Dict[str, float] = {s: _env_float(f"RAG_COST_{s.upper()}_MS", v) for s, v in _DEFAULT_MS.items()}
+        self._llm_per_token = _env_float("RAG_COST_LLM_MS_PER_TOKEN", 8.0)
+
+    def observe(self, stage: str, ms: float) -> None:
+        with self._lock:
+            cur = self._ms.get(stage)
+            self._ms[stage] = float(ms) if cur is None else (1 - self.alpha) * cur + self.alpha * float(ms)
+
+    def observe_llm(self, ms: float, max_tokens: int) -> None:
+        with self._lock:
+            self._llm_per_token = (1 - self.alpha) * self._llm_per_token + self.alpha * float(ms) / max(1, max_tokens)
+
+    def estimate(self, stage: str) -> float:
+        return self._ms.get(stage, 0.0)
+
+    def llm_ms(self, max_tokens: int) -> float:
+        return self._llm_per_token * max(1, max_tokens)
+
+    def tokens_for(self, ms: float) -> int:
+        return int(math.floor(max(0.0, ms) / max(self._llm_per_token, 1e-3)))
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {**{s: round(v, 1) for s, v in self._ms.items()},
+                    "llm_ms_per_token": round(self._llm_per_token, 2)}
+
+class Deadline:
+    """요청 하나의 예산. budget_ms가 None/0이면 비활성(모든 판정 통과)."""
+    def __init__(self, budget_ms: Optional[float], *, t0: Optional[float] = None):
+        self.budget_ms = float(budget_ms) if budget_ms and budget_ms > 0 else None
+        self.t0 = t0 if t0 is not None else time.perf_counter()
+        self.skipped: List[str] = []
+        self.max_tokens: Optional[Dict[str, int]] = None   # 축소했으면 {"from", "to"}
+
+    @property
+    def active(self) -> bool:
+        return self.budget_ms is not None
+
+    def remaining_ms(self) -> float:
+        if self.budget_ms is None:
+            return math.inf
+        return self.budget_ms - (time.perf_counter() - self.t0) * 1000.0
+
+    def skip(self, stage: str) -> None:
+        if stage not in self.skipped:
+            self.skipped.append(stage)
+
+    def plan(self, costs: StageCosts, optional: Iterable[str], *, max_tokens: int, base_ms: float = 0.0) -> Set[str]:
+        """
+        남은 예산 ≥ 필수(base_ms) + 선택 단계 + LLM(max_tokens 최소 MIN_TOKENS) 이 되도록
+        DROP_ORDER 순서로 선택 단계를 뺀다. 남길 단계 집합 반환(빠진 건 skipped에 기록).
+        """
+        keep = [s for s in optional if s not in self.skipped]
+        if not self.active:
+            return set(keep)
+        need = lambda: base_ms + sum(costs.estimate(s) for s in keep) + costs.llm_ms(min(max_tokens, MIN_TOKENS))
+        for stage in DROP_ORDER:
+            if need() <= self.remaining_ms():
+                break
+            if stage in keep:
+                keep.remove(stage)
+                self.skip(stage)
+        return set(keep)
+
+    def fit_tokens(self, costs: StageCosts, max_tokens: int) -> int:
+        """LLM 직전: 남은 예산으로 낼 수 있는 토큰 수로 max_tokens 축소(하한 MIN_TOKENS)."""
+        if not self.active:
+            return max_tokens
+        fit = max(min(MIN_TOKENS, max_tokens), min(max_tokens, costs.tokens_for(self.remaining_ms())))
+        if fit < max_tokens:
+            self.skip("max_tokens")
+            self.max_tokens = {"from": max_tokens, "to": fit}
+        return fit
+
+    def llm_timeout_s(self) -> Optional[float]:
+        if not self.active:
+            return None
+        return max(self.remaining_ms(), LLM_MIN_MS) / 1000.0
+
+    def report(self) -> Dict[str, object]:
+        out: Dict[str, object] = {"budget_ms": self.budget_ms, "skipped": list(self.skipped)}
+        if self.active:
+            out["remaining_ms"] = round(self.remaining_ms(), 1)
+        if self.max_tokens:
+            out["max_tokens"] = self.max_tokens
+        return out
@@ -0,0 +1,124 @@
+# app/app/utils/microbatch.py
+from __future__ import annotations
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+import bisect, collections, logging, threading, time
+
+log = logging.getLogger("microbatch")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+class Histogram:
+    """고정 버킷 누적 히스토그램(스레드 안전). 버킷은 상한값(<=), 마지막은 +Inf."""
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = sorted(float(b) for b in buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._n = 0
+        self._lock = threading.Lock()
+
+    def observe(self, v: float) -> None:
+        i = bisect.bisect_left(self.buckets, float(v))
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += float(v)
+            self._n += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total, n = self._sum, self._n
+        labels = [f"<={b:g}" for b in self.buckets] + ["+Inf"]
+        return {"count": n, "sum": round(total, 3), "avg": round(total / n, 3) if n else 0.0,
+                "buckets": dict(zip(labels, counts))}
+
+class MicroBatcher(Generic[T, R]):
+    """
+    동시 요청들의 입력을 모아 fn(items) 한 번으로 처리하는 동적 마이크로배처.
+    - 요청 단위(리스트)는 쪼개지 않고 합쳐서 max_batch 아이템 또는 max_wait_ms 마감까지 수집
+    - 한가할 때(대기열 비어 있고 직전 배치도 단독)는 기다리지 않고 즉시 실행 → 단건 p50 유지
+    - 배치 크기(아이템/요청) / 대기 시간 히스토그램 제공
+    fn은 입력 순서대로 정렬된 결과 시퀀스를 돌려줘야 한다.
+    """
+    def __init__(self, fn: Callable[[List[T]], Sequence[R]], *, max_batch: int = 64,
+                 max_wait_ms: float = 3.0, name: str = "microbatch"):
+        self.fn = fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self._q: "collections.deque[Tuple[List[T], Future, float]]" = collections.deque()
+        self._cv = threading.Condition()
+        self._last_reqs = 1
+        self.batches = 0
+        self.h_items = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256])
+        self.h_reqs = Histogram([1, 2, 3, 4, 6, 8, 12, 16, 32])
+        self.h_wait_ms = Histogram([0.5, 1, 2, 3, 5, 10, 20, 50, 100])
+        self._worker = threading.Thread(target=self._loop, name=f"{name}-worker", daemon=True)
+        self._worker.start()
+
+    def submit(self, items: Sequence[T]) -> List[R]:
+        """입력 리스트를 큐에 넣고 결과가 나올 때까지 대기(호출 스레드 블로킹)."""
+        items = list(items)
+        if not items:
+            return []
+        fut: Future = Future()
+        with self._cv:
+            self._q.append((items, fut, time.perf_counter()))
+            self._cv.notify()
+        return fut.result()
+
+    def _gather(self) -> List[Tuple[List[T], Future, float]]:
+        with self._cv:
+            while not self._q:
+                self._cv.wait()
+            jobs = [self._q.popleft()]
+            size = len(jobs[0][0])
+            # 부하 신호가 있을 때만 마감까지 모은다
+            if self._q or self._last_reqs > 1:
+                deadline = jobs[0][2] + self.max_wait
+                while size < self.max_batch:
+                    if self._q:
+                        if size + len(self._q[0][0]) > self.max_batch:
+                            break
+                        job = self._q.popleft()
+                        jobs.append(job)
+                        size += len(job[0])
+                        continue
+                    left = deadline - time.perf_counter()
+                    if left <= 0:
+                        break
+                    self._cv.wait(left)
+            self._last_reqs = len(jobs)
+            return jobs
+
+    def _loop(self) -> None:
+        while True:
+            jobs = self._gather()
+            t_run = time.perf_counter()
+            flat: List[T] = [x for items, _, _ in jobs for x in items]
+            self.batches += 1
+            self.h_items.observe(len(flat))
+            self.h_reqs.observe(len(jobs))
+            for _, _, t_sub in jobs:
+                self.h_wait_ms.observe((t_run - t_sub) * 1000.0)
+            try:
+                out = self.fn(flat)
+                if len(out) != len(flat):
+                    raise RuntimeError(f"{self.name}: fn returned {len(out)} results for {len(flat)} inputs")
+            except BaseException as e:  # 배치 전체 실패 → 모든 요청에 전달
+                log.warning(f"[{self.name}] batch failed: {e!r}")
+                for _, fut, _ in jobs:
+                    fut.set_exception(e)
+                continue
+            off = 0
+            for items, fut, _ in jobs:
+                fut.set_result(list(out[off:off + len(items)]))
+                off += len(items)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cv:
+            qlen = len(self._q)
+        return {"name": self.name, "max_batch": self.max_batch, "max_wait_ms": self.max_wait * 1000.0,
+                "queue": qlen, "batches": self.batches, "batch_items": self.h_items.snapshot(),
+                "batch_requests": self.h_reqs.snapshot(), "wait_ms": self.h_wait_ms.snapshot()}
@@ -0,0 +1,106 @@
+# app/app/utils/ttl_cache.py
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+import threading, time
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    스레드 안전 LRU + TTL 캐시.
+    - maxsize <= 0 이면 비활성(get은 항상 miss, put은 무시)
+    - ttl <= 0 이면 만료 없음
+    - max_bytes > 0 이고 sizeof가 있으면 항목 수와 함께 바이트 합으로도 상한(넘는 단일 항목은 저장 안 함)
+    - hits/misses/evictions 카운터 제공(stats)
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 600.0, name: str = "cache", *,
+                 max_bytes: int = 0, sizeof: Optional[Callable[[Any], int]] = None):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self.name = name
+        self.max_bytes = int(max_bytes) if sizeof is not None else 0
+        self._sizeof = sizeof
+        self._bytes = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if self.maxsize <= 0:
+            self.misses += 1
+            return default
+        now = time.monotonic()
+        with self._lock:
+            ent = self._data.get(key, _MISSING)
+            if ent is _MISSING:
+                self.misses += 1
+                return default
+            ts, val, nb = ent
+            if self.ttl > 0 and (now - ts) > self.ttl:
+                del self._data[key]
+                self._bytes -= nb
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return val
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        now = time.monotonic()
+        nb = int(self._sizeof(value)) if self.max_bytes > 0 else 0
+        with self._lock:
+            old = self._data.pop(key, _MISSING)
+            if old is not _MISSING:
+                self._bytes -= old[2]
+            if self.max_bytes > 0 and nb > self.max_bytes:
+                return
+            self._data[key] = (now, value, nb)
+            self._bytes += nb
+            while len(self._data) > self.maxsize or (self.max_bytes > 0 and self._bytes > self.max_bytes):
+                self._bytes -= self._data.popitem(last=False)[1][2]
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            ent = self._data.pop(key, _MISSING)
+            if ent is not _MISSING:
+                self._bytes -= ent[2]
+        return default if ent is _MISSING else ent[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        out = {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+        if self.max_bytes > 0:
+            out.update(bytes=self._bytes, max_bytes=self.max_bytes)
+        return out
+
+    def reset_stats(self, *, clear: Optional[bool] = False) -> None:
+        self.hits = self.misses = self.evictions = 0
+        if clear:
+            self.clear()